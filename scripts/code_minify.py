@@ -0,0 +1,142 @@
+"""
+AST-verified minification of code that is only used as prompt context.
+
+Remix and bug fix prompts embed a whole script (the base game, or the buggy
+script) that the model reads but never writes. minify_code strips its
+docstrings, comments, blank lines and trailing whitespace, and keeps
+everything else byte-for-byte, including indentation and the code inside
+string literals.
+
+Every result is verified: the AST of the minified code must dump exactly the
+same as the AST of the original with the removed docstrings taken out. Code
+that doesn't parse (e.g. a bug script with a SyntaxError), or that fails the
+check, raises MinifyError and should be used unchanged.
+"""
+
+import ast
+import io
+import tokenize
+
+
+class MinifyError(ValueError):
+    """
+    Code could not be minified, or the minified code isn't equivalent.
+    """
+
+
+def docstring_nodes(tree: ast.AST):
+    """
+    Yield (owner node, docstring expression node) for every docstring.
+    """
+    for node in ast.walk(tree):
+        if not isinstance(
+            node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            continue
+        if (
+            node.body
+            and isinstance(node.body[0], ast.Expr)
+            and isinstance(node.body[0].value, ast.Constant)
+            and isinstance(node.body[0].value.value, str)
+        ):
+            yield node, node.body[0]
+
+
+def remove_docstrings(tree: ast.AST, docstrings):
+    """
+    Take the given docstring expressions out of a tree, replacing a body that
+    would become empty with `pass`, the way minify_code edits the source.
+    """
+    for owner, docstring in docstring_nodes(tree):
+        if (docstring.lineno, docstring.col_offset) in docstrings:
+            owner.body = owner.body[1:] or [ast.Pass()]
+    return tree
+
+
+def multiline_string_lines(tree: ast.AST):
+    """
+    Line numbers inside multi-line string literals, which must be kept as is.
+    """
+    protected = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Constant, ast.JoinedStr)) and node.end_lineno > node.lineno:
+            protected.update(range(node.lineno + 1, node.end_lineno + 1))
+    return protected
+
+
+def minify_code(code: str):
+    """
+    Strip docstrings, comments, blank lines and trailing whitespace from code.
+
+    Args:
+        code: Python source code
+
+    Returns:
+        Tuple of (minified code, line map), where the line map is a list giving
+        for each original line number (1-based, index 0 unused) the line of
+        the minified code it ended up on, or the next line that was kept
+
+    Raises:
+        MinifyError: if the code doesn't parse, or the minified code doesn't
+            have the same AST as the original without its docstrings
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise MinifyError(f"Does not parse: {e.msg} (line {e.lineno})") from e
+
+    lines = code.splitlines()
+    keep = [True] * (len(lines) + 1)
+    protected = multiline_string_lines(tree)
+
+    # Docstrings on lines of their own are removed; a body that was only a
+    # docstring gets a `pass` at the docstring's indentation
+    removed_docstrings = set()
+    for owner, docstring in docstring_nodes(tree):
+        first = lines[docstring.lineno - 1].encode("utf-8")
+        last = lines[docstring.end_lineno - 1].encode("utf-8")
+        before = first[: docstring.col_offset].decode("utf-8")
+        after = last[docstring.end_col_offset :].decode("utf-8").strip()
+        if before.strip() or (after and not after.startswith("#")):
+            continue
+
+        removed_docstrings.add((docstring.lineno, docstring.col_offset))
+        for line_number in range(docstring.lineno, docstring.end_lineno + 1):
+            keep[line_number] = False
+            protected.discard(line_number)
+        if len(owner.body) == 1:
+            lines[docstring.lineno - 1] = before + "pass"
+            keep[docstring.lineno] = True
+
+    # Comments, found with the tokenizer so "#" inside strings is left alone
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, SyntaxError) as e:
+        raise MinifyError(f"Does not tokenize: {e}") from e
+    for token in tokens:
+        if token.type == tokenize.COMMENT and keep[token.start[0]]:
+            line_number, column = token.start
+            lines[line_number - 1] = lines[line_number - 1][:column]
+
+    minified = []
+    line_map = [0] * (len(lines) + 1)
+    for line_number, line in enumerate(lines, 1):
+        if line_number not in protected:
+            line = line.rstrip()
+            if not line:
+                keep[line_number] = False
+        if keep[line_number]:
+            minified.append(line)
+        line_map[line_number] = len(minified) if keep[line_number] else len(minified) + 1
+    line_map = [min(new_line, max(len(minified), 1)) for new_line in line_map]
+    minified_code = "\n".join(minified)
+
+    try:
+        minified_tree = ast.parse(minified_code)
+    except SyntaxError as e:
+        raise MinifyError(f"Minified code does not parse: {e.msg} (line {e.lineno})") from e
+    expected = remove_docstrings(tree, removed_docstrings)
+    if ast.dump(expected) != ast.dump(minified_tree):
+        raise MinifyError("Minified code is not equivalent to the original")
+
+    return minified_code, line_map
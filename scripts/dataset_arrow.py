@@ -0,0 +1,269 @@
+"""
+Columnar Arrow/Parquet export of the dataset.
+
+Each record becomes one row with its metadata split out into columns, so
+readers can memory-map the file and select or filter columns (e.g. only the
+galaga bug fix records) without parsing every record:
+
+    name, family, kind, source, prompt_version,
+    system, prompt, completion, messages,
+    line_count, prompt_tokens, completion_tokens, total_tokens,
+    record_sha256, script_sha256
+
+`prompt` is the first user message and `completion` the last assistant
+message; `messages` holds the full conversation for multi-turn records.
+`record_sha256` is the hash of the record's JSONL line (including its
+newline), the same hash the shard indexes use, and `script_sha256` is the
+hash of the script the record was made from.
+
+The export directory is laid out as a Hugging Face datasets repo, like the
+playable-05 release, so `datasets.load_dataset("output/hf_dataset")` loads it:
+
+    hf_dataset/
+        README.md
+        data/train-00000-of-00001.parquet
+        data/train-00000-of-00001.arrow
+
+setup:
+    pip install pyarrow
+
+usage: `python dataset_arrow.py [export dir] [--family NAME] [--kind KIND] [--columns COLUMN ...]`
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+
+EXPORT_FORMATS = ("parquet", "arrow")
+
+# Records per Parquet row group / Arrow record batch. Small groups let readers
+# skip most of the file when filtering on family or kind.
+ROW_GROUP_RECORDS = 64
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    # Low-cardinality columns like family and kind are plain strings here;
+    # Parquet dictionary-encodes them on its own, and Arrow IPC files can't
+    # have a different dictionary per record batch
+    return pa.schema(
+        [
+            ("name", pa.string()),
+            ("family", pa.string()),
+            ("kind", pa.string()),
+            ("source", pa.string()),
+            ("prompt_version", pa.string()),
+            ("system", pa.string()),
+            ("prompt", pa.string()),
+            ("completion", pa.string()),
+            (
+                "messages",
+                pa.list_(pa.struct([("role", pa.string()), ("content", pa.string())])),
+            ),
+            ("line_count", pa.int32()),
+            ("prompt_tokens", pa.int32()),
+            ("completion_tokens", pa.int32()),
+            ("total_tokens", pa.int32()),
+            ("record_sha256", pa.string()),
+            ("script_sha256", pa.string()),
+        ]
+    )
+
+
+def record_row(record, graph):
+    """
+    Flatten a DatasetRecord into a row of arrow_schema.
+    """
+    messages = record.data["messages"]
+    record_sha256 = record.sha256
+    if record_sha256 is None:
+        line = (json.dumps(record.data, ensure_ascii=False) + "\n").encode("utf-8")
+        record_sha256 = hashlib.sha256(line).hexdigest()
+    node = graph.nodes[record.name]
+
+    def first(role, ordered_messages):
+        return next(
+            (message["content"] for message in ordered_messages if message["role"] == role),
+            None,
+        )
+
+    return {
+        "name": record.name,
+        "family": record.family,
+        "kind": record.game_type,
+        "source": node.dependency,
+        "prompt_version": record.prompt_version,
+        "system": first("system", messages),
+        "prompt": first("user", messages),
+        "completion": first("assistant", reversed(messages)),
+        "messages": messages,
+        "line_count": record.line_count,
+        "prompt_tokens": record.prompt_tokens,
+        "completion_tokens": record.completion_tokens,
+        "total_tokens": record.total_tokens,
+        "record_sha256": record_sha256,
+        "script_sha256": node.sha256,
+    }
+
+
+def export_file(export_dir: Path, export_format: str):
+    return export_dir / "data" / f"train-00000-of-00001.{export_format}"
+
+
+def write_columnar_dataset(
+    records, export_dir: Path, formats, graph, row_group_records: int = ROW_GROUP_RECORDS
+):
+    """
+    Stream records into Parquet and/or Arrow IPC files, one row group at a time.
+
+    This is a pass-through generator like write_dataset_jsonl, so it can be
+    chained with the other writers. Files of the other export formats are
+    deleted, so a reader never picks up a stale export of an older build.
+
+    Args:
+        records: Iterable of DatasetRecord with token counts
+        export_dir: Directory to write the export into
+        formats: Export formats, each one of EXPORT_FORMATS
+        graph: DatasetGraph of the data directory, for the source and
+            script_sha256 columns
+        row_group_records: Records per row group / record batch
+
+    Yields:
+        Each DatasetRecord after it has been buffered for writing
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    (export_dir / "data").mkdir(parents=True, exist_ok=True)
+    for export_format in EXPORT_FORMATS:
+        if export_format not in formats:
+            export_file(export_dir, export_format).unlink(missing_ok=True)
+
+    writers = []
+    for export_format in formats:
+        path = str(export_file(export_dir, export_format))
+        if export_format == "parquet":
+            writers.append(pq.ParquetWriter(path, schema, compression="zstd"))
+        elif export_format == "arrow":
+            writers.append(pa.ipc.new_file(path, schema))
+        else:
+            raise ValueError(f"Unknown export format: {export_format}")
+
+    rows = []
+
+    def flush():
+        batch = pa.RecordBatch.from_pylist(rows, schema=schema)
+        for writer in writers:
+            writer.write_batch(batch)
+        rows.clear()
+
+    try:
+        for record in records:
+            rows.append(record_row(record, graph))
+            if len(rows) >= row_group_records:
+                flush()
+            yield record
+        if rows:
+            flush()
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def write_dataset_card(export_dir: Path, formats, counts: dict):
+    """
+    Write the README.md that tells Hugging Face datasets which files to load.
+    """
+    data_format = "parquet" if "parquet" in formats else formats[0]
+    card = f"""---
+configs:
+- config_name: default
+  data_files:
+  - split: train
+    path: data/train-*.{data_format}
+---
+
+# Playable Data
+
+Instruct-formatted pygame games from the playable-data repo, exported by
+`scripts/generate_dataset.py`.
+
+| Game Type | Count |
+|-----------|-------|
+| Base Games | {counts["base"]} |
+| Remix Games | {counts["remix"]} |
+| Bug Fix Games | {counts["bug_fix"]} |
+"""
+    (export_dir / "README.md").write_text(card, encoding="utf-8")
+
+
+def read_columnar_dataset(export_dir: Path, columns=None, family: str = None, kind: str = None):
+    """
+    Memory-map an export and read the selected columns of the matching records.
+
+    The Arrow IPC file is preferred, since it maps straight into memory
+    without decoding. For Parquet, row groups whose statistics rule out the
+    filters are skipped.
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    filters = []
+    if family is not None:
+        filters.append(("family", "=", family))
+    if kind is not None:
+        filters.append(("kind", "=", kind))
+
+    arrow_path = export_file(export_dir, "arrow")
+    if arrow_path.exists():
+        table = pa.ipc.open_file(pa.memory_map(str(arrow_path))).read_all()
+        for column, _, value in filters:
+            table = table.filter(pc.equal(table[column], value))
+        return table.select(columns) if columns else table
+
+    return pq.read_table(
+        export_file(export_dir, "parquet"),
+        columns=columns,
+        filters=filters or None,
+        memory_map=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query a columnar dataset export written by generate_dataset.py --export"
+    )
+    parser.add_argument(
+        "export_dir",
+        type=Path,
+        nargs="?",
+        default=Path("output") / "hf_dataset",
+        help="Export directory (default: output/hf_dataset)",
+    )
+    parser.add_argument("--family", help="Only records of this game family, e.g. galaga")
+    parser.add_argument("--kind", help="Only records of this kind: base, remix or bug_fix")
+    parser.add_argument(
+        "--columns",
+        nargs="+",
+        default=["name", "kind", "total_tokens"],
+        help="Columns to print (default: name kind total_tokens)",
+    )
+
+    args = parser.parse_args()
+
+    table = read_columnar_dataset(args.export_dir, args.columns, args.family, args.kind)
+    for row in table.to_pylist():
+        print("  ".join(str(row[column]) for column in args.columns))
+    print(f"\n{table.num_rows} records")
+
+
+if __name__ == "__main__":
+    main()
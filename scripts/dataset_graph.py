@@ -0,0 +1,233 @@
+"""
+Dependency graph of the scripts in the data directory.
+
+Every script's header comments are parsed once, and the scripts are linked
+into a DAG:
+- a remix points at the script named in its `# SOURCE:` comment, which can
+  itself be a remix (e.g. galaga_exploding_progressive_starfield.py ->
+  galaga_exploding_progressive.py -> galaga_exploding_bullets.py -> galaga.py)
+- a `_bug.py` file points at its `_fix.py` partner
+
+Missing sources and SOURCE cycles are found when the graph is built, instead
+of one remix at a time while the dataset is being generated.
+
+File contents are memoized, so a base game that many remixes embed (e.g.
+space_invaders.py) is only read from disk once per process.
+"""
+
+import hashlib
+import heapq
+import os
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from script_metadata import parse_header, script_kind
+
+# Most recently used scripts kept in memory by read_script_bytes
+SCRIPT_MEMO_SIZE = 64
+
+_script_memo = OrderedDict()
+
+
+def read_script_bytes(script_path: Path):
+    """
+    Read a script, memoized by path.
+
+    Entries are validated against the file's mtime and size on every call, so
+    edits are always picked up. The memo is a bounded LRU so it can't grow with
+    the size of the corpus.
+    """
+    script_path = Path(script_path)
+    stat = os.stat(script_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _script_memo.get(script_path)
+    if cached is not None and cached[0] == stamp:
+        _script_memo.move_to_end(script_path)
+        return cached[1]
+
+    content = script_path.read_bytes()
+    _script_memo[script_path] = (stamp, content)
+    _script_memo.move_to_end(script_path)
+    while len(_script_memo) > SCRIPT_MEMO_SIZE:
+        _script_memo.popitem(last=False)
+    return content
+
+
+def read_script_text(script_path: Path):
+    """
+    Memoized equivalent of script_path.read_text(encoding="utf-8").
+    """
+    # Match read_text's universal newline handling
+    text = read_script_bytes(script_path).decode("utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@dataclass
+class ScriptNode:
+    """
+    One script in the dataset graph.
+
+    Attributes:
+        name: Script path relative to the data directory, e.g. "galaga/galaga.py"
+        path: Absolute path of the script
+        kind: "base", "remix", "bug", or "fix"
+        header: Parsed header comments, see script_metadata.parse_header
+        dependency: Name of the script this one depends on (its SOURCE for a
+            remix, its _fix.py partner for a bug), or None
+        sha256: SHA-256 of the script's bytes, hashed when the graph read it
+    """
+
+    name: str
+    path: Path
+    kind: str
+    header: dict
+    dependency: str = None
+    sha256: str = None
+    dependents: list = field(default_factory=list)
+
+
+class DatasetGraph:
+    """
+    The remix/bug dependency DAG of a set of scripts.
+    """
+
+    def __init__(self, data_dir: Path, script_files):
+        self.data_dir = data_dir
+        self.nodes = {}
+
+        for script_path in script_files:
+            name = script_path.relative_to(data_dir).as_posix()
+            content = read_script_bytes(script_path)
+            header = parse_header(read_script_text(script_path))
+            kind = script_kind(script_path, header)
+            dependency = None
+
+            if kind == "bug":
+                dependency = script_path.parent / (
+                    script_path.stem.replace("_bug", "_fix") + ".py"
+                )
+            elif kind == "remix":
+                dependency = script_path.parent / header["SOURCE"]
+
+            if dependency is not None:
+                dependency = dependency.relative_to(data_dir).as_posix()
+
+            self.nodes[name] = ScriptNode(
+                name, script_path, kind, header, dependency, hashlib.sha256(content).hexdigest()
+            )
+
+        for node in self.nodes.values():
+            if node.dependency in self.nodes:
+                self.nodes[node.dependency].dependents.append(node.name)
+
+        self.problems = self._find_problems()
+
+    def _find_problems(self):
+        """
+        Find scripts whose dependency is missing or part of a SOURCE cycle.
+
+        Returns:
+            Dict mapping script name to a description of the problem
+        """
+        problems = {}
+        for name, node in self.nodes.items():
+            if node.dependency is not None and node.dependency not in self.nodes:
+                if node.kind == "bug":
+                    problems[name] = f"Fixed file not found: {node.dependency}"
+                else:
+                    problems[name] = f"Base game file not found: {node.dependency}"
+
+        # Anything Kahn's algorithm can't order is on, or downstream of, a cycle
+        ordered = set(self.topological_order())
+        for name in self.nodes:
+            if name not in ordered and name not in problems:
+                chain = self.source_chain(name)
+                chain.append(self.nodes[chain[-1]].dependency)
+                problems[name] = "SOURCE cycle: " + " -> ".join(chain)
+
+        return problems
+
+    def dependencies(self, name: str):
+        """
+        Paths of the files whose content ends up in this script's dataset record.
+        """
+        dependency = self.nodes[name].dependency
+        if dependency is None:
+            return []
+        return [self.data_dir / dependency]
+
+    def all_dependents(self, name: str):
+        """
+        Every script that directly or transitively depends on this one, sorted.
+        """
+        found = set()
+        stack = [name]
+        while stack:
+            for dependent in self.nodes[stack.pop()].dependents:
+                if dependent not in found:
+                    found.add(dependent)
+                    stack.append(dependent)
+        return sorted(found)
+
+    def source_chain(self, name: str):
+        """
+        Follow `# SOURCE:` comments from a remix back to its base game.
+
+        Returns:
+            List of script names, starting with name and ending at the base game
+            (or where the chain breaks or loops)
+        """
+        chain = [name]
+        while True:
+            node = self.nodes.get(chain[-1])
+            if node is None or node.kind != "remix" or node.dependency in chain:
+                break
+            chain.append(node.dependency)
+        return chain
+
+    def dependencies_sha256(self, name: str):
+        """
+        SHA-256 over the hashes of every script this one transitively depends
+        on: its SOURCE chain for a remix, or its fix for a bug.
+
+        Returns:
+            Hex digest, or None if the script has no dependencies
+        """
+        digest = None
+        seen = {name}
+        dependency = self.nodes[name].dependency
+        while dependency in self.nodes and dependency not in seen:
+            digest = digest or hashlib.sha256()
+            digest.update(f"{dependency}\0{self.nodes[dependency].sha256}\n".encode("utf-8"))
+            seen.add(dependency)
+            dependency = self.nodes[dependency].dependency
+        return digest.hexdigest() if digest else None
+
+    def topological_order(self):
+        """
+        Script names ordered so that every script comes after its dependency.
+
+        Ties are broken by name, so the order is deterministic. Scripts on a
+        cycle (or depending on one) are left out.
+        """
+        waiting = defaultdict(int)
+        for node in self.nodes.values():
+            if node.dependency in self.nodes:
+                waiting[node.name] += 1
+
+        ready = [name for name in self.nodes if waiting[name] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = heapq.heappop(ready)
+            order.append(name)
+            for dependent in self.nodes[name].dependents:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        return order
+
+    def __iter__(self):
+        return iter(self.topological_order())
@@ -0,0 +1,220 @@
+"""
+Content-addressed build manifests and record-level diffs between builds.
+
+Every run of generate_dataset.py stamps its output with a manifest listing
+each record's hash, the hash of the script it was made from, the hash of the
+scripts that script depends on (its SOURCE chain, or the fix of a bug), and
+the fingerprints of the prompt templates used:
+
+    {
+        "version": 1,
+        "build": "<sha256 over every record name and hash, in order>",
+        "created": "2025-09-01T12:00:00+00:00",
+        "tokenizer": "estimate",
+        "prompt_versions": {"v1": "<template fingerprint>"},
+        "records": {
+            "galaga/galaga.py": {
+                "sha256": "...", "script_sha256": "...", "source_sha256": null,
+                "kind": "base", "prompt_version": "v1", "tokens": 5120
+            },
+            ...
+        }
+    }
+
+The build id only depends on the records, so two runs that produce the same
+dataset have the same id. Manifests are kept as output/manifests/<build>.json,
+and the latest one is also copied to output/dataset.manifest.json. Tag the
+manifest of a training run (e.g. iat-05) by copying it next to the run's
+notes.
+
+Diffing two builds only reads their manifests, never the datasets.
+
+usage:
+    python dataset_manifest.py list
+    python dataset_manifest.py diff OLD [NEW]
+
+where OLD and NEW are manifest files, build ids (or a unique prefix of one),
+or "latest" (the default for NEW).
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+MANIFEST_VERSION = 1
+
+
+def record_entry(record, graph):
+    """
+    Manifest entry of a DatasetRecord that has been through write_dataset_jsonl.
+    """
+    return {
+        "sha256": record.sha256,
+        "script_sha256": graph.nodes[record.name].sha256,
+        "source_sha256": graph.dependencies_sha256(record.name),
+        "kind": record.game_type,
+        "prompt_version": record.prompt_version,
+        "tokens": record.total_tokens,
+    }
+
+
+def build_manifest(entries: dict, prompt_fingerprints: dict, tokenizer_name: str):
+    """
+    Assemble a manifest from its per-record entries.
+
+    Args:
+        entries: Dict mapping record name to its manifest entry, in dataset order
+        prompt_fingerprints: Dict mapping each prompt version used to its
+            template fingerprint
+        tokenizer_name: Tokenizer the token counts were made with
+    """
+    build = hashlib.sha256()
+    for name, entry in entries.items():
+        build.update(f"{name}\0{entry['sha256']}\n".encode("utf-8"))
+
+    return {
+        "version": MANIFEST_VERSION,
+        "build": build.hexdigest(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tokenizer": tokenizer_name,
+        "prompt_versions": prompt_fingerprints,
+        "records": entries,
+    }
+
+
+def write_manifest(manifest: dict, output_dir: Path):
+    """
+    Save a manifest under output_dir/manifests/ and as the latest manifest.
+
+    Returns:
+        Path of the content-addressed manifest file
+    """
+    manifest_dir = output_dir / "manifests"
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(manifest, indent=2)
+
+    manifest_file = manifest_dir / f"{manifest['build']}.json"
+    manifest_file.write_text(text, encoding="utf-8")
+    (output_dir / "dataset.manifest.json").write_text(text, encoding="utf-8")
+    return manifest_file
+
+
+def load_manifest(reference: str, output_dir: Path):
+    """
+    Load a manifest by file path, build id (or unique prefix), or "latest".
+    """
+    if reference == "latest":
+        path = output_dir / "dataset.manifest.json"
+    elif Path(reference).is_file():
+        path = Path(reference)
+    else:
+        matches = sorted((output_dir / "manifests").glob(f"{reference}*.json"))
+        if len(matches) != 1:
+            raise ValueError(
+                f"{len(matches)} builds match {reference!r}, expected exactly one"
+            )
+        path = matches[0]
+
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version in {path}")
+    return manifest
+
+
+def diff_manifests(old: dict, new: dict):
+    """
+    Compare the records of two builds by name and hash.
+
+    Returns:
+        Dict with sorted lists of "added", "removed" and "changed" record
+        names. Changed records are those whose record hash differs.
+    """
+    old_records = old["records"]
+    new_records = new["records"]
+    return {
+        "added": sorted(new_records.keys() - old_records.keys()),
+        "removed": sorted(old_records.keys() - new_records.keys()),
+        "changed": sorted(
+            name
+            for name in old_records.keys() & new_records.keys()
+            if old_records[name]["sha256"] != new_records[name]["sha256"]
+        ),
+    }
+
+
+def print_manifest_diff(old: dict, new: dict, diff: dict):
+    print(f"\n{old['build'][:12]} ({old['created']}) -> {new['build'][:12]} ({new['created']})")
+
+    for version in sorted(old["prompt_versions"].keys() | new["prompt_versions"].keys()):
+        before = old["prompt_versions"].get(version)
+        after = new["prompt_versions"].get(version)
+        if before != after:
+            print(f"Prompt templates {version}: {(before or '-')[:12]} -> {(after or '-')[:12]}")
+    if old["tokenizer"] != new["tokenizer"]:
+        print(f"Tokenizer: {old['tokenizer']} -> {new['tokenizer']}")
+
+    print("\n" + "=" * 76)
+    print(
+        f"RECORD CHANGES ({len(diff['added'])} added, {len(diff['removed'])} removed, "
+        f"{len(diff['changed'])} changed)"
+    )
+    print("=" * 76)
+    for name in diff["added"]:
+        print(f"+ {name:<60} {new['records'][name]['tokens']:>10,}")
+    for name in diff["removed"]:
+        print(f"- {name:<60} {-old['records'][name]['tokens']:>+10,}")
+    for name in diff["changed"]:
+        before = old["records"][name]
+        after = new["records"][name]
+        # A record can change without its script changing, e.g. after an
+        # edit to the base game of a remix, or a template or formatter change.
+        # Manifests from before source_sha256 was recorded don't have it.
+        if before["script_sha256"] != after["script_sha256"]:
+            reason = "script"
+        elif "source_sha256" in before and before["source_sha256"] != after.get("source_sha256"):
+            reason = "source"
+        else:
+            reason = "format"
+        print(f"~ {name:<60} {after['tokens'] - before['tokens']:>+10,} {reason}")
+    print("=" * 76)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List dataset builds or diff two of them")
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("output"),
+        help="Directory generate_dataset.py wrote to (default: output)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the saved build manifests")
+    diff_parser = subparsers.add_parser("diff", help="List the records that differ between two builds")
+    diff_parser.add_argument("old", help="Manifest file, build id (prefix) or 'latest'")
+    diff_parser.add_argument("new", nargs="?", default="latest", help="(default: latest)")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        manifests = [
+            json.loads(path.read_text(encoding="utf-8"))
+            for path in (args.output_dir / "manifests").glob("*.json")
+        ]
+        for manifest in sorted(manifests, key=lambda manifest: manifest["created"]):
+            print(
+                f"{manifest['build'][:12]}  {manifest['created']}  "
+                f"{len(manifest['records']):>6} records  "
+                f"prompts {', '.join(manifest['prompt_versions'])}"
+            )
+        return
+
+    old = load_manifest(args.old, args.output_dir)
+    new = load_manifest(args.new, args.output_dir)
+    print_manifest_diff(old, new, diff_manifests(old, new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Sequence packing of dataset records into fixed-length training windows.
+
+Records are bin-packed first-fit-decreasing by total token count. Each line of
+the packed JSONL file is one window:
+
+    {
+        "tokens": 8012,
+        "records": [
+            {"name": "galaga/galaga.py", "start": 0, "end": 5120, "messages": [...]},
+            {"name": "snake/snake.py", "start": 5120, "end": 8012, "messages": [...]}
+        ]
+    }
+
+`start` and `end` are token offsets within the window, so trainers can build a
+block-diagonal attention mask that keeps packed records from attending to each
+other. Record lengths are counted with the training tokenizer (packing needs
+--tokenizer) and include the chat template tokens around each message (see
+dataset_tokens.templated_tokens), so they match the sequence the trainer
+builds with the model's chat template.
+"""
+
+import json
+from pathlib import Path
+
+from dataset_tokens import templated_tokens
+
+
+def pack_first_fit_decreasing(lengths, window_tokens: int):
+    """
+    Bin-pack items into windows, first-fit-decreasing.
+
+    Args:
+        lengths: List of item lengths in tokens
+        window_tokens: Capacity of each window
+
+    Returns:
+        Tuple of (list of windows, each a list of item indices in packing order,
+        list of indices of items too long to fit in any window)
+    """
+    order = sorted(range(len(lengths)), key=lambda i: (-lengths[i], i))
+
+    windows = []
+    free = []
+    too_long = []
+    for i in order:
+        if lengths[i] > window_tokens:
+            too_long.append(i)
+            continue
+        for w, space in enumerate(free):
+            if lengths[i] <= space:
+                windows[w].append(i)
+                free[w] -= lengths[i]
+                break
+        else:
+            windows.append([i])
+            free.append(window_tokens - lengths[i])
+
+    return windows, sorted(too_long)
+
+
+def collect_packing_lengths(records, packing_items: list):
+    """
+    Remember each record's name and templated token count as it streams
+    past, so that the records can be packed once the dataset file is complete.
+
+    Yields:
+        Each DatasetRecord unchanged
+    """
+    for record in records:
+        packing_items.append((record.name, templated_tokens(record)))
+        yield record
+
+
+def jsonl_line_offsets(jsonl_file: Path):
+    """
+    Byte offset of every line in a JSONL file.
+    """
+    offsets = []
+    offset = 0
+    with open(jsonl_file, "rb") as f:
+        for line in f:
+            offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+def write_packed_dataset(
+    jsonl_file: Path, packed_file: Path, packing_items: list, window_tokens: int
+):
+    """
+    Pack the records of a finished JSONL dataset into windows.
+
+    Records are read back from jsonl_file by byte offset, so only one window's
+    worth of records is in memory at a time.
+
+    Args:
+        jsonl_file: The dataset JSONL file, one record per packing item
+        packed_file: Path for the packed JSONL file
+        packing_items: List of (name, templated tokens) from collect_packing_lengths
+        window_tokens: Tokens per training window
+
+    Returns:
+        Dict of packing statistics
+    """
+    lengths = [tokens for _, tokens in packing_items]
+    windows, too_long = pack_first_fit_decreasing(lengths, window_tokens)
+    offsets = jsonl_line_offsets(jsonl_file)
+
+    with open(jsonl_file, "rb") as source, open(packed_file, "w", encoding="utf-8") as f:
+        for window in windows:
+            packed_records = []
+            position = 0
+            for i in window:
+                source.seek(offsets[i])
+                data = json.loads(source.readline())
+                packed_records.append(
+                    {
+                        "name": packing_items[i][0],
+                        "start": position,
+                        "end": position + lengths[i],
+                        **data,
+                    }
+                )
+                position += lengths[i]
+            json.dump({"tokens": position, "records": packed_records}, f, ensure_ascii=False)
+            f.write("\n")
+
+    packed_tokens = sum(lengths) - sum(lengths[i] for i in too_long)
+    packed_count = len(lengths) - len(too_long)
+    return {
+        "window_tokens": window_tokens,
+        "records": packed_count,
+        "too_long": [packing_items[i][0] for i in too_long],
+        "windows": len(windows),
+        "tokens": packed_tokens,
+        # Unpacked, every record gets a window of its own
+        "unpacked_slots": packed_count * window_tokens,
+        "packed_slots": len(windows) * window_tokens,
+    }
+
+
+def print_packing_statistics(stats: dict):
+    """
+    Print the packing table, in the same layout as DATASET STATISTICS.
+    """
+    def utilization(slots):
+        return 100 * stats["tokens"] / slots if slots else 0
+
+    print("\n" + "=" * 60)
+    print(f"PACKING STATISTICS ({stats['window_tokens']:,} token windows)")
+    print("=" * 60)
+    print(f"{'Layout':<20} {'Windows':<15} {'Padding Tokens':<15} {'Used':<8}")
+    print("-" * 60)
+    print(
+        f"{'Unpacked':<20} {stats['records']:<15} "
+        f"{stats['unpacked_slots'] - stats['tokens']:<15,} "
+        f"{utilization(stats['unpacked_slots']):.1f}%"
+    )
+    print(
+        f"{'Packed':<20} {stats['windows']:<15} "
+        f"{stats['packed_slots'] - stats['tokens']:<15,} "
+        f"{utilization(stats['packed_slots']):.1f}%"
+    )
+    print("=" * 60)
+    for name in stats["too_long"]:
+        print(f"Not packed (longer than a window): {name}")
@@ -0,0 +1,418 @@
+"""
+Random-access reader for dataset JSONL files, for trainers and samplers.
+
+The JSONL file is memory-mapped, and a byte offset index gives O(1) access to
+any record without reading the records before it. Raw records and runs of
+records are returned as memoryview slices of the mapping, so subsets can be
+copied into a new file without decoding or copying them into Python objects.
+
+generate_dataset.py writes the index next to the dataset as dataset.idx. It
+also records each record's name and stratum ("<family>/<kind>", e.g.
+"galaga/bug_fix") for stratified sampling. The index is a small binary file:
+
+    header   "PDIDX001", record count, dataset size, dataset mtime (uint64 each)
+    offsets  record count + 1 little-endian uint64 byte offsets
+    strata   record count little-endian uint16 stratum numbers
+    trailer  JSON {"strata": [stratum labels], "names": [record names]}
+
+If the index is missing or out of date, the reader rebuilds the offsets by
+scanning for newlines, and every record is in the "unknown" stratum.
+
+usage: `python dataset_reader.py [dataset.jsonl] [--get N] [--sample K [--by family|kind|stratum]] [--seed S] [--out subset.jsonl]`
+"""
+
+import argparse
+import json
+import math
+import mmap
+import random
+import struct
+import sys
+from array import array
+from collections import defaultdict
+from pathlib import Path
+
+INDEX_MAGIC = b"PDIDX001"
+INDEX_HEADER = struct.Struct("<8sQQQ")
+UNKNOWN_STRATUM = "unknown"
+
+
+def index_path_for(jsonl_file: Path):
+    return Path(jsonl_file).with_suffix(".idx")
+
+
+def scan_line_offsets(data):
+    """
+    Byte offset of the start of every line, plus the end of the last line.
+    """
+    offsets = array("Q", [0])
+    position = data.find(b"\n")
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(b"\n", position + 1)
+    if offsets[-1] != len(data):
+        # Last record without a trailing newline
+        offsets.append(len(data))
+    return offsets
+
+
+def little_endian(values: array):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_dataset_index(jsonl_file: Path, labels, index_file: Path = None):
+    """
+    Write the byte offset index of a finished dataset JSONL file.
+
+    Args:
+        jsonl_file: The dataset JSONL file
+        labels: List of (record name, family, kind), one per line of the file
+        index_file: Path for the index (defaults to the dataset path with an
+            .idx suffix)
+    """
+    jsonl_file = Path(jsonl_file)
+    index_file = index_file or index_path_for(jsonl_file)
+
+    stat = jsonl_file.stat()
+    with open(jsonl_file, "rb") as f:
+        if stat.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offsets = scan_line_offsets(data)
+        else:
+            offsets = array("Q", [0])
+
+    count = len(offsets) - 1
+    if count != len(labels):
+        raise ValueError(f"{jsonl_file} has {count} records but {len(labels)} labels")
+
+    strata = {}
+    stratum_ids = array(
+        "H",
+        (strata.setdefault(f"{family}/{kind}", len(strata)) for _, family, kind in labels),
+    )
+    trailer = {"strata": list(strata), "names": [name for name, _, _ in labels]}
+
+    partial_file = index_file.with_name(index_file.name + ".partial")
+    with open(partial_file, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, count, stat.st_size, stat.st_mtime_ns))
+        f.write(little_endian(offsets))
+        f.write(little_endian(stratum_ids))
+        f.write(json.dumps(trailer).encode("utf-8"))
+    partial_file.replace(index_file)
+
+
+def patch_dataset_jsonl(jsonl_file: Path, changed: dict, order: list):
+    """
+    Update records of a dataset JSONL file, e.g. after a few scripts changed.
+
+    Runs of unchanged records are copied by byte range from the mapped file,
+    found through its index, so only the changed records are encoded and no
+    other record is decoded or held in memory. Write the new index with
+    write_dataset_index afterwards.
+
+    Args:
+        jsonl_file: Dataset JSONL file with an up to date index
+        changed: Dict mapping record name to its new JSON line (bytes, including
+            the newline), or to None to remove the record
+        order: Every record name of the patched dataset, in order
+
+    Raises:
+        ValueError: If the dataset has no up to date index with record names
+    """
+    jsonl_file = Path(jsonl_file)
+    partial_file = jsonl_file.with_name(jsonl_file.name + ".partial")
+    with DatasetReader(jsonl_file) as reader, open(partial_file, "wb") as f:
+        if reader.names is None:
+            raise ValueError(f"{jsonl_file} has no up to date index with record names")
+
+        def copy_run(start, stop):
+            if start is not None:
+                with reader.raw_slice(start, stop) as run:
+                    f.write(run)
+
+        start = stop = None
+        for name in order:
+            if name in changed:
+                copy_run(start, stop)
+                start = stop = None
+                f.write(changed[name])
+                continue
+            position = reader.position_of(name)
+            if position != stop:
+                copy_run(start, stop)
+                start = position
+            stop = position + 1
+        copy_run(start, stop)
+    partial_file.replace(jsonl_file)
+
+
+def reservoir_sample(items, k: int, rng: random.Random):
+    """
+    Uniformly sample k items from an iterable of unknown length in one pass.
+
+    Uses Algorithm L, which skips ahead geometrically, so after the reservoir
+    is full only O(k log(n / k)) random numbers are drawn.
+
+    Returns:
+        List of at most k items, in no particular order
+    """
+    iterator = iter(items)
+    reservoir = []
+    for item in iterator:
+        reservoir.append(item)
+        if len(reservoir) == k:
+            break
+    if len(reservoir) < k or k == 0:
+        return reservoir
+
+    w = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = math.floor(math.log(rng.random()) / math.log(1 - w))
+        for _ in range(skip):
+            if next(iterator, None) is None:
+                return reservoir
+        item = next(iterator, None)
+        if item is None:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(rng.random()) / k)
+
+
+class DatasetReader:
+    """
+    Memory-mapped random access to the records of a dataset JSONL file.
+
+    Use as a context manager, or call close(), to release the mappings.
+    Memoryviews returned by raw() and raw_slice() must be released before
+    the reader is closed.
+    """
+
+    def __init__(self, jsonl_file: Path, index_file: Path = None):
+        self.jsonl_file = Path(jsonl_file)
+        index_file = Path(index_file) if index_file else index_path_for(self.jsonl_file)
+
+        self._file = open(self.jsonl_file, "rb")
+        stat = self.jsonl_file.stat()
+        self._data = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        )
+        self._index = None
+        self._names = None
+        self._name_positions = None
+
+        if not self._load_index(index_file, stat):
+            self.offsets = scan_line_offsets(self._data)
+            self.stratum_ids = None
+            self.stratum_labels = [UNKNOWN_STRATUM]
+
+    def _load_index(self, index_file: Path, stat):
+        if not index_file.exists():
+            return False
+        with open(index_file, "rb") as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, size, mtime_ns = INDEX_HEADER.unpack_from(index)
+        if magic != INDEX_MAGIC or (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            index.close()
+            return False
+
+        offsets_end = INDEX_HEADER.size + 8 * (count + 1)
+        strata_end = offsets_end + 2 * count
+        view = memoryview(index)
+        if sys.byteorder == "little":
+            # Zero-copy views straight into the mapped index
+            self.offsets = view[INDEX_HEADER.size : offsets_end].cast("Q")
+            self.stratum_ids = view[offsets_end:strata_end].cast("H")
+        else:
+            self.offsets = array("Q")
+            self.offsets.frombytes(view[INDEX_HEADER.size : offsets_end])
+            self.offsets.byteswap()
+            self.stratum_ids = array("H")
+            self.stratum_ids.frombytes(view[offsets_end:strata_end])
+            self.stratum_ids.byteswap()
+        self._trailer = view[strata_end:]
+        self.stratum_labels = json.loads(bytes(self._trailer[:]))["strata"]
+        self._index = index
+        return True
+
+    def close(self):
+        for view in ("offsets", "stratum_ids", "_trailer"):
+            if isinstance(getattr(self, view, None), memoryview):
+                getattr(self, view).release()
+        if self._index is not None:
+            self._index.close()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _position(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Record {i} out of range ({len(self)} records)")
+        return i
+
+    def raw(self, i: int):
+        """
+        The JSON line of record i (including its newline) as a memoryview of
+        the mapped file.
+        """
+        i = self._position(i)
+        return memoryview(self._data)[self.offsets[i] : self.offsets[i + 1]]
+
+    def raw_slice(self, start: int, stop: int):
+        """
+        Records start to stop (exclusive) as one memoryview of the mapped file.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        return memoryview(self._data)[self.offsets[start] : self.offsets[stop]]
+
+    def __getitem__(self, i: int):
+        """
+        Decode record i into its instruction data dict.
+        """
+        with self.raw(i) as line:
+            return json.loads(bytes(line))
+
+    @property
+    def names(self):
+        """
+        Record names from the index, or None if the index wasn't available.
+        """
+        if self._names is None and self._index is not None:
+            self._names = json.loads(bytes(self._trailer[:]))["names"]
+        return self._names
+
+    def position_of(self, name: str):
+        """
+        Record number of the record with this name.
+        """
+        if self.names is None:
+            raise KeyError(f"{self.jsonl_file} has no index with record names")
+        if self._name_positions is None:
+            self._name_positions = {name: i for i, name in enumerate(self.names)}
+        return self._name_positions[name]
+
+    def stratum(self, i: int):
+        """
+        "<family>/<kind>" of record i.
+        """
+        if self.stratum_ids is None:
+            return UNKNOWN_STRATUM
+        return self.stratum_labels[self.stratum_ids[self._position(i)]]
+
+    def strata(self, by: str = "stratum"):
+        """
+        Group record numbers by "family", "kind", or the full "stratum".
+
+        Returns:
+            Dict mapping each group label to a list of record numbers
+        """
+        part = {"family": 0, "kind": 1}.get(by)
+        groups = defaultdict(list)
+        for i in range(len(self)):
+            label = self.stratum(i)
+            if part is not None and label != UNKNOWN_STRATUM:
+                label = label.split("/")[part]
+            groups[label].append(i)
+        return dict(groups)
+
+    def sample(self, k: int, seed=0, records=None):
+        """
+        Reservoir-sample k record numbers, from records (defaults to all of them).
+
+        Returns:
+            Sorted list of record numbers
+        """
+        rng = random.Random(seed)
+        return sorted(reservoir_sample(records if records is not None else range(len(self)), k, rng))
+
+    def stratified_sample(self, k: int, by: str = "stratum", seed: int = 0):
+        """
+        Sample k records from every group of strata(by), or all of a group's
+        records if it has fewer than k.
+
+        Returns:
+            Dict mapping each group label to a sorted list of record numbers
+        """
+        # Seed each group separately, so groups of the same size don't all
+        # get the same relative positions
+        return {
+            label: self.sample(k, f"{seed}/{label}", records)
+            for label, records in sorted(self.strata(by).items())
+        }
+
+    def write_subset(self, positions, output_file: Path):
+        """
+        Copy the given records into a new JSONL file without decoding them.
+        """
+        with open(output_file, "wb") as f:
+            for i in positions:
+                with self.raw(i) as line:
+                    f.write(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect or sample a dataset JSONL file through its byte offset index"
+    )
+    parser.add_argument(
+        "dataset",
+        type=Path,
+        nargs="?",
+        default=Path("output") / "dataset.jsonl",
+        help="Dataset JSONL file (default: output/dataset.jsonl)",
+    )
+    parser.add_argument("--get", help="Print one record, by record number or name")
+    parser.add_argument("--sample", type=int, help="Sample this many records")
+    parser.add_argument(
+        "--by",
+        choices=("family", "kind", "stratum"),
+        help="Sample --sample records from every family, kind, or family/kind stratum",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--out", type=Path, help="Write the sampled records to this JSONL file")
+
+    args = parser.parse_args()
+
+    with DatasetReader(args.dataset) as reader:
+        if args.get is not None:
+            position = int(args.get) if args.get.lstrip("-").isdigit() else reader.position_of(args.get)
+            json.dump(reader[position], sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+
+        if args.sample is None:
+            print(f"{len(reader)} records in {args.dataset}")
+            for label, records in sorted(reader.strata().items()):
+                print(f"  {label:<32} {len(records)}")
+            return
+
+        if args.by:
+            groups = reader.stratified_sample(args.sample, args.by, args.seed)
+            positions = sorted(i for records in groups.values() for i in records)
+        else:
+            positions = reader.sample(args.sample, args.seed)
+
+        for i in positions:
+            name = reader.names[i] if reader.names else ""
+            print(f"{i:<8} {reader.stratum(i):<32} {name}")
+        if args.out:
+            reader.write_subset(positions, args.out)
+            print(f"\nWrote {len(positions)} records to {args.out.absolute()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Size-capped, compressed dataset shards with a byte offset index.
+
+Every record is compressed as its own gzip member or zstd frame. A shard is
+therefore still a valid .gz/.zst file that any tool can decompress as a whole,
+but readers can also use the sidecar index to seek straight to one record and
+decompress only that record.
+
+Shards are named `dataset-00000-of-00003.jsonl.gz` and each has an index named
+`dataset-00000-of-00003.index.json`:
+
+    {
+        "shard": "dataset-00000-of-00003.jsonl.gz",
+        "compression": "gz",
+        "records": [
+            {"name": "snake/snake.py", "offset": 0, "length": 4120, "sha256": "..."},
+            ...
+        ]
+    }
+
+`sha256` is the hash of the uncompressed JSON line, including its newline.
+
+setup (only needed for zstd shards):
+    pip install zstandard
+
+usage:
+    python dataset_shards.py <index.json> [record number]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+COMPRESSIONS = ("gz", "zst")
+
+
+def compress_record(data: bytes, compression: str):
+    """
+    Compress one record into a standalone gzip member or zstd frame.
+    """
+    if compression == "gz":
+        # mtime=0 keeps the output byte-identical across runs
+        return gzip.compress(data, mtime=0)
+    if compression == "zst":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def decompress_record(data: bytes, compression: str):
+    """
+    Decompress one record written by compress_record.
+    """
+    if compression == "gz":
+        return gzip.decompress(data)
+    if compression == "zst":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def shard_name(shard_number: int, shard_count: int, compression: str):
+    return f"dataset-{shard_number:05d}-of-{shard_count:05d}.jsonl.{compression}"
+
+
+def index_name(shard_number: int, shard_count: int):
+    return f"dataset-{shard_number:05d}-of-{shard_count:05d}.index.json"
+
+
+def write_dataset_shards(
+    records, shard_dir: Path, max_shard_bytes: int, compression: str = "gz"
+):
+    """
+    Stream records into size-capped compressed shards with offset indexes.
+
+    This is a pass-through generator like write_dataset_jsonl, so it can be
+    chained with other writers. The total shard count is only known at the
+    end, so shards are written under temporary names and renamed once all
+    records have been written.
+
+    Args:
+        records: Iterable of DatasetRecord
+        shard_dir: Directory to write the shards and their indexes into
+        max_shard_bytes: Compressed size at which a new shard is started
+        compression: "gz" or "zst"
+
+    Yields:
+        Each DatasetRecord after it has been written
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    # Shards from a previous run would have a different "-of-" count
+    for pattern in ("dataset-*-of-*.*", "dataset-*.partial"):
+        for old_file in shard_dir.glob(pattern):
+            old_file.unlink()
+
+    shards = []
+    shard_file = None
+    shard_records = []
+    offset = 0
+
+    def close_shard():
+        shard_file.close()
+        shards.append(shard_records)
+
+    try:
+        for record in records:
+            line = (json.dumps(record.data, ensure_ascii=False) + "\n").encode("utf-8")
+            compressed = compress_record(line, compression)
+
+            if shard_file is not None and offset + len(compressed) > max_shard_bytes:
+                close_shard()
+                shard_file = None
+
+            if shard_file is None:
+                shard_file = open(shard_dir / f"dataset-{len(shards):05d}.partial", "wb")
+                shard_records = []
+                offset = 0
+
+            shard_file.write(compressed)
+            shard_records.append(
+                {
+                    "name": record.name,
+                    "offset": offset,
+                    "length": len(compressed),
+                    "sha256": hashlib.sha256(line).hexdigest(),
+                }
+            )
+            offset += len(compressed)
+
+            yield record
+    finally:
+        if shard_file is not None:
+            close_shard()
+
+    shard_count = len(shards)
+    for shard_number, shard_records in enumerate(shards):
+        name = shard_name(shard_number, shard_count, compression)
+        (shard_dir / f"dataset-{shard_number:05d}.partial").replace(shard_dir / name)
+        index = {"shard": name, "compression": compression, "records": shard_records}
+        (shard_dir / index_name(shard_number, shard_count)).write_text(
+            json.dumps(index, indent=2), encoding="utf-8"
+        )
+
+
+def load_shard_index(index_path: Path):
+    """
+    Load a shard index written by write_dataset_shards.
+    """
+    return json.loads(Path(index_path).read_text(encoding="utf-8"))
+
+
+def read_shard_record(index_path: Path, record_number: int, verify: bool = True):
+    """
+    Seek to one record in a shard and decompress only that record.
+
+    Args:
+        index_path: Path to the shard's .index.json file
+        record_number: Position of the record within the shard
+        verify: Check the record against the sha256 stored in the index
+
+    Returns:
+        The record's instruction data dict
+    """
+    index_path = Path(index_path)
+    index = load_shard_index(index_path)
+    entry = index["records"][record_number]
+
+    with open(index_path.parent / index["shard"], "rb") as f:
+        f.seek(entry["offset"])
+        compressed = f.read(entry["length"])
+
+    line = decompress_record(compressed, index["compression"])
+    if verify and hashlib.sha256(line).hexdigest() != entry["sha256"]:
+        raise ValueError(
+            f"Record {record_number} of {index['shard']} does not match its index hash"
+        )
+
+    return json.loads(line)
+
+
+def patch_dataset_shards(shard_dir: Path, changed: dict, order: list):
+    """
+    Update records of existing shards in place, e.g. after a few scripts changed.
+
+    Only the shards that hold a changed record are rewritten. Unchanged records
+    are copied over still compressed, so patching a shard costs about as much as
+    compressing the changed records. The shard count stays the same, so shards
+    can grow past the size they were capped at until the next full build.
+
+    Args:
+        shard_dir: Directory written by write_dataset_shards
+        changed: Dict mapping record name to its new JSON line (bytes, including
+            the newline), or to None to remove the record
+        order: Every record name of the dataset in order, used to place new
+            records next to the record before them
+
+    Returns:
+        Number of shards rewritten
+    """
+    index_paths = sorted(shard_dir.glob("dataset-*-of-*.index.json"))
+    indexes = [load_shard_index(index_path) for index_path in index_paths]
+    if not indexes:
+        raise FileNotFoundError(f"No shard indexes in {shard_dir}")
+
+    # Each new record goes into the shard of the closest record before it
+    shard_of = {
+        entry["name"]: shard_number
+        for shard_number, index in enumerate(indexes)
+        for entry in index["records"]
+    }
+    position = {name: i for i, name in enumerate(order)}
+    inserts = {}
+    shard_number = 0
+    for name in order:
+        if name in shard_of:
+            shard_number = shard_of[name]
+        elif changed.get(name) is not None:
+            inserts.setdefault(shard_number, []).append(name)
+
+    rewritten = 0
+    for shard_number, (index_path, index) in enumerate(zip(index_paths, indexes)):
+        names = [entry["name"] for entry in index["records"]]
+        if not any(name in changed for name in names) and shard_number not in inserts:
+            continue
+
+        entries = {entry["name"]: entry for entry in index["records"]}
+        names = [name for name in names if changed.get(name, True) is not None]
+        names += inserts.get(shard_number, [])
+        names.sort(key=lambda name: position.get(name, len(position)))
+
+        shard_path = shard_dir / index["shard"]
+        partial_path = shard_path.with_name(shard_path.name + ".partial")
+        records = []
+        offset = 0
+        with open(shard_path, "rb") as source, open(partial_path, "wb") as f:
+            for name in names:
+                if name in changed:
+                    line = changed[name]
+                    compressed = compress_record(line, index["compression"])
+                    sha256 = hashlib.sha256(line).hexdigest()
+                else:
+                    source.seek(entries[name]["offset"])
+                    compressed = source.read(entries[name]["length"])
+                    sha256 = entries[name]["sha256"]
+                f.write(compressed)
+                records.append(
+                    {"name": name, "offset": offset, "length": len(compressed), "sha256": sha256}
+                )
+                offset += len(compressed)
+
+        partial_path.replace(shard_path)
+        index["records"] = records
+        index_path.write_text(json.dumps(index, indent=2), encoding="utf-8")
+        rewritten += 1
+
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List the records in a dataset shard, or print one of them"
+    )
+    parser.add_argument("index", help="Path to a dataset-XXXXX-of-XXXXX.index.json file")
+    parser.add_argument(
+        "record_number",
+        type=int,
+        nargs="?",
+        help="Print this record (position within the shard) instead of listing",
+    )
+
+    args = parser.parse_args()
+
+    if args.record_number is None:
+        index = load_shard_index(args.index)
+        for i, entry in enumerate(index["records"]):
+            print(f"{i:<6} {entry['offset']:<12} {entry['length']:<10} {entry['name']}")
+    else:
+        record = read_shard_record(args.index, args.record_number)
+        json.dump(record, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Deterministic train/eval split of the dataset, stratified by game family and
+kind, without leaking near-copies of eval records into training.
+
+Scripts whose records share code are split as one group. Twins that only
+differ in their `_oneshot`, `_bug` and `_fix` suffixes share a twin name:
+
+    galaga/galaga_1.py, galaga/bugs/galaga_1_bug.py, galaga/bugs/galaga_1_fix.py
+        -> galaga/galaga_1
+    galaga/galaga_icon_lives.py, galaga/galaga_icon_lives_oneshot.py
+        -> galaga/galaga_icon_lives
+
+and a group is a connected component of twin names joined by the SOURCE
+edges of the dependency graph, since the completion of a base game or remix
+is the prompt of every remix of it. A group is named after its
+alphabetically first twin name, e.g. galaga/galaga for galaga.py with all
+of its remixes.
+
+The stratum of a group is the family and kind of its main script (e.g.
+galaga/base). Eval gets round(eval_fraction * records) records, shared
+between the strata in proportion to their size. Within each stratum, groups
+are ranked by a hash of the seed and group name and go to eval in that
+order while they fit the stratum's share, so a large group (a base game
+with all of its remixes) only lands in eval when the share allows it. The
+same seed always gives the same split.
+
+The groups are assigned from the dependency graph before any record is
+built, so the split files are written while the dataset is being streamed.
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from dataset_graph import DatasetGraph
+from dataset_reader import write_dataset_index
+
+SPLITS = ("train", "eval")
+
+GROUP_SUFFIX_PATTERN = re.compile(r"(_oneshot)?(_bug|_fix)?$")
+
+
+def twin_name(name: str):
+    """
+    Script name without its twin suffixes, e.g. "galaga/bugs/galaga_1_bug.py" -> "galaga/galaga_1".
+    """
+    family = name.split("/")[0]
+    stem = GROUP_SUFFIX_PATTERN.sub("", Path(name).stem, count=1)
+    return f"{family}/{stem}"
+
+
+def split_groups(graph: DatasetGraph, names=None):
+    """
+    Partition scripts into leakage groups, see the module docstring.
+
+    Components are found over the whole graph, so two selected scripts are
+    grouped even if the script that links them isn't selected.
+
+    Args:
+        graph: DatasetGraph of the data directory
+        names: If given, only group these script names
+
+    Returns:
+        Dict mapping each group name to the list of its script names
+    """
+    parent = {}
+
+    def find(key):
+        while parent.setdefault(key, key) != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for name, node in graph.nodes.items():
+        root = find(twin_name(name))
+        if node.dependency in graph.nodes:
+            other = find(twin_name(node.dependency))
+            # Keep the alphabetically first twin name as the root, it names the group
+            parent[max(root, other)] = min(root, other)
+
+    groups = defaultdict(list)
+    for name in graph.nodes:
+        if names is None or name in names:
+            groups[find(twin_name(name))].append(name)
+    return dict(groups)
+
+
+def assign_splits(graph: DatasetGraph, eval_fraction: float, seed: int = 0, names=None):
+    """
+    Assign every script of the graph to "train" or "eval", by leakage group.
+
+    Eval gets round(eval_fraction * records) records overall, not per
+    stratum, so small strata don't inflate it. A stratum whose share rounds
+    down to nothing, or whose groups are all larger than its share, has no
+    eval records.
+
+    Args:
+        graph: DatasetGraph of the data directory
+        eval_fraction: Fraction of the records to put in eval
+        seed: Split seed
+        names: If given, only split these script names
+
+    Returns:
+        Dict mapping each script name to "train" or "eval"
+    """
+    if not 0 < eval_fraction < 1:
+        raise ValueError(f"eval_fraction must be between 0 and 1, got {eval_fraction}")
+
+    groups = split_groups(graph, names)
+
+    strata = defaultdict(list)
+    for group, group_names in groups.items():
+        main_script = f"{group}.py" if f"{group}.py" in group_names else group_names[0]
+        strata[(group.split("/")[0], graph.nodes[main_script].kind)].append(group)
+
+    def size(group):
+        # A bug and its fix make one record
+        return sum(1 for name in groups[group] if graph.nodes[name].kind != "fix")
+
+    # Largest remainder: floor every stratum's exact share, then hand the
+    # records left over to the strata that lost the most to the floor
+    exact = {stratum: eval_fraction * sum(map(size, strata[stratum])) for stratum in strata}
+    shares = {stratum: math.floor(share) for stratum, share in exact.items()}
+    left_over = round(sum(exact.values())) - sum(shares.values())
+    for stratum in sorted(strata, key=lambda stratum: (shares[stratum] - exact[stratum], stratum))[:left_over]:
+        shares[stratum] += 1
+
+    def rank(group):
+        return hashlib.sha256(f"{seed}/{group}".encode("utf-8")).digest()
+
+    assignments = {}
+    for stratum, stratum_groups in strata.items():
+        eval_size = 0
+        for group in sorted(stratum_groups, key=rank):
+            split = "train"
+            if eval_size + size(group) <= shares[stratum]:
+                split = "eval"
+                eval_size += size(group)
+            for name in groups[group]:
+                assignments[name] = split
+    return assignments
+
+
+def split_path(output_file: Path, split: str):
+    return output_file.with_suffix(f".{split}.jsonl")
+
+
+def write_dataset_splits(records, output_file: Path, assignments: dict, counts: dict):
+    """
+    Stream records into dataset.train.jsonl and dataset.eval.jsonl files.
+
+    This is a pass-through generator like write_dataset_jsonl, so the split is
+    written in the same pass as the full dataset. Once every record has been
+    written, each split file also gets its byte offset index (see
+    dataset_reader.py).
+
+    Args:
+        records: Iterable of DatasetRecord
+        output_file: The full dataset JSONL file, next to which the splits are written
+        assignments: Dict from assign_splits
+        counts: Dict that receives the number of records of each split per
+            "<family>/<kind>" stratum
+
+    Yields:
+        Each DatasetRecord after it has been written
+    """
+    files = {split: open(split_path(output_file, split), "w", encoding="utf-8") for split in SPLITS}
+    labels = {split: [] for split in SPLITS}
+    try:
+        for record in records:
+            split = assignments[record.name]
+            files[split].write(json.dumps(record.data, ensure_ascii=False) + "\n")
+            labels[split].append((record.name, record.family, record.game_type))
+            stratum = counts.setdefault(f"{record.family}/{record.game_type}", dict.fromkeys(SPLITS, 0))
+            stratum[split] += 1
+            yield record
+    finally:
+        for f in files.values():
+            f.close()
+
+    for split in SPLITS:
+        write_dataset_index(split_path(output_file, split), labels[split])
+
+
+def print_split_statistics(counts: dict, eval_fraction: float, seed: int):
+    print("\n" + "=" * 60)
+    print(f"TRAIN/EVAL SPLIT (eval fraction {eval_fraction}, seed {seed})")
+    print("=" * 60)
+    print(f"{'Stratum':<36} {'Train':>10} {'Eval':>10}")
+    print("-" * 60)
+    for stratum, split_counts in sorted(counts.items()):
+        print(f"{stratum:<36} {split_counts['train']:>10,} {split_counts['eval']:>10,}")
+    print("-" * 60)
+    totals = [sum(split_counts[split] for split_counts in counts.values()) for split in SPLITS]
+    print(f"{'TOTAL':<36} {totals[0]:>10,} {totals[1]:>10,}")
+    print("=" * 60)
@@ -0,0 +1,198 @@
+"""
+Token accounting for dataset records.
+
+By default tokens are estimated offline with a regex that splits words,
+numbers, whitespace runs and punctuation, which is close to (but not exactly)
+what a BPE tokenizer produces for Python code. For exact counts, point
+`--tokenizer` at a local Hugging Face `tokenizer.json`, for example the one
+from Qwen/Qwen2.5-Coder-7B-Instruct.
+
+Counts cover the message contents only, not the chat template tokens the
+trainer adds around each message. templated_tokens() adds those, for the
+places where the length the trainer sees matters (packing windows, provider
+context limits).
+
+setup (only needed for --tokenizer):
+    pip install tokenizers
+"""
+
+import re
+from collections import defaultdict
+from pathlib import Path
+
+# Max Context Length used for our fine-tuning runs, see docs/fireworksai.md
+MAX_CONTEXT_TOKENS = 8192
+
+# Tokens the Qwen2.5 chat template (ChatML, see docs/fireworksai.md) adds to
+# each message: "<|im_start|>", the role and "\n" before its content, and
+# "<|im_end|>" and "\n" after it
+CHAT_TEMPLATE_TOKENS_PER_MESSAGE = 5
+
+# Histogram buckets are this many tokens wide, with one overflow bucket at the end
+HISTOGRAM_BUCKET_TOKENS = 1024
+
+ESTIMATE_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+
+def estimate_token_counts(texts):
+    """
+    Offline fallback tokenizer: approximate token counts without any model files.
+    """
+    return [len(ESTIMATE_PATTERN.findall(text)) for text in texts]
+
+
+def load_token_counter(tokenizer_path: Path = None):
+    """
+    Load a token counting function.
+
+    Args:
+        tokenizer_path: Path to a local tokenizer.json. None uses the offline
+            estimate instead.
+
+    Returns:
+        Tuple of (function mapping a list of strings to a list of token counts,
+        description of the tokenizer for reports)
+    """
+    if tokenizer_path is None:
+        return estimate_token_counts, "estimate"
+
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(str(tokenizer_path))
+
+    def count_tokens(texts):
+        # encode_batch tokenizes the whole batch in parallel across cores
+        encodings = tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+    return count_tokens, str(tokenizer_path)
+
+
+def split_prompt_completion(data: dict):
+    """
+    Split a record's messages into prompt text and completion text.
+
+    Every assistant message is completion, everything else is prompt.
+    """
+    prompt = []
+    completion = []
+    for message in data["messages"]:
+        if message["role"] == "assistant":
+            completion.append(message["content"])
+        else:
+            prompt.append(message["content"])
+    return "\n".join(prompt), "\n".join(completion)
+
+
+def templated_tokens(record):
+    """
+    Total tokens of a record once the trainer has applied the chat template.
+    """
+    return record.total_tokens + CHAT_TEMPLATE_TOKENS_PER_MESSAGE * len(record.data["messages"])
+
+
+def annotate_token_counts(records, count_tokens, batch_size: int = 64):
+    """
+    Fill in the prompt, completion and total token counts of each record.
+
+    Records are tokenized in batches so that a parallel tokenizer gets enough
+    work per call. This is a pass-through generator that keeps dataset order.
+
+    Args:
+        records: Iterable of DatasetRecord
+        count_tokens: Function from load_token_counter
+        batch_size: Records per tokenizer call
+
+    Yields:
+        Each DatasetRecord with its token counts filled in
+    """
+    batch = []
+
+    def flush():
+        texts = []
+        for record in batch:
+            texts.extend(split_prompt_completion(record.data))
+        counts = count_tokens(texts)
+        for i, record in enumerate(batch):
+            record.prompt_tokens = counts[2 * i]
+            record.completion_tokens = counts[2 * i + 1]
+            record.total_tokens = record.prompt_tokens + record.completion_tokens
+        yield from batch
+        batch.clear()
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield from flush()
+
+    if batch:
+        yield from flush()
+
+
+class TokenStatistics:
+    """
+    Accumulates per game type and per game family token totals and histograms.
+    """
+
+    def __init__(self, tokenizer_name: str):
+        self.tokenizer_name = tokenizer_name
+        self.rows = defaultdict(
+            lambda: {"count": 0, "prompt": 0, "completion": 0, "total": 0, "max": 0}
+        )
+        self.histograms = defaultdict(lambda: [0] * self.bucket_count())
+
+    @staticmethod
+    def bucket_count():
+        return MAX_CONTEXT_TOKENS // HISTOGRAM_BUCKET_TOKENS + 1
+
+    def add(self, record):
+        bucket = min(
+            record.total_tokens // HISTOGRAM_BUCKET_TOKENS, self.bucket_count() - 1
+        )
+        for key in (("type", record.game_type), ("family", record.family)):
+            row = self.rows[key]
+            row["count"] += 1
+            row["prompt"] += record.prompt_tokens
+            row["completion"] += record.completion_tokens
+            row["total"] += record.total_tokens
+            row["max"] = max(row["max"], record.total_tokens)
+            self.histograms[key][bucket] += 1
+
+    def print_report(self):
+        width = 88
+        type_keys = sorted(key for key in self.rows if key[0] == "type")
+        family_keys = sorted(key for key in self.rows if key[0] == "family")
+
+        print("\n" + "=" * width)
+        print(f"TOKEN STATISTICS (tokenizer: {self.tokenizer_name})")
+        print("=" * width)
+        print(
+            f"{'Group':<20} {'Count':<8} {'Prompt':<14} {'Completion':<14} "
+            f"{'Total':<14} {'Max':<8} {'>=' + str(MAX_CONTEXT_TOKENS):<8}"
+        )
+        for keys in (type_keys, family_keys):
+            print("-" * width)
+            for key in keys:
+                row = self.rows[key]
+                over_limit = self.histograms[key][-1]
+                print(
+                    f"{key[1]:<20} {row['count']:<8} {row['prompt']:<14,} "
+                    f"{row['completion']:<14,} {row['total']:<14,} {row['max']:<8,} "
+                    f"{over_limit:<8}"
+                )
+        print("=" * width)
+
+        # Histogram of records per total token bucket
+        labels = [
+            f"<{(i + 1) * HISTOGRAM_BUCKET_TOKENS // 1024}k"
+            for i in range(self.bucket_count() - 1)
+        ] + [f">={MAX_CONTEXT_TOKENS // 1024}k"]
+        print(f"{'Total tokens':<20} " + " ".join(f"{label:>6}" for label in labels))
+        for keys in (type_keys, family_keys):
+            print("-" * width)
+            for key in keys:
+                print(
+                    f"{key[1]:<20} "
+                    + " ".join(f"{count:>6}" for count in self.histograms[key])
+                )
+        print("=" * width)
@@ -0,0 +1,204 @@
+"""
+Provider-specific output writers fed from a single generation pass.
+
+Every script is parsed, routed and token-counted once, and each record is
+then handed to any number of writers, each writing its own file next to the
+dataset with its own context limit and statistics:
+
+    fireworks   dataset.fireworks.jsonl   {"messages": [...]}, records over
+                                          Fireworks' 8192 token max context
+                                          length (chat template included)
+                                          left out
+    completion  dataset.completion.jsonl  {"prompt": "...", "completion": "..."}
+                                          for local experiments
+
+dataset.jsonl itself is already in Together's {"messages": [...]} format, so
+Together has no writer of its own.
+
+Writers with a context limit need token counts from the training tokenizer
+(generate_dataset.py --tokenizer), so that no record is left out on an
+estimate.
+
+Each writer runs in its own thread with a bounded queue of records, so a
+slow writer doesn't hold up the others or the rest of the pipeline.
+
+To add a provider, subclass DatasetWriter and decorate it with
+@register_writer; it can then be selected with generate_dataset.py --provider.
+"""
+
+import json
+import queue
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from dataset_tokens import MAX_CONTEXT_TOKENS, templated_tokens
+
+# Records buffered per writer before the pipeline waits for it
+WRITER_QUEUE_SIZE = 64
+
+OUTPUT_WRITERS = {}
+
+
+def register_writer(writer_class):
+    """
+    Class decorator that makes a DatasetWriter selectable by its name.
+    """
+    OUTPUT_WRITERS[writer_class.name] = writer_class
+    return writer_class
+
+
+class DatasetWriter(ABC):
+    """
+    Writes records in one provider's format to dataset.<name>.jsonl.
+
+    Subclasses set name, and optionally max_tokens, and implement format().
+    max_tokens applies to record_tokens(), the length the provider sees.
+
+    Attributes:
+        path: The output JSONL file
+        records: Number of records written
+        tokens: Total tokens of the records written
+        too_long: Names of the records left out for exceeding max_tokens
+    """
+
+    name = None
+    max_tokens = None
+
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / f"dataset.{self.name}.jsonl"
+        self.records = 0
+        self.tokens = 0
+        self.too_long = []
+
+    @abstractmethod
+    def format(self, record):
+        """
+        The JSON object written for a DatasetRecord.
+        """
+
+    def record_tokens(self, record):
+        """
+        Tokens of a record in this writer's format.
+        """
+        return record.total_tokens
+
+    def write_all(self, records):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for record in records:
+                tokens = self.record_tokens(record)
+                if self.max_tokens and tokens > self.max_tokens:
+                    self.too_long.append(record.name)
+                    continue
+                f.write(json.dumps(self.format(record), ensure_ascii=False) + "\n")
+                self.records += 1
+                self.tokens += tokens
+
+
+@register_writer
+class FireworksWriter(DatasetWriter):
+    """
+    Chat messages, which Fireworks renders with the model's chat template.
+    """
+
+    name = "fireworks"
+    # Max Context Length of the Fireworks fine-tuning jobs
+    max_tokens = MAX_CONTEXT_TOKENS
+
+    def format(self, record):
+        return {"messages": record.data["messages"]}
+
+    def record_tokens(self, record):
+        return templated_tokens(record)
+
+
+@register_writer
+class CompletionWriter(DatasetWriter):
+    """
+    Raw prompt/completion pairs: the conversation up to the last assistant
+    message as plain text, and that message as the completion.
+    """
+
+    name = "completion"
+
+    def format(self, record):
+        messages = record.data["messages"]
+        prompt = "\n\n".join(
+            f"{message['role'].upper()}:\n{message['content']}" for message in messages[:-1]
+        )
+        return {"prompt": f"{prompt}\n\nASSISTANT:\n", "completion": messages[-1]["content"]}
+
+
+def fan_out_records(records, writers, queue_size: int = WRITER_QUEUE_SIZE):
+    """
+    Hand every record to each writer, with each writer in its own thread.
+
+    This is a pass-through generator like write_dataset_jsonl. Records must
+    not be modified after they have been yielded.
+
+    Args:
+        records: Iterable of DatasetRecord with token counts
+        writers: List of DatasetWriter
+        queue_size: Records buffered per writer
+
+    Yields:
+        Each DatasetRecord after it has been queued for every writer
+
+    Raises:
+        The first exception raised by a writer, once all records are queued
+    """
+    done = object()
+    queues = [queue.Queue(queue_size) for _ in writers]
+    errors = []
+
+    def drain(record_queue):
+        while True:
+            record = record_queue.get()
+            if record is done:
+                return
+            yield record
+
+    def run(writer, record_queue):
+        writer_records = drain(record_queue)
+        try:
+            writer.write_all(writer_records)
+        except Exception as error:
+            errors.append(error)
+            # Keep consuming so the pipeline doesn't block on a full queue
+            for _ in writer_records:
+                pass
+
+    threads = [
+        threading.Thread(target=run, args=(writer, record_queue), name=f"{writer.name}-writer")
+        for writer, record_queue in zip(writers, queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for record in records:
+            for record_queue in queues:
+                record_queue.put(record)
+            yield record
+    finally:
+        for record_queue in queues:
+            record_queue.put(done)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def print_writer_statistics(writers):
+    print("\n" + "=" * 60)
+    print("PROVIDER OUTPUTS")
+    print("=" * 60)
+    print(f"{'Provider':<20} {'Records':<10} {'Tokens':<15} {'Too Long':<15}")
+    print("-" * 60)
+    for writer in writers:
+        print(f"{writer.name:<20} {writer.records:<10} {writer.tokens:<15,} {len(writer.too_long):<15}")
+    print("=" * 60)
+    for writer in writers:
+        for name in writer.too_long:
+            print(f"Not in {writer.path.name} (over {writer.max_tokens:,} tokens): {name}")
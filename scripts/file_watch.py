@@ -0,0 +1,167 @@
+"""
+Wait for the scripts in the data directory to change.
+
+On Linux, changes are picked up with inotify, called through ctypes so no
+extra packages are needed. Elsewhere, or if inotify isn't available, the
+data directory is polled for scripts whose mtime or size changed.
+
+Editors often save a file in several steps (write a temp file, rename it
+over the original), so after the first change both watchers wait
+DEBOUNCE_SECONDS for the rest of the burst and report it as one batch.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+DEBOUNCE_SECONDS = 0.05
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def snapshot_scripts(data_dir: Path):
+    """
+    Map every script under the data directory to its (mtime, size).
+    """
+    stamps = {}
+    for script_path in data_dir.rglob("*.py"):
+        try:
+            stat = script_path.stat()
+        except FileNotFoundError:
+            continue
+        stamps[script_path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class PollingWatcher:
+    """
+    Portable watcher that compares snapshots of the data directory.
+    """
+
+    name = "polling"
+
+    def __init__(self, data_dir: Path, interval: float = 0.5):
+        self.data_dir = data_dir
+        self.interval = interval
+        self.stamps = snapshot_scripts(data_dir)
+
+    def changes(self):
+        stamps = snapshot_scripts(self.data_dir)
+        changed = {
+            script_path
+            for script_path in stamps.keys() | self.stamps.keys()
+            if stamps.get(script_path) != self.stamps.get(script_path)
+        }
+        self.stamps = stamps
+        return changed
+
+    def wait(self):
+        """
+        Block until scripts change.
+
+        Returns:
+            Set of paths of the scripts that were added, edited or deleted
+        """
+        while True:
+            time.sleep(self.interval)
+            changed = self.changes()
+            if changed:
+                time.sleep(DEBOUNCE_SECONDS)
+                return changed | self.changes()
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Linux watcher with one inotify watch per directory under the data directory.
+
+    Raises:
+        OSError: if inotify isn't available
+    """
+
+    name = "inotify"
+
+    def __init__(self, data_dir: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories = {}
+        for directory, _, _ in os.walk(data_dir):
+            self.add_watch(Path(directory))
+
+    def add_watch(self, directory: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Can't watch {directory}")
+        self.directories[wd] = directory
+
+    def read_events(self):
+        changed = set()
+        buffer = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                # Watch new directories, e.g. a new game or its bugs/ directory
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_watch(path)
+                    changed.update(path.rglob("*.py"))
+            elif path.suffix == ".py":
+                changed.add(path)
+        return changed
+
+    def wait(self):
+        """
+        Block until scripts change.
+
+        Returns:
+            Set of paths of the scripts that were added, edited or deleted
+        """
+        changed = set()
+        while not changed:
+            changed = self.read_events()
+        while select.select([self.fd], [], [], DEBOUNCE_SECONDS)[0]:
+            changed |= self.read_events()
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(data_dir: Path, poll_interval: float = 0.5):
+    """
+    Watch the data directory with inotify if possible, or else by polling.
+    """
+    try:
+        return InotifyWatcher(data_dir)
+    except (OSError, AttributeError):
+        # AttributeError: a libc without the inotify functions
+        return PollingWatcher(data_dir, poll_interval)
@@ -0,0 +1,289 @@
+"""
+Golden framebuffer fingerprints, to check that scripts still render the same.
+
+While a script runs in game_harness.py, the display surface is hashed every
+K frames. The hash reads the surface's pixel buffer directly (through
+Surface.get_buffer()), without converting it to Python objects.
+
+`record` runs each script on recorded input and stores its fingerprints as a
+golden file, next to the input trace it was made with:
+
+    output/golden/galaga/galaga.py.golden
+    output/golden/galaga/galaga.py.trace
+
+`compare` replays the stored trace into the script (or, with --against,
+into another script, e.g. a oneshot copy of a remix) and reports the first
+frame whose fingerprint differs from the golden one.
+
+A golden file is laid out as:
+
+    header   "PDFPR001", frame interval, fingerprint count, metadata length
+             (little-endian uint32 each)
+    metadata JSON {"script": ..., "script_sha256": ..., "size": [w, h], "result": ...}
+    digests  one 8-byte BLAKE2b digest of the display surface per fingerprint,
+             taken after frames K, 2K, 3K, ...
+
+setup:
+    pip install pygame
+
+usage:
+    python frame_fingerprint.py record [SCRIPT ...] [--every K] [--frames N] [--seed S] [--trace TRACE]
+    python frame_fingerprint.py compare [SCRIPT ...] [--against SCRIPT] [--save-image diverged.png]
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import sys
+from pathlib import Path
+
+from game_harness import DEFAULT_FRAMES, run_game
+from input_trace import InputTrace
+
+GOLDEN_MAGIC = b"PDFPR001"
+GOLDEN_HEADER = struct.Struct("<8sIII")
+FINGERPRINT_BYTES = 8
+DEFAULT_INTERVAL = 10
+
+
+def surface_fingerprint(surface):
+    """
+    Hash of a surface's pixels, read straight from its buffer.
+    """
+    return hashlib.blake2b(surface.get_buffer(), digest_size=FINGERPRINT_BYTES).digest()
+
+
+class FrameFingerprints:
+    """
+    Collects the display fingerprints of a run for game_harness.run_game.
+
+    Attributes:
+        every: Frames between fingerprints
+        digests: The fingerprints taken so far
+        expected: Golden fingerprints to compare with, or None
+        first_divergence: First frame whose fingerprint differs from the
+            golden one, or None
+        size: Size of the display surface
+    """
+
+    def __init__(self, every: int = DEFAULT_INTERVAL, expected=None, save_image: Path = None):
+        self.every = every
+        self.digests = []
+        self.expected = expected
+        self.first_divergence = None
+        self.size = None
+        self._save_image = save_image
+
+    def capture(self, pygame, frame: int):
+        """
+        Fingerprint the display if this frame is due. Called after every frame.
+        """
+        if frame % self.every:
+            return
+        surface = pygame.display.get_surface()
+        if surface is None:
+            return
+        self.size = surface.get_size()
+        digest = surface_fingerprint(surface)
+        index = len(self.digests)
+        self.digests.append(digest)
+
+        if self.expected is None or self.first_divergence is not None:
+            return
+        if index >= len(self.expected) or self.expected[index] != digest:
+            self.first_divergence = frame
+            if self._save_image:
+                pygame.image.save(surface, str(self._save_image))
+
+
+def write_golden(path: Path, fingerprints: FrameFingerprints, metadata: dict):
+    encoded = json.dumps(dict(metadata, size=fingerprints.size)).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(GOLDEN_HEADER.pack(GOLDEN_MAGIC, fingerprints.every, len(fingerprints.digests), len(encoded)))
+        f.write(encoded)
+        f.write(b"".join(fingerprints.digests))
+
+
+def read_golden(path: Path):
+    """
+    Returns:
+        (frame interval, list of digests, metadata dict)
+    """
+    data = Path(path).read_bytes()
+    magic, every, count, metadata_length = GOLDEN_HEADER.unpack_from(data)
+    if magic != GOLDEN_MAGIC:
+        raise ValueError(f"{path} is not a golden fingerprint file")
+    start = GOLDEN_HEADER.size
+    metadata = json.loads(data[start : start + metadata_length])
+    start += metadata_length
+    digests = [
+        data[start + i * FINGERPRINT_BYTES : start + (i + 1) * FINGERPRINT_BYTES]
+        for i in range(count)
+    ]
+    return every, digests, metadata
+
+
+def golden_paths(golden_dir: Path, name: str):
+    """
+    The golden fingerprint file and input trace of a script.
+    """
+    return golden_dir / f"{name}.golden", golden_dir / f"{name}.trace"
+
+
+def record_golden(
+    data_dir: Path,
+    name: str,
+    golden_dir: Path,
+    every: int = DEFAULT_INTERVAL,
+    frames: int = DEFAULT_FRAMES,
+    seed: int = 0,
+    trace: InputTrace = None,
+):
+    """
+    Run a script and store its fingerprints and input as its golden files.
+
+    Args:
+        data_dir: Path to the data directory
+        name: Script name relative to the data directory
+        golden_dir: Directory of the golden files
+        every: Frames between fingerprints
+        frames, seed: Frames and seed of the monkey input, if there's no trace
+        trace: InputTrace to replay instead of the monkey input
+
+    Returns:
+        (result dict of the run, FrameFingerprints)
+    """
+    golden_file, trace_file = golden_paths(golden_dir, name)
+    fingerprints = FrameFingerprints(every)
+    record = InputTrace()
+    result = run_game(data_dir / name, frames, seed, trace, record, fingerprints=fingerprints)
+
+    metadata = dict(record.metadata, script=name)
+    write_golden(golden_file, fingerprints, metadata)
+    record.metadata = metadata
+    record.save(trace_file)
+    return result, fingerprints
+
+
+def compare_golden(
+    data_dir: Path,
+    name: str,
+    golden_dir: Path,
+    against: str = None,
+    save_image: Path = None,
+):
+    """
+    Replay a script's golden input and compare its fingerprints.
+
+    Args:
+        data_dir: Path to the data directory
+        name: Script name of the golden files
+        golden_dir: Directory of the golden files
+        against: Script to run instead of the golden files' own script
+        save_image: Save the display at the first divergent frame to this image
+
+    Returns:
+        Dict with the "script" that was run, the "golden" script, the
+        "fingerprints" compared, and the "first_divergence" frame (None if
+        every fingerprint matched)
+    """
+    golden_file, trace_file = golden_paths(golden_dir, name)
+    every, expected, _ = read_golden(golden_file)
+    fingerprints = FrameFingerprints(every, expected, save_image)
+    script = against or name
+    run_game(data_dir / script, replay=InputTrace.load(trace_file), fingerprints=fingerprints)
+
+    first_divergence = fingerprints.first_divergence
+    if first_divergence is None and len(fingerprints.digests) < len(expected):
+        # The run ended before the golden one did
+        first_divergence = (len(fingerprints.digests) + 1) * every
+    return {
+        "script": script,
+        "golden": name,
+        "fingerprints": len(expected),
+        "first_divergence": first_divergence,
+    }
+
+
+def main():
+    from generate_dataset import collect_script_files
+
+    parser = argparse.ArgumentParser(
+        description="Record golden framebuffer fingerprints of the scripts in data/, or compare scripts against them"
+    )
+    parser.add_argument(
+        "--golden-dir",
+        type=Path,
+        default=Path("output") / "golden",
+        help="Directory of the golden files (default: output/golden)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Record golden fingerprints")
+    record_parser.add_argument("scripts", nargs="*", help="Script names relative to data/ (default: all scripts)")
+    record_parser.add_argument(
+        "--every",
+        type=int,
+        default=DEFAULT_INTERVAL,
+        help=f"Frames between fingerprints (default: {DEFAULT_INTERVAL})",
+    )
+    record_parser.add_argument(
+        "--frames",
+        type=int,
+        default=DEFAULT_FRAMES,
+        help=f"Frames of monkey input to record (default: {DEFAULT_FRAMES})",
+    )
+    record_parser.add_argument("--seed", type=int, default=0, help="Seed of the monkey input (default: 0)")
+    record_parser.add_argument("--trace", type=Path, help="Replay this input trace instead of monkey input")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare scripts against their golden fingerprints")
+    compare_parser.add_argument(
+        "scripts", nargs="*", help="Script names relative to data/ (default: every script with golden files)"
+    )
+    compare_parser.add_argument(
+        "--against",
+        help="Run this script on the golden input of the (single) given script instead, e.g. its oneshot copy",
+    )
+    compare_parser.add_argument("--save-image", type=Path, help="Save the first divergent frame to this image")
+
+    args = parser.parse_args()
+
+    data_dir = Path(__file__).parent.parent / "data"
+
+    if args.command == "record":
+        names = args.scripts or [
+            path.relative_to(data_dir).as_posix() for path in collect_script_files(data_dir)
+        ]
+        trace = InputTrace.load(args.trace) if args.trace else None
+        for name in names:
+            result, fingerprints = record_golden(
+                data_dir, name, args.golden_dir, args.every, args.frames, args.seed, trace
+            )
+            print(f"{name:<60} {len(fingerprints.digests):>5} fingerprints  {result['status']}")
+        print(f"\nGolden files saved to: {args.golden_dir.absolute()}")
+        return
+
+    names = args.scripts or sorted(
+        path.relative_to(args.golden_dir).as_posix()[: -len(".golden")]
+        for path in args.golden_dir.rglob("*.golden")
+    )
+    if args.against and len(names) != 1:
+        parser.error("--against needs exactly one golden script")
+
+    diverged = 0
+    for name in names:
+        report = compare_golden(data_dir, name, args.golden_dir, args.against, args.save_image)
+        if report["first_divergence"] is None:
+            print(f"{report['script']:<60} matches ({report['fingerprints']} fingerprints)")
+        else:
+            diverged += 1
+            print(f"{report['script']:<60} DIVERGED at frame {report['first_divergence']}")
+    print(f"\n{len(names) - diverged} matched, {diverged} diverged")
+    if diverged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
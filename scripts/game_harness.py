@@ -0,0 +1,386 @@
+"""
+Run a pygame script headless for a fixed number of frames.
+
+The script runs in this process under SDL's dummy video and audio drivers,
+with pygame patched so that:
+- every pygame.display.flip() or update() counts a frame, and the script is
+  stopped once it has drawn the requested number of frames
+- time is virtual (see virtual_clock.py): Clock.tick() advances it by one
+  frame and returns at once, so frames run as fast as the CPU allows, and
+  get_ticks() and set_timer() follow the virtual time
+- a seeded "monkey" presses and releases the keys the games use (arrows,
+  WASD, space, return and R), both through the event queue and
+  pygame.key.get_pressed(). Q and the window's X button are never pressed.
+
+The random module is seeded too, so a run with the same seed is repeatable.
+
+The input of a run can be recorded with --record and replayed, into the same
+script or a variant of it, with --replay (see input_trace.py). --play opens
+a real window with keyboard input instead, paced to real time, to record a
+play session.
+
+The result is a dict (or a JSON file, from the command line) like:
+
+    {"status": "crashed", "frames": 212, "seconds": 0.41, "virtual_ms": 3533,
+     "error_type": "AttributeError",
+     "error": "'Spaceship' object has no attribute 'sprites'",
+     "error_line": 273,
+     "error_code": "hit_aliens = pygame.sprite.spritecollide(...)",
+     "error_frames": [[311, "<module>", "main()"], [273, "main", "hit_aliens = ..."]]}
+
+where status is "survived" (still running after the last frame), "exited"
+(the script ended by itself), "crashed" or "memory" (a MemoryError). A
+replay also lists the fields in which its result differs from the recorded
+one under "replay_differences", so an empty list means the replay matched.
+error_frames are the [line, function, source line] frames of the traceback
+that are in the script itself, outermost first.
+
+setup:
+    pip install pygame
+
+usage: `python game_harness.py SCRIPT [--frames N] [--seed S] [--memory-mb MB] [--result result.json]
+                                     [--record TRACE | --replay TRACE] [--play]`
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import runpy
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from input_trace import InputTrace, TraceRecorder, TraceReplay, key_state
+from virtual_clock import patch_attribute, virtual_time
+
+DEFAULT_FRAMES = 300
+
+# Keys the monkey presses, by pygame constant name
+MONKEY_KEYS = (
+    "K_LEFT",
+    "K_RIGHT",
+    "K_UP",
+    "K_DOWN",
+    "K_a",
+    "K_d",
+    "K_w",
+    "K_s",
+    "K_SPACE",
+    "K_RETURN",
+    "K_r",
+)
+
+# Per frame chance of pressing another key, and of releasing a held one
+PRESS_CHANCE = 0.2
+RELEASE_CHANCE = 0.15
+
+
+class FrameLimitReached(BaseException):
+    """
+    Raised from pygame.display.flip() to stop a script after its last frame.
+
+    A BaseException, so a script's own `except Exception` doesn't catch it.
+    """
+
+
+def limit_memory(megabytes: int):
+    """
+    Cap the address space of this process, so a runaway script gets a
+    MemoryError instead of taking the machine down.
+    """
+    import resource
+
+    limit = megabytes * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class LiveInput:
+    """
+    Input source that passes the real event queue and keyboard through.
+
+    Every input source has get_events() and get_pressed(), which stand in
+    for pygame.event.get() and pygame.key.get_pressed(), and end_frame(),
+    which is called after every frame.
+    """
+
+    def __init__(self, pygame):
+        self.pygame = pygame
+        self._get_events = pygame.event.get
+        self._get_pressed = pygame.key.get_pressed
+        self._pressed = None
+
+    def get_events(self, *args, **kwargs):
+        return self._get_events(*args, **kwargs)
+
+    def get_pressed(self):
+        # One snapshot per frame, so every call in a frame agrees
+        if self._pressed is None:
+            self._pressed = self._get_pressed()
+        return self._pressed
+
+    def end_frame(self):
+        self._pressed = None
+
+
+class MonkeyInput(LiveInput):
+    """
+    Input source that randomly presses and releases keys once per frame.
+    """
+
+    def __init__(self, pygame, rng: random.Random):
+        super().__init__(pygame)
+        self.rng = rng
+        self.keys = [getattr(pygame, name) for name in MONKEY_KEYS]
+        self._scancodes = None
+        self.held = set()
+
+    @property
+    def scancodes(self):
+        # Keys only map to scancodes once the script has initialized pygame
+        if self._scancodes is None:
+            self._scancodes = key_scancodes(self.pygame, self.keys)
+        return self._scancodes
+
+    def post(self, event_type, key):
+        unicode = chr(key) if key < 128 else ""
+        self.pygame.event.post(
+            self.pygame.event.Event(
+                event_type, key=key, mod=0, unicode=unicode, scancode=self.scancodes[key]
+            )
+        )
+
+    def end_frame(self):
+        if self.held and self.rng.random() < RELEASE_CHANCE:
+            key = self.rng.choice(sorted(self.held))
+            self.held.discard(key)
+            self.post(self.pygame.KEYUP, key)
+        if self.rng.random() < PRESS_CHANCE:
+            key = self.rng.choice(self.keys)
+            if key not in self.held:
+                self.held.add(key)
+                self.post(self.pygame.KEYDOWN, key)
+
+    def get_pressed(self):
+        return key_state(self.pygame, [self.scancodes[key] for key in self.held])
+
+
+def key_scancodes(pygame, keys):
+    """
+    Map key constants to the scancodes pygame.key.get_pressed() is indexed by.
+    """
+    scancodes = {}
+    for scancode in range(512):
+        state = key_state(pygame, [scancode])
+        for key in keys:
+            if key not in scancodes and state[key]:
+                scancodes[key] = scancode
+    return scancodes
+
+
+def error_location(error: BaseException, script_path: Path):
+    """
+    Line number and source line in the script where an exception was raised.
+    """
+    if isinstance(error, SyntaxError) and error.filename == str(script_path):
+        return error.lineno, (error.text or "").strip()
+    for frame in reversed(traceback.extract_tb(error.__traceback__)):
+        if frame.filename == str(script_path):
+            return frame.lineno, frame.line
+    return None, None
+
+
+def error_frames(error: BaseException, script_path: Path):
+    """
+    The frames of an exception's traceback that are in the script, outermost first.
+    """
+    return [
+        [frame.lineno, frame.name, frame.line]
+        for frame in traceback.extract_tb(error.__traceback__)
+        if frame.filename == str(script_path)
+    ]
+
+
+def error_type_name(error: BaseException):
+    """
+    Exception type as a traceback prints it, e.g. "AttributeError" or "pygame.error".
+    """
+    error_type = type(error)
+    if error_type.__module__ == "builtins":
+        return error_type.__qualname__
+    return f"{error_type.__module__}.{error_type.__qualname__}"
+
+
+def run_game(
+    script_path: Path,
+    frames: int = DEFAULT_FRAMES,
+    seed: int = 0,
+    replay: InputTrace = None,
+    record: InputTrace = None,
+    play: bool = False,
+    fingerprints=None,
+):
+    """
+    Run a pygame script until it has drawn the given number of frames.
+
+    Args:
+        script_path: The pygame script
+        frames: Frames to run the script for, or None to run it until it
+            ends. Ignored when replaying, which runs for the frames of the trace.
+        seed: Seed of the random module and the monkey input. Ignored when
+            replaying, which uses the seed of the trace.
+        replay: InputTrace to play back instead of the monkey input
+        record: Empty InputTrace that receives the input of the run
+        play: Run in a real window with keyboard input, paced to real time,
+            instead of headless with the monkey input
+        fingerprints: frame_fingerprint.FrameFingerprints that receives
+            fingerprints of the display
+
+    Returns:
+        Result dict, see the module docstring
+    """
+    if not play:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    import pygame
+
+    script_path = Path(script_path).absolute()
+    if replay is not None:
+        seed = replay.seed
+        frames = len(replay.frames)
+        source = TraceReplay(pygame, replay)
+    elif play:
+        source = LiveInput(pygame)
+    else:
+        source = MonkeyInput(pygame, random.Random(f"monkey/{seed}"))
+    if record is not None:
+        record.seed = seed
+        source = TraceRecorder(source, record)
+    random.seed(seed)
+    frame_count = 0
+
+    def end_frame():
+        nonlocal frame_count
+        frame_count += 1
+        if fingerprints is not None:
+            fingerprints.capture(pygame, frame_count)
+        source.end_frame()
+        if frames is not None and frame_count >= frames:
+            raise FrameLimitReached
+
+    result = {"status": "exited", "frames": 0}
+    start = time.perf_counter()
+    with ExitStack() as patches:
+        flip = patches.enter_context(patch_attribute(pygame.display, "flip", None))
+        update = patches.enter_context(patch_attribute(pygame.display, "update", None))
+
+        def patched_flip():
+            flip()
+            end_frame()
+
+        def patched_update(*args, **kwargs):
+            update(*args, **kwargs)
+            end_frame()
+
+        pygame.display.flip = patched_flip
+        pygame.display.update = patched_update
+        clock = patches.enter_context(virtual_time(pygame, real_time=play))
+        patches.enter_context(patch_attribute(pygame.event, "get", source.get_events))
+        patches.enter_context(patch_attribute(pygame.key, "get_pressed", source.get_pressed))
+        patches.enter_context(patch_attribute(sys, "argv", [str(script_path)]))
+
+        try:
+            runpy.run_path(str(script_path), run_name="__main__")
+        except FrameLimitReached:
+            result["status"] = "survived"
+        except SystemExit:
+            pass
+        except Exception as error:
+            error_line, error_code = error_location(error, script_path)
+            result.update(
+                status="memory" if isinstance(error, MemoryError) else "crashed",
+                error_type=error_type_name(error),
+                error=str(error),
+                error_line=error_line,
+                error_code=error_code,
+                error_frames=error_frames(error, script_path),
+            )
+        finally:
+            pygame.quit()
+
+    result["frames"] = frame_count
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["virtual_ms"] = clock.ticks
+
+    if record is not None:
+        if result["status"] != "survived":
+            source.finish()
+        record.metadata = {
+            "script": str(script_path),
+            "script_sha256": hashlib.sha256(script_path.read_bytes()).hexdigest(),
+            "result": {key: value for key, value in result.items() if key != "seconds"},
+        }
+    return result
+
+
+def replay_differences(recorded: dict, replayed: dict):
+    """
+    The result fields in which a replay differs from the recorded run.
+    """
+    fields = ("status", "frames", "virtual_ms", "error_type", "error", "error_line")
+    return [field for field in fields if recorded.get(field) != replayed.get(field)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a pygame script headless for a number of frames")
+    parser.add_argument("script", type=Path, help="The pygame script to run")
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=DEFAULT_FRAMES,
+        help=f"Frames to run the script for (default: {DEFAULT_FRAMES})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--memory-mb", type=int, help="Address space limit in MB")
+    parser.add_argument("--result", type=Path, help="Write the result to this JSON file instead of printing it")
+    parser.add_argument("--record", type=Path, help="Record the input of the run to this trace file")
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        help="Play back the input of this trace file instead of the monkey input, and compare the result with the recorded one",
+    )
+    parser.add_argument(
+        "--play",
+        action="store_true",
+        help="Play the game in a real window, paced to real time, until it ends (use with --record)",
+    )
+
+    args = parser.parse_args()
+
+    if args.record and args.replay:
+        parser.error("--record and --replay can't be combined")
+    if args.memory_mb:
+        limit_memory(args.memory_mb)
+
+    replay = InputTrace.load(args.replay) if args.replay else None
+    record = InputTrace() if args.record else None
+    frames = None if args.play else args.frames
+    result = run_game(args.script, frames, args.seed, replay, record, args.play)
+
+    if record is not None:
+        record.save(args.record)
+    if replay is not None:
+        result["replay_differences"] = replay_differences(replay.metadata["result"], result)
+
+    if args.result:
+        args.result.write_text(json.dumps(result), encoding="utf-8")
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,38 +2,79 @@
 This script takes the pygame scripts from the data directory and formats them
 into a JSONL file compatible with Together.ai fine-tuning.
 
-usage: `python generate_dataset.py`
+usage: `python generate_dataset.py [--jobs N] [--no-cache] [--tokenizer tokenizer.json]
+                                   [--max-tokens N [--budget-policy report|drop|compress]]
+                                   [--shard-size MB [--compression gz|zst]] [--pack-window N --tokenizer tokenizer.json]
+                                   [--max-per-cluster N] [--chain-conversations]
+                                   [--remix-format full|diff|search-replace]
+                                   [--prompt-version VERSION [VERSION ...]]
+                                   [--minify-context] [--family NAME [NAME ...]] [--watch]
+                                   [--export parquet|arrow [parquet|arrow]]
+                                   [--eval-fraction F [--split-seed N]]
+                                   [--provider fireworks|completion [...]]`
 """
 
+import argparse
+import hashlib
 import json
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+from code_minify import MinifyError, minify_code
+from dataset_arrow import EXPORT_FORMATS, write_columnar_dataset, write_dataset_card
+from dataset_graph import DatasetGraph, read_script_bytes, read_script_text
+from dataset_manifest import build_manifest, record_entry, write_manifest
+from dataset_packing import (
+    collect_packing_lengths,
+    print_packing_statistics,
+    write_packed_dataset,
+)
+from dataset_reader import patch_dataset_jsonl, write_dataset_index
+from dataset_shards import COMPRESSIONS, patch_dataset_shards, write_dataset_shards
+from dataset_split import assign_splits, print_split_statistics, split_path, write_dataset_splits
+from dataset_tokens import (
+    TokenStatistics,
+    annotate_token_counts,
+    load_token_counter,
+    split_prompt_completion,
+    templated_tokens,
+)
+from dataset_writers import OUTPUT_WRITERS, fan_out_records, print_writer_statistics
+from file_watch import open_watcher
+from near_duplicates import build_near_duplicate_index, cap_cluster_multiplicity, print_capped_clusters
+from prompt_templates import (
+    DEFAULT_PROMPT_VERSION,
+    TEMPLATE_VERSIONS,
+    ab_prompt_version,
+    get_templates,
+    print_template_costs,
+    template_fingerprint,
+)
+from remix_patches import PATCH_FORMATS, PatchError, make_patch
+from script_catalog import ScriptCatalog, UnknownFamilyError
+from script_metadata import count_code_lines, parse_script
 
-def format_create_game(script_content: str, create_prompt: str):
+
+def format_create_game(script_content: str, create_prompt: str, templates: dict = None):
     """
     Format a create game script into instruct data.
 
     Args:
         script_content: The content of the script file
         create_prompt: The game name/prompt (filename without extension, underscores as spaces)
+        templates: Prompt templates from prompt_templates.get_templates (defaults
+            to the default prompt version)
     """
+    templates = templates or get_templates()
     content = create_prompt
 
-    create_instructions = """You are an expert Python game developer. Generate a complete, working Python game using pygame based on the user's description.
-
-    Rules:
-    1. Use ONLY the pygame library - no external images, sounds, or files
-    2. Create everything (graphics, colors, shapes) using pygame's built-in drawing functions
-    3. Make the game fully playable and fun
-    4. Include proper game mechanics (win/lose conditions, scoring if appropriate)
-    5. Use proper pygame event handling and game loop
-    6. Add comments explaining key parts of the code
-    7. Make sure the game window closes properly when the user clicks the X button
-    8. Use reasonable colors and make the game visually appealing with pygame primitives
-
-    Generate ONLY the Python code wrapped in a markdown code block using triple backticks (```python). Do not include any explanations outside the code block."""
+    create_instructions = templates["create_system"]
 
-    create_input = f"Create a game: {content}"
+    create_input = templates["create_user"].format(content=content)
 
     # Format the output as a markdown code block
     formatted_output = f"```python\n{script_content}\n```"
@@ -47,7 +88,9 @@ def format_create_game(script_content: str, create_prompt: str):
     }
 
 
-def format_remix_game(script_content: str, base_game_content: str, remix_prompt: str):
+def format_remix_game(
+    script_content: str, base_game_content: str, remix_prompt: str, templates: dict = None
+):
     """
     Format a remix script into instruct data.
 
@@ -55,37 +98,65 @@ def format_remix_game(script_content: str, base_game_content: str, remix_prompt:
         script_content: The content of the remix script file
         base_game_content: The content of the base game script that was remixed
         remix_prompt: Infinity Arcade prompt for the remix
+        templates: Prompt templates from prompt_templates.get_templates
     """
+    templates = templates or get_templates()
 
     # Convert to variable name expected by Infinity Arcade
     mode_data = remix_prompt
     content = base_game_content
 
-    remix_instructions = """You are an expert Python game developer. You will be given an existing pygame game and a modification request. Your task is to modify the existing game according to the user's request while keeping it fully functional.
+    remix_instructions = templates["remix_system"]
+
+    remix_input = templates["remix_user"].format(content=content, mode_data=mode_data)
+
+    # Format the output as a markdown code block
+    formatted_output = f"```python\n{script_content}\n```"
+
+    return {
+        "messages": [
+            {"role": "system", "content": remix_instructions},
+            {"role": "user", "content": remix_input},
+            {"role": "assistant", "content": formatted_output},
+        ]
+    }
 
-    Rules:
-    1. Use ONLY the pygame library - no external images, sounds, or files
-    2. Keep the core game mechanics intact unless specifically asked to change them
-    3. Make the requested modifications while ensuring the game remains playable
-    4. Maintain proper pygame event handling and game loop
-    5. Add comments explaining the changes you made
-    6. Make sure the game window closes properly when the user clicks the X button
-    7. Use reasonable colors and make the game visually appealing with pygame primitives
 
-    Generate ONLY the complete modified Python code wrapped in a markdown code block using triple backticks (```python)."""
+def format_remix_patch_game(
+    patch: str,
+    base_game_content: str,
+    remix_prompt: str,
+    patch_format: str,
+    templates: dict = None,
+):
+    """
+    Format a remix script into instruct data whose target is a patch against
+    the base game instead of the complete modified file.
 
-    remix_input = f"""Here is the existing game code:
+    Args:
+        patch: Patch from remix_patches.make_patch
+        base_game_content: The content of the base game script that was remixed
+        remix_prompt: Infinity Arcade prompt for the remix
+        patch_format: "diff" or "search-replace"
+        templates: Prompt templates from prompt_templates.get_templates
+    """
+    templates = templates or get_templates()
 
-    ```python
-    {content}
-    ```
+    # Convert to variable name expected by Infinity Arcade
+    mode_data = remix_prompt
+    content = base_game_content
 
-    Please modify this game according to this request: {mode_data}
+    if patch_format == "diff":
+        remix_instructions = templates["remix_diff_system"]
+        fence = "diff"
+    else:
+        remix_instructions = templates["remix_search_replace_system"]
+        fence = "text"
 
-    Provide the complete modified game code."""
+    remix_input = templates["remix_patch_user"].format(content=content, mode_data=mode_data)
 
     # Format the output as a markdown code block
-    formatted_output = f"```python\n{script_content}\n```"
+    formatted_output = f"```{fence}\n{patch}\n```"
 
     return {
         "messages": [
@@ -96,7 +167,43 @@ def format_remix_game(script_content: str, base_game_content: str, remix_prompt:
     }
 
 
-def format_bug_fix_game(bug_content: str, fixed_content: str, error_trace: str):
+def format_remix_chain(base_game_content: str, remix_steps, templates: dict = None):
+    """
+    Format a chain of remixes into one multi-turn conversation.
+
+    The first turn is the same as format_remix_game. Every following turn asks
+    for the next remix of the game the assistant just produced, the way the
+    Infinity Arcade remix flow works, so the base code only appears once.
+
+    Args:
+        base_game_content: The content of the base game script at the start of the chain
+        remix_steps: List of (remix prompt, remix script content) tuples, in
+            the order the remixes were applied
+        templates: Prompt templates from prompt_templates.get_templates
+    """
+    templates = templates or get_templates()
+    first_prompt, first_content = remix_steps[0]
+    conversation = format_remix_game(
+        first_content, base_game_content, first_prompt, templates
+    )
+
+    for remix_prompt, script_content in remix_steps[1:]:
+        remix_input = templates["remix_followup_user"].format(mode_data=remix_prompt)
+
+        # Format the output as a markdown code block
+        formatted_output = f"```python\n{script_content}\n```"
+
+        conversation["messages"].append({"role": "user", "content": remix_input})
+        conversation["messages"].append(
+            {"role": "assistant", "content": formatted_output}
+        )
+
+    return conversation
+
+
+def format_bug_fix_game(
+    bug_content: str, fixed_content: str, error_trace: str, templates: dict = None
+):
     """
     Format a bug/fix pair into instruct data.
 
@@ -104,19 +211,15 @@ def format_bug_fix_game(bug_content: str, fixed_content: str, error_trace: str):
         bug_content: The content of the buggy script file (with CREATE and ERROR comments stripped)
         fixed_content: The content of the fixed script file
         error_trace: The error stack trace from the ERROR comments
+        templates: Prompt templates from prompt_templates.get_templates
     """
+    templates = templates or get_templates()
 
-    bug_fix_instructions = """You are a Python expert debugging a pygame script that has an error. Generate ONLY the fixed Python code wrapped in a markdown code block using triple backticks (```python). Do not include any explanations outside the code block."""
-
-    bug_fix_input = f"""Error:
-{error_trace}
-
-Script with error:
-```python
-{bug_content}
-```
+    bug_fix_instructions = templates["bug_fix_system"]
 
-Please fix the bug and provide the corrected code."""
+    bug_fix_input = templates["bug_fix_user"].format(
+        error_trace=error_trace, bug_content=bug_content
+    )
 
     # Format the output as a markdown code block
     formatted_output = f"```python\n{fixed_content}\n```"
@@ -130,12 +233,13 @@ Please fix the bug and provide the corrected code."""
     }
 
 
-def route_script_to_formatter(script_path: Path):
+def route_script_to_formatter(script_path: Path, prompt_version: str = DEFAULT_PROMPT_VERSION):
     """
     Route a script file to the appropriate formatter based on its content.
 
     Args:
         script_path: Path to the script file to process
+        prompt_version: Version of the prompt templates to format with
 
     Returns:
         Tuple of (formatted instruction data dict, game type string, line count)
@@ -145,126 +249,1145 @@ def route_script_to_formatter(script_path: Path):
     # Skip _fix.py files as they're processed with their bug counterparts
     if script_path.stem.endswith("_fix"):
         return None
-    
+
+    templates = get_templates(prompt_version)
+    script = parse_script(read_script_text(script_path))
+
     # Check if this is a bug file
     if script_path.stem.endswith("_bug"):
         # Find the corresponding fixed file
         fixed_filename = script_path.stem.replace("_bug", "_fix") + ".py"
         fixed_path = script_path.parent / fixed_filename
-        
+
         if not fixed_path.exists():
             raise FileNotFoundError(f"Fixed file not found: {fixed_path}")
-        
-        # Read both files
-        bug_content = script_path.read_text(encoding="utf-8")
-        fixed_content = fixed_path.read_text(encoding="utf-8")
-        
-        # Extract ERROR comments and strip them along with CREATE comment from bug file
-        bug_lines = bug_content.splitlines()
-        error_lines = []
-        start_index = 0
-        
-        for i, line in enumerate(bug_lines):
-            if line.startswith("# ERROR:"):
-                error_lines.append(line.replace("# ERROR: ", ""))
-            elif line.startswith("# CREATE:"):
-                continue
-            elif line.strip() == "":
-                # Skip empty lines after comments
-                if i < 10:  # Only skip early empty lines
-                    continue
-                else:
-                    start_index = i + 1
-                    break
-            else:
-                start_index = i
-                break
-        
-        error_trace = "\n".join(error_lines)
-        stripped_bug_content = "\n".join(bug_lines[start_index:])
-        
-        # Strip the CREATE comment from fixed file if present
-        fixed_lines = fixed_content.splitlines()
-        if len(fixed_lines) >= 1 and fixed_lines[0].startswith("# CREATE:"):
-            stripped_fixed_content = "\n".join(fixed_lines[2:])
-        else:
-            stripped_fixed_content = fixed_content
-        
-        # Count lines in the fixed version
-        line_count = len(
-            [line for line in stripped_fixed_content.splitlines() if line.strip()]
-        )
-        
+
+        # The header holds the ERROR comments and the CREATE comment, which
+        # are kept out of both the bug and the fixed code
+        fixed_script = parse_script(read_script_text(fixed_path))
+        error_trace = "\n".join(script.header["ERROR"])
+
         return (
-            format_bug_fix_game(stripped_bug_content, stripped_fixed_content, error_trace),
+            format_bug_fix_game(
+                script.body, fixed_script.body, error_trace, templates
+            ),
             "bug_fix",
-            line_count,
+            count_code_lines(fixed_script.body),
         )
-    
-    # Read the script content
-    script_content = script_path.read_text(encoding="utf-8")
-
-    # Check if it's a remix game by looking for SOURCE and REMIX comments
-    lines = script_content.splitlines()
 
-    if (
-        len(lines) >= 2
-        and lines[0].startswith("# SOURCE:")
-        and lines[1].startswith("# REMIX:")
-    ):
-        # This is a remix game
-        source_filename = lines[0].replace("# SOURCE:", "").strip()
-        remix_prompt = lines[1].replace("# REMIX:", "").strip()
-
-        # Strip the first 3 lines (SOURCE comment, REMIX comment, and empty line)
-        stripped_content = "\n".join(lines[3:])
-        line_count = len(
-            [line for line in stripped_content.splitlines() if line.strip()]
-        )
+    line_count = count_code_lines(script.body)
 
+    # Check if it's a remix game by looking for SOURCE and REMIX comments
+    if "SOURCE" in script.header and "REMIX" in script.header:
         # Find the base game file in the same directory
-        base_game_path = script_path.parent / source_filename
+        base_game_path = script_path.parent / script.header["SOURCE"]
 
         if not base_game_path.exists():
             raise FileNotFoundError(f"Base game file not found: {base_game_path}")
 
-        # Read the base game content
-        base_game_content = base_game_path.read_text(encoding="utf-8")
+        # Read the base game content (memoized, since many remixes share a base)
+        base_game_content = read_script_text(base_game_path)
 
         return (
-            format_remix_game(stripped_content, base_game_content, remix_prompt),
+            format_remix_game(
+                script.body, base_game_content, script.header["REMIX"], templates
+            ),
             "remix",
             line_count,
         )
-    elif len(lines) >= 1 and lines[0].startswith("# CREATE:"):
-        # This is a create game with an explicit CREATE prompt
-        create_prompt = lines[0].replace("# CREATE:", "").strip()
-
-        # Strip the first 2 lines (CREATE comment and empty line)
-        stripped_content = "\n".join(lines[2:])
-        line_count = len(
-            [line for line in stripped_content.splitlines() if line.strip()]
-        )
 
-        return format_create_game(stripped_content, create_prompt), "base", line_count
+    # Games without a CREATE comment are described by their file name
+    # (backward compatibility)
+    create_prompt = script.header.get("CREATE", script_path.stem.replace("_", " "))
+    return (
+        format_create_game(script.body, create_prompt, templates),
+        "base",
+        line_count,
+    )
+
+
+def collect_script_files(data_dir: Path):
+    """
+    Collect every script that should be routed into the dataset.
+
+    Game directories, their scripts and their bugs subdirectories are all
+    visited in sorted order so that two runs always produce the same output.
+    Directories and scripts whose names start with an underscore are skipped.
+
+    Args:
+        data_dir: Path to the data directory
+
+    Returns:
+        List of script paths in dataset order
+    """
+    script_files = []
+    for game_dir in sorted(data_dir.iterdir()):
+        if not game_dir.is_dir() or game_dir.name.startswith("_"):
+            continue
+
+        script_files.extend(sorted(game_dir.glob("[!_]*.py")))
+
+        bugs_dir = game_dir / "bugs"
+        if bugs_dir.is_dir():
+            script_files.extend(sorted(bugs_dir.glob("[!_]*.py")))
+
+    return script_files
+
+
+def route_script_worker(script_path: Path, prompt_version: str = DEFAULT_PROMPT_VERSION):
+    """
+    Process pool entry point for route_script_to_formatter.
+
+    Exceptions are returned as strings instead of raised so that one broken
+    script doesn't abort the whole pool.
+
+    Returns:
+        Tuple of (script path, routing result or None, error message or None)
+    """
+    try:
+        return script_path, route_script_to_formatter(script_path, prompt_version), None
+    except Exception as e:
+        return script_path, None, str(e)
+
+
+def route_scripts(script_files, jobs: int = 1, prompt_versions=None):
+    """
+    Route scripts to their formatters, optionally across a process pool.
+
+    Results are yielded in the same order as script_files regardless of
+    which worker finishes first.
+
+    Args:
+        script_files: List of script paths, already in dataset order
+        jobs: Number of worker processes (1 routes everything in this process)
+        prompt_versions: Prompt version of each script (defaults to the
+            default prompt version for all of them)
+    """
+    if prompt_versions is None:
+        prompt_versions = [DEFAULT_PROMPT_VERSION] * len(script_files)
+
+    if jobs <= 1:
+        for script_file, prompt_version in zip(script_files, prompt_versions):
+            yield route_script_worker(script_file, prompt_version)
+        return
+
+    # Keep a bounded window of in-flight scripts so finished records don't pile
+    # up in memory when the consumer (e.g. the JSONL writer) is slower
+    max_in_flight = jobs * 4
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for script_file, prompt_version in zip(script_files, prompt_versions):
+            pending.append(
+                executor.submit(route_script_worker, script_file, prompt_version)
+            )
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Bump this when the layout of cached results changes
+BUILD_CACHE_VERSION = 3
+
+# Modules the formatters depend on, besides this script
+FORMATTER_MODULES = (
+    "code_minify.py",
+    "dataset_graph.py",
+    "prompt_templates.py",
+    "remix_patches.py",
+    "script_metadata.py",
+)
+
+
+def formatter_fingerprint():
+    """
+    Hash of this script and the modules its formatters depend on, so that
+    editing a formatter invalidates the whole cache.
+
+    Template edits are covered separately by each key's template fingerprint.
+    """
+    digest = hashlib.sha256()
+    script_dir = Path(__file__).parent
+    for path in [Path(__file__)] + [script_dir / name for name in FORMATTER_MODULES]:
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def script_cache_key(graph: DatasetGraph, name: str, fingerprint: str, prompt_version: str):
+    """
+    Compute the SHA-256 build cache key of a script and its dependencies.
+
+    A remix depends on the base script named in its `# SOURCE:` comment, and a
+    `_bug.py` file depends on its `_fix.py` partner, so editing a base game
+    invalidates exactly the remixes that embed it.
+
+    Args:
+        graph: DatasetGraph containing the script
+        name: Script name relative to the data directory
+        fingerprint: formatter_fingerprint(), mixed into every key
+        prompt_version: Prompt version the script is formatted with
+
+    Returns:
+        Hex digest string
+    """
+    # The file name matters too: routing depends on the _bug/_fix suffix and
+    # scripts without a CREATE comment use their name as the prompt
+    digest = hashlib.sha256(f"{BUILD_CACHE_VERSION}:{fingerprint}".encode("utf-8"))
+    digest.update(f"{prompt_version}:{template_fingerprint(prompt_version)}".encode("utf-8"))
+    script_path = graph.nodes[name].path
+    digest.update(script_path.name.encode("utf-8"))
+    digest.update(read_script_bytes(script_path))
+    for dependency in graph.dependencies(name):
+        digest.update(dependency.name.encode("utf-8"))
+        if dependency.exists():
+            digest.update(read_script_bytes(dependency))
+    return digest.hexdigest()
+
+
+def load_cached_result(cache_dir: Path, key: str):
+    """
+    Load a cached routing result.
+
+    Returns:
+        Tuple of (hit, result) where result is the route_script_to_formatter
+        return value (which may itself be None for _fix.py files)
+    """
+    cache_path = cache_dir / f"{key}.json"
+    try:
+        result = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return False, None
+    return True, tuple(result) if result is not None else None
+
+
+def store_cached_result(cache_dir: Path, key: str, result):
+    """
+    Atomically write a routing result into the cache so an interrupted run
+    can't leave a corrupt entry behind.
+    """
+    cache_path = cache_dir / f"{key}.json"
+    tmp_path = cache_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(cache_path)
+
+
+def prune_build_cache(cache_dir: Path, live_keys):
+    """
+    Delete cached results that no script in the data directory maps to anymore.
+    """
+    for cache_path in cache_dir.glob("*.json"):
+        if cache_path.stem not in live_keys:
+            cache_path.unlink()
+
+
+@dataclass
+class DatasetRecord:
+    """
+    One routed script on its way to the dataset file.
+
+    Attributes:
+        name: Script path relative to the data directory, e.g. "snake/snake.py"
+        data: Formatted instruction data dict (what gets written to the JSONL file)
+        game_type: "base", "remix", or "bug_fix"
+        line_count: Non-blank lines of code in the assistant completion
+        prompt_tokens: Tokens in the system and user messages
+        completion_tokens: Tokens in the assistant message
+        total_tokens: prompt_tokens + completion_tokens
+        prompt_version: Version of the prompt templates the record was formatted with
+        target_format: "full", or the patch format of a remix converted by
+            convert_remix_targets
+        minified_context: Whether the code in the prompt has been minified,
+            see minify_prompt_context
+        sha256: Hash of the record's JSONL line, set by write_dataset_jsonl
+    """
+
+    name: str
+    data: dict
+    game_type: str
+    line_count: int
+    prompt_tokens: int = None
+    completion_tokens: int = None
+    total_tokens: int = None
+    prompt_version: str = DEFAULT_PROMPT_VERSION
+    target_format: str = "full"
+    minified_context: bool = False
+    sha256: str = None
+
+    @property
+    def family(self):
+        """Game family, i.e. the game directory name (e.g. "galaga")."""
+        return self.name.split("/")[0]
+
+
+def iter_dataset_records(
+    data_dir: Path = None,
+    jobs: int = 1,
+    cache_dir: Path = None,
+    graph: DatasetGraph = None,
+    prompt_versions=(DEFAULT_PROMPT_VERSION,),
+    names=None,
+):
+    """
+    Lazily route every script in the data directory into a DatasetRecord.
+
+    Records are yielded in dataset order as soon as they are ready, so callers
+    only ever hold a handful of them in memory.
+
+    Args:
+        data_dir: Path to the data directory (defaults to ../data relative to script)
+        jobs: Number of worker processes used to route scripts
+        cache_dir: Path to the build cache directory, or None to disable the cache
+        graph: DatasetGraph of the data directory, built here if not given
+        prompt_versions: Prompt template versions to format with. With more
+            than one, each script is assigned to one of them by a hash of its
+            name for an A/B comparison.
+        names: If given, only route the scripts with these names (relative to
+            the data directory)
+
+    Yields:
+        DatasetRecord for each script that produces a record
+    """
+    if data_dir is None:
+        # Default to data directory relative to this script
+        script_dir = Path(__file__).parent
+        data_dir = script_dir.parent / "data"
+
+    script_files = collect_script_files(data_dir)
+    if graph is None:
+        graph = DatasetGraph(data_dir, script_files)
+
+    # Broken SOURCE chains are reported up front and their scripts aren't routed
+    for name, problem in sorted(graph.problems.items()):
+        print(f"Error in {name}: {problem}")
+    script_files = [
+        script_file
+        for script_file in script_files
+        if script_file.relative_to(data_dir).as_posix() not in graph.problems
+        and (names is None or script_file.relative_to(data_dir).as_posix() in names)
+    ]
+
+    versions = {}
+    for script_file in script_files:
+        name = script_file.relative_to(data_dir).as_posix()
+        versions[script_file] = ab_prompt_version(name, list(prompt_versions))
+
+    # Each script's cached record is stored under a content hash of the script
+    # and its dependencies, so unchanged scripts are never routed again
+    keys = {}
+    dirty_files = []
+    if cache_dir:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fingerprint = formatter_fingerprint()
+        for script_file in script_files:
+            name = script_file.relative_to(data_dir).as_posix()
+            keys[script_file] = script_cache_key(
+                graph, name, fingerprint, versions[script_file]
+            )
+            if not (cache_dir / f"{keys[script_file]}.json").exists():
+                dirty_files.append(script_file)
     else:
-        # This is a create game without explicit CREATE comment (backward compatibility)
-        create_prompt = script_path.stem.replace("_", " ")
-        line_count = len([line for line in lines if line.strip()])
-        return format_create_game(script_content, create_prompt), "base", line_count
+        dirty_files = script_files
+
+    print(
+        f"Processing {len(dirty_files)} of {len(script_files)} scripts "
+        f"with {jobs} job(s) ({len(script_files) - len(dirty_files)} cached)..."
+    )
+
+    dirty_set = set(dirty_files)
+    dirty_results = route_scripts(
+        dirty_files, jobs, [versions[script_file] for script_file in dirty_files]
+    )
+
+    try:
+        for script_file in script_files:
+            name = script_file.relative_to(data_dir).as_posix()
+
+            hit = False
+            if script_file not in dirty_set:
+                hit, result = load_cached_result(cache_dir, keys[script_file])
+                error = None
+            if not hit:
+                if script_file in dirty_set:
+                    _, result, error = next(dirty_results)
+                else:
+                    # Cache entry vanished or was corrupt, route it right here
+                    _, result, error = route_script_worker(
+                        script_file, versions[script_file]
+                    )
+                # Errors aren't cached so that they are reported on every run
+                if cache_dir and error is None:
+                    store_cached_result(cache_dir, keys[script_file], result)
+
+            if error is not None:
+                print(f"  Error processing {name}: {error}")
+                continue
+
+            # Skip if None (e.g., _fix.py files)
+            if result is None:
+                print(f"  Skipping {name} (processed with bug pair)")
+                continue
+
+            print(f"  Processed {name}")
+            formatted_data, game_type, line_count = result
+            yield DatasetRecord(
+                name,
+                formatted_data,
+                game_type,
+                line_count,
+                prompt_version=versions[script_file],
+            )
+    finally:
+        dirty_results.close()
+
+    # A filtered run doesn't know which entries the other scripts still need
+    if cache_dir and names is None:
+        prune_build_cache(cache_dir, set(keys.values()))
+
+
+def fold_remix_chains(records, graph: DatasetGraph, folded: list):
+    """
+    Replace single-turn remix records with one multi-turn conversation per
+    SOURCE chain.
+
+    Each remix that no other remix builds on ends a chain, e.g.
+    breakout.py -> breakout_power_bricks.py -> breakout_power_multiball.py,
+    and its record becomes a conversation with one assistant turn per remix
+    step. Remixes in the middle of a chain are dropped since they are already
+    a turn of every conversation that passes through them.
+
+    Args:
+        records: Iterable of DatasetRecord
+        graph: DatasetGraph of the data directory
+        folded: List that receives the names of the dropped intermediate remixes
+
+    Yields:
+        Base and bug fix records unchanged, and a conversation record in place
+        of each chain-ending remix
+    """
+    for record in records:
+        if record.game_type != "remix":
+            yield record
+            continue
+
+        node = graph.nodes[record.name]
+        if any(graph.nodes[name].kind == "remix" for name in node.dependents):
+            folded.append(record.name)
+            continue
+
+        chain = graph.source_chain(record.name)
+        if len(chain) == 2:
+            # A single remix of a base game is already a one step chain
+            yield record
+            continue
+
+        remix_steps = []
+        line_count = 0
+        for name in reversed(chain[:-1]):
+            script_node = graph.nodes[name]
+            script = parse_script(read_script_text(script_node.path))
+            remix_steps.append((script.header["REMIX"], script.body))
+            line_count += count_code_lines(script.body)
+
+        base_game_content = read_script_text(graph.nodes[chain[-1]].path)
+        record.data = format_remix_chain(
+            base_game_content, remix_steps, get_templates(record.prompt_version)
+        )
+        record.line_count = line_count
+        yield record
+
+
+def convert_remix_targets(
+    records, graph: DatasetGraph, patch_format: str, count_tokens, savings: list
+):
+    """
+    Replace the full-file completion of single-turn remix records with a patch
+    against the base game.
+
+    Every patch is applied back to the base game and must reproduce the remix
+    exactly. Records whose patch doesn't round-trip, or isn't shorter than the
+    full file, keep the full-file target.
+
+    Args:
+        records: Iterable of DatasetRecord with token counts
+        graph: DatasetGraph of the data directory
+        patch_format: One of remix_patches.PATCH_FORMATS
+        count_tokens: Function from load_token_counter
+        savings: List that receives a dict per remix record for reporting
+
+    Yields:
+        Each DatasetRecord, with remix records converted to the patch format
+    """
+    for record in records:
+        # Multi-turn chain conversations keep their full-file turns
+        if record.game_type != "remix" or len(record.data["messages"]) != 3:
+            yield record
+            continue
+
+        node = graph.nodes[record.name]
+        base_node = graph.nodes[node.dependency]
+        base_game_content = read_script_text(base_node.path)
+        remix_content = parse_script(read_script_text(node.path)).body
+
+        try:
+            patch = make_patch(
+                patch_format,
+                base_game_content,
+                remix_content,
+                base_node.path.name,
+                node.path.name,
+            )
+        except PatchError as e:
+            print(f"  Keeping full target for {record.name}: {e}")
+            savings.append(
+                {"name": record.name, "full": record.completion_tokens, "patch": None}
+            )
+            yield record
+            continue
+
+        data = format_remix_patch_game(
+            patch,
+            base_game_content,
+            node.header["REMIX"],
+            patch_format,
+            get_templates(record.prompt_version),
+        )
+        prompt, completion = split_prompt_completion(data)
+        prompt_tokens, completion_tokens = count_tokens([prompt, completion])
+
+        # Remixes that rewrite most of the file are cheaper as a full file
+        if completion_tokens >= record.completion_tokens:
+            savings.append(
+                {"name": record.name, "full": record.completion_tokens, "patch": None}
+            )
+            yield record
+            continue
+
+        savings.append(
+            {"name": record.name, "full": record.completion_tokens, "patch": completion_tokens}
+        )
+
+        record.data = data
+        record.prompt_tokens = prompt_tokens
+        record.completion_tokens = completion_tokens
+        record.total_tokens = prompt_tokens + completion_tokens
+        record.target_format = patch_format
+        yield record
+
+
+def print_patch_savings(savings: list, patch_format: str):
+    """
+    Print the completion tokens saved by patch targets, per remix record.
+    """
+    print("\n" + "=" * 76)
+    print(f"REMIX TARGET SAVINGS (format: {patch_format})")
+    print("=" * 76)
+    print(f"{'Remix':<52} {'Full':<8} {'Patch':<8} {'Saved':<8}")
+    print("-" * 76)
+    full_total = 0
+    patch_total = 0
+    for entry in savings:
+        full_total += entry["full"]
+        if entry["patch"] is None:
+            patch_total += entry["full"]
+            print(f"{entry['name']:<52} {entry['full']:<8,} {'-':<8} {'kept full':<8}")
+            continue
+        patch_total += entry["patch"]
+        saved = 100 * (entry["full"] - entry["patch"]) / entry["full"]
+        print(f"{entry['name']:<52} {entry['full']:<8,} {entry['patch']:<8,} {saved:.0f}%")
+    print("-" * 76)
+    if full_total:
+        saved = 100 * (full_total - patch_total) / full_total
+        print(f"{'TOTAL':<52} {full_total:<8,} {patch_total:<8,} {saved:.0f}%")
+    print("=" * 76)
+
+
+# The code block embedded in a remix or bug fix prompt (the first one in the user message)
+PROMPT_CODE_PATTERN = re.compile(r"(```python\n)(.*?)(\n[ \t]*```)", re.DOTALL)
+
+# A traceback frame and the source line under it, e.g.
+#   File "C:\...\snake_bug.py", line 42, in main
+#     snake.move()
+TRACEBACK_FRAME_PATTERN = re.compile(r'(File "([^"]*)", line )(\d+)([^\n]*\n)([^\n]*)')
+
+
+def remap_traceback_lines(error_trace: str, script_name: str, code: str, line_map):
+    """
+    Point the traceback frames of a bug script at the lines of its minified code.
+
+    Each frame is placed by the source line printed under it, since the line
+    numbers recorded in the ERROR comments don't always match the script as
+    committed. When a line appears more than once, the one closest to the
+    recorded line number is used.
+
+    Raises:
+        MinifyError: if a frame's source line isn't in the code
+    """
+    code_lines = [line.strip() for line in code.splitlines()]
+
+    def remap(match):
+        if re.split(r"[\\/]", match.group(2))[-1] != script_name:
+            return match.group(0)
+        source = match.group(5).strip()
+        candidates = [i + 1 for i, line in enumerate(code_lines) if line == source]
+        if not candidates:
+            raise MinifyError(f"Traceback line not found in the script: {source}")
+        line = min(candidates, key=lambda i: abs(i - int(match.group(3))))
+        return f"{match.group(1)}{line_map[line]}{match.group(4)}{match.group(5)}"
+
+    return TRACEBACK_FRAME_PATTERN.sub(remap, error_trace)
+
+
+def minify_prompt_context(record: DatasetRecord, graph: DatasetGraph):
+    """
+    Minify the code embedded in a record's user prompt with code_minify,
+    leaving the completion untouched.
+
+    Returns:
+        A new instruction data dict
+
+    Raises:
+        MinifyError: if the prompt has no code, or its code can't be minified
+    """
+    messages = [dict(message) for message in record.data["messages"]]
+    message = next((message for message in messages if message["role"] == "user"), None)
+    match = PROMPT_CODE_PATTERN.search(message["content"]) if message else None
+    if match is None:
+        raise MinifyError("Prompt has no code block")
+
+    # Templates may indent the first line of the code along with the fence
+    code = match.group(2)
+    indent = code[: len(code) - len(code.lstrip(" \t"))]
+    code = code[len(indent) :]
+    minified, line_map = minify_code(code)
+
+    before = message["content"][: match.start(2)]
+    if record.game_type == "bug_fix":
+        before = remap_traceback_lines(
+            before, graph.nodes[record.name].path.name, code, line_map
+        )
+    message["content"] = before + indent + minified + message["content"][match.end(2) :]
+    return {**record.data, "messages": messages}
+
+
+def compact_prompt_contexts(records, graph: DatasetGraph, count_tokens, minified: list):
+    """
+    Minify the prompt context of remix and bug fix records as they stream past.
+
+    The base game (or buggy script) in these prompts is only read by the model,
+    so its docstrings, comments and blank lines cost prompt tokens without
+    teaching anything. Records with a patch target keep their prompt as is,
+    since the patch refers to the lines of the original base game.
+
+    Args:
+        records: Iterable of DatasetRecord with token counts
+        graph: DatasetGraph of the data directory
+        count_tokens: Function from load_token_counter
+        minified: List that receives a dict per remix and bug fix record for reporting
+
+    Yields:
+        Each DatasetRecord, with its prompt context minified where possible
+    """
+    for record in records:
+        if record.game_type not in ("remix", "bug_fix") or record.target_format != "full":
+            yield record
+            continue
+
+        entry = {"name": record.name, "type": record.game_type, "before": record.prompt_tokens}
+        try:
+            data = minify_prompt_context(record, graph)
+        except MinifyError as e:
+            minified.append({**entry, "after": None, "error": str(e)})
+            yield record
+            continue
+
+        prompt, _ = split_prompt_completion(data)
+        prompt_tokens = count_tokens([prompt])[0]
+        minified.append({**entry, "after": prompt_tokens, "error": None})
+
+        record.data = data
+        record.prompt_tokens = prompt_tokens
+        record.total_tokens = prompt_tokens + record.completion_tokens
+        record.minified_context = True
+        yield record
+
+
+def print_context_savings(minified: list):
+    """
+    Print the prompt tokens saved by minifying prompt context, per game type.
+    """
+    print("\n" + "=" * 76)
+    print("PROMPT CONTEXT MINIFICATION")
+    print("=" * 76)
+    print(
+        f"{'Game Type':<20} {'Records':<10} {'Minified':<10} "
+        f"{'Before':<12} {'After':<12} {'Saved':<8}"
+    )
+    print("-" * 76)
+    for game_type in ("remix", "bug_fix"):
+        entries = [entry for entry in minified if entry["type"] == game_type]
+        done = sum(1 for entry in entries if entry["after"] is not None)
+        before = sum(entry["before"] for entry in entries)
+        after = sum(
+            entry["before"] if entry["after"] is None else entry["after"]
+            for entry in entries
+        )
+        saved = 100 * (before - after) / before if before else 0
+        print(
+            f"{game_type:<20} {len(entries):<10} {done:<10} "
+            f"{before:<12,} {after:<12,} {saved:.0f}%"
+        )
+    print("=" * 76)
+    for entry in minified:
+        if entry["error"] is not None:
+            print(f"Not minified: {entry['name']}: {entry['error']}")
+
+
+BUDGET_POLICIES = ("report", "drop", "compress")
+
+
+def enforce_token_budget(
+    records, graph: DatasetGraph, max_tokens: int, policy: str, count_tokens, over_budget: list
+):
+    """
+    Apply a context length budget to records as they stream past.
+
+    Policies:
+        report: keep every record, only list the ones over budget
+        drop: leave over budget records out of the dataset
+        compress: minify the prompt context of over budget records (see
+            minify_prompt_context) and drop them only if they still don't fit
+
+    Records are never truncated, since a record missing the end of its
+    completion teaches the model to stop mid-game. A record's length includes
+    the chat template tokens around its messages (see templated_tokens), since
+    that is what has to fit the trainer's context.
+
+    Args:
+        records: Iterable of DatasetRecord with token counts
+        graph: DatasetGraph of the data directory, used to report SOURCE chains
+        max_tokens: Maximum templated tokens per record
+        policy: One of BUDGET_POLICIES
+        count_tokens: Function from load_token_counter, used after minifying
+        over_budget: List that receives a dict per over budget record for reporting
+
+    Yields:
+        Each DatasetRecord that fits the budget (or every record, for "report")
+    """
+    for record in records:
+        original_tokens = templated_tokens(record)
+        if original_tokens <= max_tokens:
+            yield record
+            continue
+
+        action = "kept" if policy == "report" else "dropped"
+
+        if policy == "compress" and not record.minified_context:
+            try:
+                compressed = minify_prompt_context(record, graph)
+            except MinifyError:
+                compressed = None
+            if compressed is not None:
+                prompt, _ = split_prompt_completion(compressed)
+                prompt_tokens = count_tokens([prompt])[0]
+                template_tokens = original_tokens - record.total_tokens
+                if prompt_tokens + record.completion_tokens + template_tokens <= max_tokens:
+                    record.data = compressed
+                    record.prompt_tokens = prompt_tokens
+                    record.total_tokens = prompt_tokens + record.completion_tokens
+                    record.minified_context = True
+                    action = "compressed"
+
+        over_budget.append(
+            {
+                "name": record.name,
+                "tokens": original_tokens,
+                "action": action,
+                "chain": [name.split("/")[-1] for name in graph.source_chain(record.name)],
+            }
+        )
+
+        if action != "dropped":
+            yield record
+
+
+def print_budget_report(over_budget: list, max_tokens: int, policy: str, tokenizer_name: str):
+    """
+    Print the records that went over the token budget and their SOURCE chains.
+    """
+    print("\n" + "=" * 76)
+    print(f"TOKEN BUDGET ({max_tokens:,} tokens, policy: {policy})")
+    print("=" * 76)
+    if tokenizer_name == "estimate":
+        print("Token counts are estimates, pass --tokenizer for the trainer's counts")
+    if not over_budget:
+        print("All records fit the budget")
+    for entry in over_budget:
+        print(f"{entry['name']:<52} {entry['tokens']:<10,} {entry['action']}")
+        if len(entry["chain"]) > 1:
+            print(f"    chain: {' -> '.join(entry['chain'])}")
+    print("=" * 76)
+
+
+def transform_records(
+    records,
+    graph: DatasetGraph,
+    count_tokens,
+    reports: dict,
+    chain_conversations: bool = False,
+    remix_format: str = "full",
+    minify_context: bool = False,
+    max_tokens: int = None,
+    budget_policy: str = "report",
+):
+    """
+    Chain the optional record transforms between routing and writing.
+
+    Args:
+        records: Iterable of DatasetRecord from iter_dataset_records
+        graph: DatasetGraph of the data directory
+        count_tokens: Function from load_token_counter
+        reports: Dict of lists that receive what each transform reports, under
+            "folded", "patch_savings", "minified" and "over_budget"
+        chain_conversations, remix_format, minify_context, max_tokens,
+        budget_policy: See generate_dataset_json
+
+    Returns:
+        Iterable of DatasetRecord with token counts
+    """
+    if chain_conversations:
+        records = fold_remix_chains(records, graph, reports["folded"])
+
+    records = annotate_token_counts(records, count_tokens)
+
+    if remix_format != "full":
+        records = convert_remix_targets(
+            records, graph, remix_format, count_tokens, reports["patch_savings"]
+        )
+
+    if minify_context:
+        records = compact_prompt_contexts(
+            records, graph, count_tokens, reports["minified"]
+        )
+
+    if max_tokens:
+        records = enforce_token_budget(
+            records, graph, max_tokens, budget_policy, count_tokens, reports["over_budget"]
+        )
+
+    return records
+
+
+def write_dataset_jsonl(records, output_file: Path):
+    """
+    Stream records into a JSONL file (one JSON object per line).
+
+    This is a pass-through generator: each record is written and flushed
+    before it is yielded back to the caller, so a crash leaves a valid
+    partial file containing every record produced so far.
+
+    Args:
+        records: Iterable of DatasetRecord
+        output_file: Path for the output JSONL file
+
+    Yields:
+        Each DatasetRecord after it has been written, with its sha256 set
+    """
+    with open(output_file, "w", encoding="utf-8") as f:
+        for record in records:
+            line = json.dumps(record.data, ensure_ascii=False) + "\n"
+            f.write(line)
+            f.flush()
+            record.sha256 = hashlib.sha256(line.encode("utf-8")).hexdigest()
+            yield record
+
+
+def read_dataset_jsonl(jsonl_file: Path):
+    """
+    Lazily read the instruction data dicts back from a dataset JSONL file.
+
+    Yields:
+        Each record's instruction data dict, in dataset order
+    """
+    with open(jsonl_file, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def print_dataset_statistics(counts: dict, lines: dict):
+    """
+    Print the per game type count and lines of code table.
+    """
+    total_games = sum(counts.values())
+    total_lines = sum(lines.values())
+
+    print("\n" + "=" * 60)
+    print("DATASET STATISTICS")
+    print("=" * 60)
+    print(f"{'Game Type':<20} {'Count':<15} {'Lines of Code':<20}")
+    print("-" * 60)
+    print(f"{'Base Games':<20} {counts['base']:<15} {lines['base']:<20,}")
+    print(f"{'Remix Games':<20} {counts['remix']:<15} {lines['remix']:<20,}")
+    print(f"{'Bug Fix Games':<20} {counts['bug_fix']:<15} {lines['bug_fix']:<20,}")
+    print("-" * 60)
+    print(f"{'TOTAL':<20} {total_games:<15} {total_lines:<20,}")
+    print("=" * 60)
+
+
+def record_summary(record: DatasetRecord):
+    """
+    What watch_dataset remembers about a record: (game type, lines, tokens).
+    """
+    return record.game_type, record.line_count, record.total_tokens
+
+
+def summarize_by_game_type(summaries: dict):
+    totals = {game_type: [0, 0, 0] for game_type in ("base", "remix", "bug_fix")}
+    for game_type, line_count, tokens in summaries.values():
+        totals[game_type][0] += 1
+        totals[game_type][1] += line_count
+        totals[game_type][2] += tokens
+    return totals
+
+
+def print_statistics_delta(before: dict, after: dict):
+    """
+    Print the DATASET STATISTICS table with the change of every column.
+    """
+    def cell(game_type, column):
+        value = after[game_type][column]
+        delta = value - before[game_type][column]
+        return f"{value:,} ({delta:+,})" if delta else f"{value:,}"
+
+    print("\n" + "=" * 76)
+    print("DATASET STATISTICS")
+    print("=" * 76)
+    print(f"{'Game Type':<20} {'Count':<15} {'Lines of Code':<20} {'Tokens':<20}")
+    print("-" * 76)
+    labels = {"base": "Base Games", "remix": "Remix Games", "bug_fix": "Bug Fix Games"}
+    for game_type, label in labels.items():
+        print(
+            f"{label:<20} {cell(game_type, 0):<15} "
+            f"{cell(game_type, 1):<20} {cell(game_type, 2):<20}"
+        )
+    print("-" * 76)
+    after["TOTAL"] = [sum(column) for column in zip(*after.values())]
+    before["TOTAL"] = [sum(column) for column in zip(*before.values())]
+    print(f"{'TOTAL':<20} {cell('TOTAL', 0):<15} {cell('TOTAL', 1):<20} {cell('TOTAL', 2):<20}")
+    print("=" * 76)
+
+
+def watch_dataset(
+    data_dir: Path,
+    output_file: Path,
+    graph: DatasetGraph,
+    summaries: dict,
+    rebuild_records,
+    shard_dir: Path = None,
+    update_catalog=None,
+    manifest: dict = None,
+):
+    """
+    Keep a built dataset up to date as scripts change, until interrupted.
 
+    Only the changed scripts and the scripts that depend on them (their
+    remixes, or the bug of a changed fix) are routed again. Their records are
+    patched into the JSONL file (see patch_dataset_jsonl) and, if there are
+    shards, into the shards that hold them, and the change to the statistics
+    is printed. The other records are never read into memory.
 
-def generate_dataset_json(data_dir: Path = None, output_file: Path = None):
+    Args:
+        data_dir: Path to the data directory
+        output_file: The dataset JSONL file, as built by generate_dataset_json
+        graph: DatasetGraph the dataset was built from
+        summaries: Dict mapping each record name to its record_summary, in
+            dataset order
+        rebuild_records: Function taking a DatasetGraph and a set of script
+            names, returning the records of those scripts with token counts
+        shard_dir: Directory of the dataset shards, or None if there are none
+        update_catalog: Function taking the current script files that updates
+            the script catalog, or None
+        manifest: The build's manifest (see dataset_manifest.py), or None.
+            A new manifest is written after every update.
+    """
+    watcher = open_watcher(data_dir)
+    print(f"\nWatching {data_dir} for changes ({watcher.name}), press Ctrl+C to stop...")
+
+    try:
+        while True:
+            changed_paths = watcher.wait()
+            start = time.perf_counter()
+
+            script_files = collect_script_files(data_dir)
+            new_graph = DatasetGraph(data_dir, script_files)
+            changed = {
+                path.relative_to(data_dir).as_posix()
+                for path in changed_paths
+                if path.is_relative_to(data_dir)
+            }
+            changed = {name for name in changed if name in new_graph.nodes or name in graph.nodes}
+            if not changed:
+                continue
+
+            # Dependents in the old graph cover remixes whose SOURCE was edited away
+            affected = set(changed)
+            for name in changed:
+                for dependency_graph in (graph, new_graph):
+                    if name in dependency_graph.nodes:
+                        affected.update(dependency_graph.all_dependents(name))
+            graph = new_graph
+
+            print(f"\nChanged: {', '.join(sorted(changed))}")
+            if update_catalog is not None:
+                update_catalog(script_files)
+
+            before = summarize_by_game_type(summaries)
+            updates = {}
+            entries = {}
+            for record in rebuild_records(graph, affected):
+                summaries[record.name] = record_summary(record)
+                updates[record.name] = (
+                    json.dumps(record.data, ensure_ascii=False) + "\n"
+                ).encode("utf-8")
+                record.sha256 = hashlib.sha256(updates[record.name]).hexdigest()
+                entries[record.name] = record_entry(record, graph)
+            for name in affected - updates.keys():
+                if summaries.pop(name, None) is not None:
+                    updates[name] = None
+
+            order = [
+                name
+                for name in (path.relative_to(data_dir).as_posix() for path in script_files)
+                if name in summaries
+            ]
+            summaries = {name: summaries[name] for name in order}
+
+            patch_dataset_jsonl(output_file, updates, order)
+            write_dataset_index(
+                output_file,
+                [(name, name.split("/")[0], summaries[name][0]) for name in order],
+            )
+
+            rewritten = 0
+            if shard_dir is not None:
+                rewritten = patch_dataset_shards(shard_dir, updates, order)
+
+            if manifest is not None:
+                entries = {name: entries.get(name) or manifest["records"][name] for name in order}
+                manifest = build_manifest(
+                    entries, manifest["prompt_versions"], manifest["tokenizer"]
+                )
+                write_manifest(manifest, output_file.parent)
+
+            print_statistics_delta(before, summarize_by_game_type(summaries))
+            print(
+                f"Updated {len(updates)} records ({rewritten} shards) "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+
+
+def generate_dataset_json(
+    data_dir: Path = None,
+    output_file: Path = None,
+    jobs: int = 1,
+    cache_dir: Path = None,
+    shard_size: float = None,
+    compression: str = "gz",
+    tokenizer_path: Path = None,
+    max_tokens: int = None,
+    budget_policy: str = "report",
+    pack_window: int = None,
+    max_per_cluster: int = None,
+    chain_conversations: bool = False,
+    remix_format: str = "full",
+    prompt_versions=(DEFAULT_PROMPT_VERSION,),
+    minify_context: bool = False,
+    families=None,
+    watch: bool = False,
+    export_formats=(),
+    eval_fraction: float = None,
+    split_seed: int = 0,
+    providers=(),
+    stats: dict = None,
+):
     """
     Generate a JSONL dataset from all pygame scripts in the data directory.
 
+    Records are streamed straight to the output file, and the returned
+    records are read back from it lazily, so the dataset never has to fit in
+    memory.
+
     Args:
         data_dir: Path to the data directory (defaults to ../data relative to script)
         output_file: Path for the output JSONL file (defaults to dataset.jsonl in output dir)
+        jobs: Number of worker processes used to route scripts
+        cache_dir: Path to the build cache directory (defaults to build_cache/ next
+            to the output file). Pass False to disable the cache.
+        shard_size: If set, also write compressed shards of at most this many
+            MB into a shards/ directory next to the output file
+        compression: Shard compression, "gz" or "zst"
+        tokenizer_path: Local tokenizer.json used to count tokens (defaults to an
+            offline estimate)
+        max_tokens: Token budget per record, enforced with budget_policy
+        budget_policy: One of BUDGET_POLICIES, see enforce_token_budget. The
+            drop and compress policies need tokenizer_path, so that no record
+            is left out on an estimated count.
+        pack_window: If set, also write a dataset.packed.jsonl next to the output
+            file with records packed into windows of this many tokens. Needs
+            tokenizer_path, so the window offsets match the trainer's tokens.
+        max_per_cluster: If set, keep at most this many records from each
+            near-duplicate cluster (see near_duplicates.py)
+        chain_conversations: Emit each remix chain as one multi-turn
+            conversation instead of one record per remix (see fold_remix_chains)
+        remix_format: "full" for complete remix files as targets, or one of
+            remix_patches.PATCH_FORMATS for patches against the base game
+        prompt_versions: Prompt template versions (see prompt_templates.py).
+            With more than one, scripts are split between them for an A/B
+            comparison. The versions used are recorded in a dataset.prompts.json
+            file next to the output file.
+        minify_context: Minify the code in remix and bug fix prompts (see
+            compact_prompt_contexts)
+        families: If given, only include scripts from these game families,
+            selected with the script catalog (see script_catalog.py). The
+            catalog is only built and updated when families are given.
+        watch: After the build, keep watching the data directory and update
+            the outputs whenever scripts change (see watch_dataset)
+        export_formats: Columnar formats from dataset_arrow.EXPORT_FORMATS to
+            also export into an hf_dataset/ directory next to the output file
+        eval_fraction: If set, also write dataset.train.jsonl and
+            dataset.eval.jsonl next to the output file, with about this
+            fraction of the records in eval, spread over the game families
+            and kinds (see dataset_split.py). With pack_window, only the train
+            split is packed.
+        split_seed: Seed of the train/eval split
+        providers: Names of dataset_writers.OUTPUT_WRITERS to also write the
+            dataset with, each to its own file next to the output file.
+            Providers with a context limit need tokenizer_path.
+        stats: Dict that receives the per game type "counts" and "lines"
+            statistics, and the TokenStatistics under "tokens"
 
     Returns:
-        List of formatted instruction data dictionaries
+        Iterator over the formatted instruction data dicts, in dataset order
+
+    Raises:
+        UnknownFamilyError: If families names a family without any scripts
     """
+    if pack_window and tokenizer_path is None:
+        raise ValueError("Packing needs a tokenizer: the estimated token counts can't be used as window offsets")
+    if max_tokens and budget_policy != "report" and tokenizer_path is None:
+        raise ValueError(
+            f"The {budget_policy} budget policy needs a tokenizer: records can't be left out on estimated token counts"
+        )
+    limited = [provider for provider in providers if OUTPUT_WRITERS[provider].max_tokens]
+    if limited and tokenizer_path is None:
+        raise ValueError(
+            f"The {', '.join(limited)} output needs a tokenizer: records can't be left out on estimated token counts"
+        )
+
     if data_dir is None:
         # Default to data directory relative to this script
         script_dir = Path(__file__).parent
@@ -276,94 +1399,370 @@ def generate_dataset_json(data_dir: Path = None, output_file: Path = None):
         output_dir.mkdir(exist_ok=True)
         output_file = output_dir / "dataset.jsonl"
 
-    dataset = []
+    if cache_dir is None:
+        cache_dir = output_file.parent / "build_cache"
 
     # Statistics tracking
-    base_games_count = 0
-    remix_games_count = 0
-    bug_fix_count = 0
-    base_games_lines = 0
-    remix_games_lines = 0
-    bug_fix_lines = 0
-
-    # Iterate through all subdirectories in data/
-    for game_dir in data_dir.iterdir():
-        if game_dir.is_dir() and not game_dir.name.startswith("_"):
-            print(f"Processing {game_dir.name}...")
-
-            # Find all .py files in this game directory (base and remix games)
-            for script_file in game_dir.glob("*.py"):
-                try:
-                    print(f"  Processing {script_file.name}...")
-                    result = route_script_to_formatter(script_file)
-                    
-                    # Skip if None (shouldn't happen in parent dir)
-                    if result is None:
-                        continue
-                    
-                    formatted_data, game_type, line_count = result
-                    dataset.append(formatted_data)
-
-                    # Update statistics (only base/remix in parent dir)
-                    if game_type == "base":
-                        base_games_count += 1
-                        base_games_lines += line_count
-                    elif game_type == "remix":
-                        remix_games_count += 1
-                        remix_games_lines += line_count
-                except Exception as e:
-                    print(f"  Error processing {script_file}: {e}")
-                    continue
-            
-            # Also check for a bugs subdirectory (only bug/fix pairs here)
-            bugs_dir = game_dir / "bugs"
-            if bugs_dir.exists() and bugs_dir.is_dir():
-                print(f"  Processing bugs subdirectory...")
-                for script_file in bugs_dir.glob("*.py"):
-                    try:
-                        print(f"    Processing {script_file.name}...")
-                        result = route_script_to_formatter(script_file)
-                        
-                        # Skip if None (e.g., _fix.py files)
-                        if result is None:
-                            print(f"    Skipping {script_file.name} (processed with bug pair)")
-                            continue
-                        
-                        formatted_data, game_type, line_count = result
-                        dataset.append(formatted_data)
-
-                        # Update statistics (only bug_fix in bugs dir)
-                        bug_fix_count += 1
-                        bug_fix_lines += line_count
-                    except Exception as e:
-                        print(f"    Error processing {script_file}: {e}")
-                        continue
-
-    # Write the dataset to JSONL file (one JSON object per line)
-    with open(output_file, "w", encoding="utf-8") as f:
-        for entry in dataset:
-            json.dump(entry, f, ensure_ascii=False)
-            f.write("\n")
+    counts = {"base": 0, "remix": 0, "bug_fix": 0}
+    lines = {"base": 0, "remix": 0, "bug_fix": 0}
 
-    # Print statistics in a table
-    total_games = base_games_count + remix_games_count + bug_fix_count
-    total_lines = base_games_lines + remix_games_lines + bug_fix_lines
+    count_tokens, tokenizer_name = load_token_counter(tokenizer_path)
+    token_stats = TokenStatistics(tokenizer_name)
 
-    print("\n" + "=" * 60)
-    print("DATASET STATISTICS")
-    print("=" * 60)
-    print(f"{'Game Type':<20} {'Count':<15} {'Lines of Code':<20}")
-    print("-" * 60)
-    print(f"{'Base Games':<20} {base_games_count:<15} {base_games_lines:<20,}")
-    print(f"{'Remix Games':<20} {remix_games_count:<15} {remix_games_lines:<20,}")
-    print(f"{'Bug Fix Games':<20} {bug_fix_count:<15} {bug_fix_lines:<20,}")
-    print("-" * 60)
-    print(f"{'TOTAL':<20} {total_games:<15} {total_lines:<20,}")
-    print("=" * 60)
+    script_files = collect_script_files(data_dir)
+    graph = DatasetGraph(data_dir, script_files)
+
+    # The catalog is only needed to select families, so plain builds skip it
+    catalog_file = output_file.parent / "catalog.sqlite"
+    names = None
+    if families:
+        with ScriptCatalog(catalog_file) as catalog:
+            changes = catalog.update(data_dir, script_files, count_tokens, tokenizer_name)
+            print("Catalog updated: " + ", ".join(f"{n} {change}" for change, n in changes.items()))
+            names = set(catalog.select_families(families))
+
+    records = iter_dataset_records(
+        data_dir, jobs, cache_dir or None, graph, prompt_versions, names
+    )
+
+    capped_clusters = {}
+    if max_per_cluster:
+        clusters = build_near_duplicate_index(
+            data_dir, output_file.parent / "near_duplicates.json", jobs=jobs
+        )
+        records = cap_cluster_multiplicity(
+            records, clusters, max_per_cluster, capped_clusters
+        )
+
+    reports = {"folded": [], "patch_savings": [], "minified": [], "over_budget": []}
+    records = transform_records(
+        records,
+        graph,
+        count_tokens,
+        reports,
+        chain_conversations,
+        remix_format,
+        minify_context,
+        max_tokens,
+        budget_policy,
+    )
+    records = write_dataset_jsonl(records, output_file)
+
+    split_counts = {}
+    if eval_fraction:
+        splits = assign_splits(graph, eval_fraction, split_seed, names)
+        records = write_dataset_splits(records, output_file, splits, split_counts)
+
+    packing_items = []
+    if pack_window:
+        records = collect_packing_lengths(records, packing_items)
+
+    shard_dir = output_file.parent / "shards"
+    if shard_size:
+        records = write_dataset_shards(
+            records, shard_dir, int(shard_size * 1024 * 1024), compression
+        )
+
+    export_dir = output_file.parent / "hf_dataset"
+    if export_formats:
+        records = write_columnar_dataset(records, export_dir, export_formats, graph)
+
+    writers = [OUTPUT_WRITERS[provider](output_file.parent) for provider in providers]
+    if writers:
+        records = fan_out_records(records, writers)
+
+    version_counts = {version: 0 for version in prompt_versions}
+    summaries = {}
+    index_labels = []
+    manifest_entries = {}
+    for record in records:
+        counts[record.game_type] += 1
+        lines[record.game_type] += record.line_count
+        token_stats.add(record)
+        version_counts[record.prompt_version] += 1
+        index_labels.append((record.name, record.family, record.game_type))
+        manifest_entries[record.name] = record_entry(record, graph)
+        if watch:
+            summaries[record.name] = record_summary(record)
+
+    # Byte offset index for random access, see dataset_reader.py
+    write_dataset_index(output_file, index_labels)
+
+    # Content-addressed manifest for diffing builds, see dataset_manifest.py
+    manifest = build_manifest(
+        manifest_entries,
+        {version: template_fingerprint(version) for version in prompt_versions},
+        tokenizer_name,
+    )
+    manifest_file = write_manifest(manifest, output_file.parent)
+
+    # Record which prompt templates produced this dataset
+    prompts_file = output_file.with_suffix(".prompts.json")
+    prompts = {
+        version: {"fingerprint": template_fingerprint(version), "records": count}
+        for version, count in version_counts.items()
+    }
+    prompts_file.write_text(json.dumps(prompts, indent=2), encoding="utf-8")
+
+    if export_formats:
+        write_dataset_card(export_dir, export_formats, counts)
+
+    print_dataset_statistics(counts, lines)
+    if eval_fraction:
+        print_split_statistics(split_counts, eval_fraction, split_seed)
+    if writers:
+        print_writer_statistics(writers)
+
+    packed_file = output_file.with_suffix(".packed.jsonl")
+    if pack_window:
+        packing_source = output_file
+        if eval_fraction:
+            # Eval records are scored one at a time, so only train is packed
+            packing_source = split_path(output_file, "train")
+            packing_items = [item for item in packing_items if splits[item[0]] == "train"]
+        print_packing_statistics(
+            write_packed_dataset(packing_source, packed_file, packing_items, pack_window)
+        )
+
+    token_stats.print_report()
+    if tokenizer_path is not None:
+        # The estimate counts indentation as one token, so it can't compare versions
+        print_template_costs(list(prompt_versions), count_tokens)
+    if len(prompt_versions) > 1:
+        print(
+            "A/B prompt versions: "
+            + ", ".join(f"{version} ({count} records)" for version, count in version_counts.items())
+        )
+    if remix_format != "full":
+        print_patch_savings(reports["patch_savings"], remix_format)
+    if minify_context:
+        print_context_savings(reports["minified"])
+    if max_tokens:
+        print_budget_report(reports["over_budget"], max_tokens, budget_policy, tokenizer_name)
+    if chain_conversations:
+        print(
+            f"\nFolded {len(reports['folded'])} intermediate remixes into multi-turn remix chain conversations"
+        )
+    if max_per_cluster:
+        print_capped_clusters(capped_clusters, max_per_cluster)
     print(f"\nOutput saved to: {output_file.absolute()}")
+    print(f"Build {manifest['build'][:12]} manifest saved to: {manifest_file.absolute()}")
+    if shard_size:
+        print(f"Shards saved to: {shard_dir.absolute()}")
+    if pack_window:
+        print(f"Packed dataset saved to: {packed_file.absolute()}")
+    if eval_fraction:
+        print(
+            f"Train/eval split saved to: {split_path(output_file, 'train').absolute()}, "
+            f"{split_path(output_file, 'eval').name}"
+        )
+    if export_formats:
+        print(f"Columnar export saved to: {export_dir.absolute()}")
+    for writer in writers:
+        print(f"{writer.name.capitalize()} dataset saved to: {writer.path.absolute()}")
+
+    if watch:
+
+        def rebuild_records(graph, affected):
+            if families:
+                affected = {name for name in affected if name.split("/")[0] in families}
+            records = iter_dataset_records(
+                data_dir, jobs, cache_dir or None, graph, prompt_versions, affected
+            )
+            return transform_records(
+                records,
+                graph,
+                count_tokens,
+                {key: [] for key in reports},
+                chain_conversations,
+                remix_format,
+                minify_context,
+                max_tokens,
+                budget_policy,
+            )
+
+        def update_catalog(script_files):
+            with ScriptCatalog(catalog_file) as catalog:
+                catalog.update(data_dir, script_files, count_tokens, tokenizer_name)
+
+        watch_dataset(
+            data_dir,
+            output_file,
+            graph,
+            summaries,
+            rebuild_records,
+            shard_dir if shard_size else None,
+            update_catalog if families else None,
+            manifest,
+        )
+
+    if stats is not None:
+        stats.update(counts=counts, lines=lines, tokens=token_stats)
+    return read_dataset_jsonl(output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Format the pygame scripts in data/ into a JSONL fine-tuning dataset"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to route scripts (default: 1). Output order is the same for any value.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and don't update the incremental build cache (output/build_cache/)",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=float,
+        help="Also write compressed shards of at most this many MB, with a byte offset index per shard, to output/shards/",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default="gz",
+        help="Shard compression (default: gz). zst requires `pip install zstandard`.",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=Path,
+        help="Local tokenizer.json used for token statistics (requires `pip install tokenizers`). Defaults to an offline estimate.",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Token budget per record, e.g. 8192 for the Fireworks max context length",
+    )
+    parser.add_argument(
+        "--budget-policy",
+        choices=BUDGET_POLICIES,
+        default="report",
+        help="What to do with records over --max-tokens: report them, drop them, or compress their prompt context and drop them only if they still don't fit (default: report). drop and compress require --tokenizer.",
+    )
+    parser.add_argument(
+        "--pack-window",
+        type=int,
+        help="Also write output/dataset.packed.jsonl with records bin-packed into windows of this many tokens (requires --tokenizer)",
+    )
+    parser.add_argument(
+        "--max-per-cluster",
+        type=int,
+        help="Keep at most this many base/remix records from each near-duplicate cluster (near-identical scripts for the same prompt)",
+    )
+    parser.add_argument(
+        "--chain-conversations",
+        action="store_true",
+        help="Emit each remix-of-remix chain as one multi-turn conversation with one assistant turn per remix, instead of one record per remix",
+    )
+    parser.add_argument(
+        "--remix-format",
+        choices=("full",) + PATCH_FORMATS,
+        default="full",
+        help="Completion format of remix records: the complete remix file, a unified diff, or search/replace blocks against the base game (default: full)",
+    )
+
+    parser.add_argument(
+        "--prompt-version",
+        nargs="+",
+        choices=list(TEMPLATE_VERSIONS),
+        default=[DEFAULT_PROMPT_VERSION],
+        help=f"Prompt template version(s) from prompt_templates.py (default: {DEFAULT_PROMPT_VERSION}). Give several to split scripts between them for an A/B comparison.",
+    )
 
-    return dataset
+    parser.add_argument(
+        "--minify-context",
+        action="store_true",
+        help="Strip docstrings, comments and blank lines from the code in remix and bug fix prompts, verified against the code's AST",
+    )
+
+    parser.add_argument(
+        "--family",
+        nargs="+",
+        help="Only include scripts from these game families, e.g. galaga snake",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, watch data/ and update the dataset and its shards whenever a script changes",
+    )
+
+    parser.add_argument(
+        "--export",
+        nargs="+",
+        choices=EXPORT_FORMATS,
+        default=[],
+        help="Also export the dataset as Parquet and/or Arrow IPC files in a Hugging Face datasets directory (output/hf_dataset/). Requires `pip install pyarrow`.",
+    )
+
+    parser.add_argument(
+        "--eval-fraction",
+        type=float,
+        help="Also write output/dataset.train.jsonl and output/dataset.eval.jsonl with about this fraction of the records in eval, spread over the game families and kinds. A base game, every remix in its SOURCE chains, their oneshot twins and bug/fix pairs always land on the same side. With --pack-window, only the train split is packed.",
+    )
+    parser.add_argument(
+        "--split-seed",
+        type=int,
+        default=0,
+        help="Seed of the train/eval split (default: 0). The same seed always gives the same split.",
+    )
+
+    parser.add_argument(
+        "--provider",
+        nargs="+",
+        choices=list(OUTPUT_WRITERS),
+        default=[],
+        help="Also write the dataset in these providers' formats, e.g. output/dataset.fireworks.jsonl, from the same run (see dataset_writers.py). dataset.jsonl is already in Together's format. fireworks requires --tokenizer.",
+    )
+
+    args = parser.parse_args()
+    if args.pack_window and not args.tokenizer:
+        parser.error("--pack-window requires --tokenizer")
+    if args.max_tokens and args.budget_policy != "report" and not args.tokenizer:
+        parser.error(f"--budget-policy {args.budget_policy} requires --tokenizer")
+    limited = [provider for provider in args.provider if OUTPUT_WRITERS[provider].max_tokens]
+    if limited and not args.tokenizer:
+        parser.error(f"--provider {' '.join(limited)} requires --tokenizer")
+
+    if args.watch and (
+        args.pack_window or args.max_per_cluster or args.export or args.eval_fraction or args.provider
+    ):
+        parser.error(
+            "--watch can't be combined with --pack-window, --max-per-cluster, --export, "
+            "--eval-fraction or --provider"
+        )
+    if args.eval_fraction is not None and not 0 < args.eval_fraction < 1:
+        parser.error("--eval-fraction must be between 0 and 1")
+
+    try:
+        generate_dataset_json(
+            jobs=args.jobs,
+            cache_dir=False if args.no_cache else None,
+            shard_size=args.shard_size,
+            compression=args.compression,
+            tokenizer_path=args.tokenizer,
+            max_tokens=args.max_tokens,
+            budget_policy=args.budget_policy,
+            pack_window=args.pack_window,
+            max_per_cluster=args.max_per_cluster,
+            chain_conversations=args.chain_conversations,
+            remix_format=args.remix_format,
+            prompt_versions=tuple(args.prompt_version),
+            minify_context=args.minify_context,
+            families=args.family,
+            watch=args.watch,
+            export_formats=args.export,
+            eval_fraction=args.eval_fraction,
+            split_seed=args.split_seed,
+            providers=args.provider,
+        )
+    except UnknownFamilyError as e:
+        parser.error(str(e))
 
 
 if __name__ == "__main__":
-    generate_dataset_json()
+    main()
@@ -0,0 +1,659 @@
+"""
+Input fuzzer that looks for crashes in the games, remixes by default.
+
+Every script is run headless on the virtual clock (see game_harness.py) many
+times, by a pool of worker processes, each time driven by one of these input
+policies:
+
+- random:  the harness monkey: keys pressed and released at random
+- hold:    one direction, sometimes with fire, held down for seconds at a time
+- mash:    fire tapped every few frames while the direction changes
+- restart: mashing, plus R tapped shortly after firing, so games get
+           restarted in the middle of explosions and game over screens
+
+The input of a run is generated up front as a list of key presses, each a
+(key, first frame, end frame) interval, and played back as an input trace
+(see input_trace.py), so any run can be repeated exactly.
+
+Every distinct crash of a script (exception type and line) is then minimized:
+the input is cut off at the crash, and key presses are dropped and shortened
+as long as the script still crashes in the same place. The minimized input is
+saved as a trace that game_harness.py can replay:
+
+    output/fuzz/asteroids/asteroids_explosive_hunter_fuzz_1.trace
+    python game_harness.py data/asteroids/asteroids_explosive_hunter.py --replay output/fuzz/...
+
+and a bug/fix scaffold is written to the family's bugs directory:
+
+    data/asteroids/bugs/_asteroids_explosive_hunter_fuzz_1_bug.py
+    data/asteroids/bugs/_asteroids_explosive_hunter_fuzz_1_fix.py
+
+The _bug.py scaffold is the crashing script with a `# CREATE:` header and the
+traceback of the crash as its `# ERROR:` lines, with the script's path
+relative to data/ and without the leading underscore. The _fix.py scaffold is the
+same script with a "BUG FIX: TODO" paragraph in its docstring, to be replaced
+by the explanation once the code below it has been fixed. Scaffolds start
+with an underscore, so the dataset skips them until someone has reviewed and
+fixed them and dropped the underscore. A crash that already has a scaffold
+isn't written again.
+
+The report is written to output/fuzz/fuzz_report.json.
+
+setup:
+    pip install pygame
+
+usage: `python input_fuzzer.py [SCRIPT ...] [--family NAME [NAME ...]] [--kind KIND] [--policy NAME [NAME ...]]
+                               [--runs N] [--frames N] [--seed S] [--jobs N] [--timeout SECONDS] [--memory-mb MB]
+                               [--minimize-runs N] [--no-scaffolds]`
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import textwrap
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dataset_graph import read_script_text
+from game_harness import MONKEY_KEYS, PRESS_CHANCE, RELEASE_CHANCE, key_scancodes, limit_memory, run_game
+from input_trace import InputTrace, TraceFrame
+from script_metadata import parse_header, parse_script, script_kind
+from smoke_test import DEFAULT_MEMORY_MB, DEFAULT_TIMEOUT, KINDS
+
+DEFAULT_FRAMES = 1800
+DEFAULT_RUNS = 4
+DEFAULT_MINIMIZE_RUNS = 200
+
+DIRECTION_KEYS = ("K_LEFT", "K_RIGHT", "K_UP", "K_DOWN", "K_a", "K_d", "K_w", "K_s")
+FIRE_KEYS = ("K_SPACE", "K_RETURN")
+RESTART_KEY = "K_r"
+
+# Chance that a fire tap of the restart policy is followed by an R tap
+RESTART_CHANCE = 0.05
+
+# SDL_KEYDOWN and SDL_KEYUP
+KEYDOWN = 0x300
+KEYUP = 0x301
+
+# Key name -> (key code, scancode), filled in by init_worker
+_KEYS = {}
+
+
+class CaseTimeout(BaseException):
+    """
+    Raised from a timer signal to stop a run that takes too long.
+
+    A BaseException, like game_harness.FrameLimitReached, so the script
+    can't catch it.
+    """
+
+
+def random_policy(rng: random.Random, frames: int):
+    """
+    Keys pressed and released at random, like the harness monkey.
+    """
+    intervals = []
+    held = {}
+    for frame in range(frames):
+        if held and rng.random() < RELEASE_CHANCE:
+            key = rng.choice(sorted(held))
+            intervals.append((key, held.pop(key), frame))
+        if rng.random() < PRESS_CHANCE:
+            key = rng.choice(MONKEY_KEYS)
+            held.setdefault(key, frame)
+    intervals.extend((key, start, frames) for key, start in held.items())
+    return intervals
+
+
+def hold_policy(rng: random.Random, frames: int):
+    """
+    One direction held for half a second to four seconds, half the time
+    with fire held too, with short pauses in between.
+    """
+    intervals = []
+    frame = 0
+    while frame < frames:
+        length = rng.randint(30, 240)
+        keys = [rng.choice(DIRECTION_KEYS)]
+        if rng.random() < 0.5:
+            keys.append(rng.choice(FIRE_KEYS))
+        intervals.extend((key, frame, frame + length) for key in keys)
+        frame += length + rng.randint(0, 30)
+    return intervals
+
+
+def mash_policy(rng: random.Random, frames: int):
+    """
+    Fire tapped every few frames, while the direction changes every few
+    dozen frames.
+    """
+    intervals = []
+    frame = 0
+    while frame < frames:
+        length = rng.randint(10, 60)
+        intervals.append((rng.choice(DIRECTION_KEYS), frame, frame + length))
+        frame += length + rng.randint(0, 5)
+
+    frame = rng.randint(0, 3)
+    while frame < frames:
+        length = rng.randint(1, 2)
+        intervals.append((rng.choice(FIRE_KEYS), frame, frame + length))
+        frame += length + rng.randint(1, 3)
+    return intervals
+
+
+def restart_policy(rng: random.Random, frames: int):
+    """
+    Mashing, with R tapped up to 45 frames after some of the fire taps, so
+    the restart lands while shots and explosions are still on screen.
+    """
+    intervals = mash_policy(rng, frames)
+    for key, start, _ in list(intervals):
+        if key in FIRE_KEYS and rng.random() < RESTART_CHANCE:
+            restart = start + rng.randint(5, 45)
+            intervals.append((RESTART_KEY, restart, restart + rng.randint(1, 3)))
+    return intervals
+
+
+POLICIES = {
+    "random": random_policy,
+    "hold": hold_policy,
+    "mash": mash_policy,
+    "restart": restart_policy,
+}
+
+
+def init_worker(work_dir: str, memory_mb: int):
+    """
+    Set up a worker process of the pool.
+
+    The scripts run in a scratch directory with their output discarded, and
+    the scancodes of the keys are looked up once, since they need pygame's
+    display initialized.
+    """
+    limit_memory(memory_mb)
+    os.chdir(work_dir)
+    sys.stdout = open(os.devnull, "w")
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    import pygame
+
+    pygame.display.init()
+    key_codes = {name: getattr(pygame, name) for name in MONKEY_KEYS}
+    scancodes = key_scancodes(pygame, key_codes.values())
+    pygame.quit()
+    _KEYS.update((name, (code, scancodes[code])) for name, code in key_codes.items())
+
+
+def build_trace(intervals, frames: int, seed: int):
+    """
+    The InputTrace of key presses, as KEYDOWN and KEYUP events on the frames
+    where keys go down and up, and the keys held on every frame.
+    """
+    held = [set() for _ in range(frames)]
+    for key, start, end in intervals:
+        for frame in range(start, min(end, frames)):
+            held[frame].add(key)
+
+    trace = InputTrace(seed)
+    previous = set()
+    for keys in held:
+        events = []
+        for event_type, changed in ((KEYUP, previous - keys), (KEYDOWN, keys - previous)):
+            for name in sorted(changed):
+                key, scancode = _KEYS[name]
+                unicode = chr(key) if key < 128 else ""
+                events.append((event_type, {"key": key, "mod": 0, "scancode": scancode, "unicode": unicode}))
+        trace.frames.append(TraceFrame(events, tuple(sorted(_KEYS[name][1] for name in keys))))
+        previous = keys
+    return trace
+
+
+def replay_intervals(script_path: Path, intervals, frames: int, seed: int, timeout: float):
+    """
+    Run a script on a list of key presses.
+
+    Returns:
+        (harness result dict, with status "timeout" if the run took too
+        long, InputTrace of the run)
+    """
+    trace = build_trace(intervals, frames, seed)
+
+    def on_timeout(signum, frame):
+        raise CaseTimeout
+
+    previous_handler = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = run_game(script_path, replay=trace)
+    except CaseTimeout:
+        result = {"status": "timeout", "seconds": timeout}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+    return result, trace
+
+
+def crash_signature(result: dict):
+    """
+    What tells crashes of a script apart: the exception type and the line
+    of the script it was raised from. None if the run didn't crash.
+    """
+    if result["status"] != "crashed":
+        return None
+    return result["error_type"], result["error_line"]
+
+
+def fuzz_case(data_dir: Path, name: str, policy: str, seed: int, frames: int, timeout: float):
+    """
+    Run a script once on the input of a policy. Runs in a worker process.
+
+    Returns:
+        Case dict with the "name", "policy", "seed" and "frames" of the run,
+        its harness "result", and for crashes the "intervals" of its input
+    """
+    intervals = POLICIES[policy](random.Random(f"fuzz/{policy}/{seed}"), frames)
+    result, _ = replay_intervals(data_dir / name, intervals, frames, seed, timeout)
+    case = {"name": name, "policy": policy, "seed": seed, "frames": frames, "result": result}
+    if crash_signature(result):
+        case["intervals"] = intervals
+    return case
+
+
+def minimize_case(data_dir: Path, case: dict, timeout: float, max_runs: int = DEFAULT_MINIMIZE_RUNS):
+    """
+    Shrink the input of a crashing case while it still crashes the same way.
+    Runs in a worker process.
+
+    The input is cut off at the frame of the crash, then chunks of key
+    presses are dropped, halving the chunk size down to single presses
+    (delta debugging), and finally the presses that are left are shortened
+    to one frame taps where that still crashes.
+
+    Args:
+        data_dir: Path to the data directory
+        case: Crashing case from fuzz_case
+        timeout: Seconds each run may take
+        max_runs: Most runs to spend on the minimization
+
+    Returns:
+        Dict with the minimized "intervals", "frames" and "trace", the
+        "result" of its run, and the number of "runs" it took
+    """
+    script_path = data_dir / case["name"]
+    signature = crash_signature(case["result"])
+    seed = case["seed"]
+    best = {"intervals": case["intervals"], "frames": case["result"]["frames"] + 1, "runs": 0}
+
+    def reproduces(intervals, frames):
+        if best["runs"] >= max_runs:
+            return False
+        best["runs"] += 1
+        result, trace = replay_intervals(script_path, intervals, frames, seed, timeout)
+        if crash_signature(result) != signature:
+            return False
+        best.update(intervals=intervals, frames=result["frames"] + 1, result=result, trace=trace)
+        return True
+
+    def clip(intervals, frames):
+        return [(key, start, min(end, frames)) for key, start, end in intervals if start < frames]
+
+    if not reproduces(clip(best["intervals"], best["frames"]), best["frames"]):
+        # Out of runs, or the crash needs input after it: keep the original run
+        best["result"], best["trace"] = replay_intervals(
+            script_path, case["intervals"], case["frames"], seed, timeout
+        )
+        best["frames"] = case["frames"]
+        return best
+
+    chunk = max(1, len(best["intervals"]) // 2)
+    while best["intervals"]:
+        start = 0
+        while start < len(best["intervals"]):
+            intervals = best["intervals"]
+            candidate = clip(intervals[:start] + intervals[start + chunk :], best["frames"])
+            if not reproduces(candidate, best["frames"]):
+                start += chunk
+        if chunk == 1:
+            break
+        chunk //= 2
+
+    for index, (key, start, end) in enumerate(best["intervals"]):
+        if end - start > 1:
+            intervals = list(best["intervals"])
+            intervals[index] = (key, start, start + 1)
+            reproduces(intervals, best["frames"])
+    return best
+
+
+def scaffold_paths(bugs_dir: Path, stem: str, number: int):
+    prefix = f"_{stem}_fuzz_{number}"
+    return bugs_dir / f"{prefix}_bug.py", bugs_dir / f"{prefix}_fix.py"
+
+
+def error_trace(result: dict, script_name: str, line_offset: int):
+    """
+    The traceback of a crash as if the script had been saved as script_name,
+    with the script's lines shifted by line_offset.
+    """
+    lines = ["Traceback (most recent call last):"]
+    for line, function, code in result["error_frames"]:
+        lines.append(f'  File "{script_name}", line {line + line_offset}, in {function}')
+        lines.append(f"    {code}")
+    lines.append(f"{result['error_type']}: {result['error']}" if result["error"] else result["error_type"])
+    return lines
+
+
+def fix_note(crash: dict, bug_name: str, error_line: int):
+    """
+    The placeholder BUG FIX paragraph of a _fix.py scaffold.
+    """
+    result = crash["result"]
+    text = (
+        f"BUG FIX: TODO. The input fuzzer crashed {bug_name} with {result['error_type']} at line "
+        f"{error_line} ({result['error_code']}) on frame {result['frames']}, with {crash['policy']} "
+        f"input. Replace this paragraph with where and how to fix the bug, fix the code below, and "
+        f"drop the leading underscore from both file names."
+    )
+    return textwrap.fill(text, width=90)
+
+
+def write_scaffolds(data_dir: Path, crash: dict):
+    """
+    Write the bug/fix scaffold pair of a crash to its family's bugs directory.
+
+    Returns:
+        [bug script name, fix script name] relative to the data directory,
+        or None if the crash already has a scaffold
+    """
+    script_path = data_dir / crash["name"]
+    family = crash["name"].split("/")[0]
+    bugs_dir = data_dir / family / "bugs"
+    stem = script_path.stem
+    script = parse_script(read_script_text(script_path))
+    error_count = 2 * len(crash["result"]["error_frames"]) + 2
+
+    # CREATE, ERROR and blank lines come before the body
+    line_offset = error_count + 2 - script.header_lines
+    number = 1
+    while True:
+        bug_path, fix_path = scaffold_paths(bugs_dir, stem, number)
+        # The name the bug script will have once it's reviewed, relative to
+        # data/, so the traceback doesn't depend on the machine or go stale
+        reviewed_path = bugs_dir / bug_path.name[1:]
+        reviewed_name = reviewed_path.relative_to(data_dir).as_posix()
+        trace = error_trace(crash["result"], reviewed_name, line_offset)
+        existing = [path for path in (bug_path, reviewed_path) if path.exists()]
+        if not existing:
+            break
+        # Compare everything but the file names
+        recorded = parse_header(read_script_text(existing[0]))["ERROR"]
+        if [line for line in recorded if "File " not in line] == [line for line in trace if "File " not in line]:
+            return None
+        number += 1
+
+    create = f"# CREATE: {family.replace('_', ' ')}"
+    body = script.body.rstrip("\n") + "\n"
+    bugs_dir.mkdir(exist_ok=True)
+    bug_path.write_text(
+        "\n".join([create] + [f"# ERROR: {line}" for line in trace]) + "\n\n" + body, encoding="utf-8"
+    )
+
+    note = fix_note(crash, reviewed_path.name, crash["result"]["error_line"] + line_offset)
+    docstring_end = body.find('"""', 3) if body.startswith('"""') else -1
+    if docstring_end == -1:
+        fixed = f'"""\n{note}\n"""\n\n{body}'
+    else:
+        fixed = body[:docstring_end].rstrip("\n") + f"\n\n{note}\n" + body[docstring_end:]
+    fix_path.write_text(f"{create}\n\n{fixed}", encoding="utf-8")
+    return [path.relative_to(data_dir).as_posix() for path in (bug_path, fix_path)]
+
+
+def run_fuzzer(
+    data_dir: Path,
+    names,
+    policies=tuple(POLICIES),
+    runs: int = DEFAULT_RUNS,
+    frames: int = DEFAULT_FRAMES,
+    seed: int = 0,
+    jobs: int = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+    minimize_runs: int = DEFAULT_MINIMIZE_RUNS,
+    output_dir: Path = Path("output") / "fuzz",
+    scaffolds: bool = True,
+):
+    """
+    Fuzz scripts on a process pool, and minimize and save every distinct crash.
+
+    Args:
+        data_dir: Path to the data directory
+        names: Script names relative to the data directory
+        policies: Names of the input policies to run
+        runs: Runs of each policy per script, with seeds seed, seed + 1, ...
+        frames: Frames of each run
+        seed: First seed of the policies and the random module
+        jobs: Number of worker processes (defaults to the CPU count)
+        timeout: Seconds each run may take
+        memory_mb: Address space limit of each worker process
+        minimize_runs: Most runs to spend minimizing each crash (0 to keep
+            the input of the first run that found it)
+        output_dir: Directory of the report and the minimized traces
+        scaffolds: Write bug/fix scaffolds for the crashes
+
+    Returns:
+        The report dict, see print_fuzz_report
+    """
+    data_dir = data_dir.absolute()
+    cases = [
+        (name, policy, seed + run) for name in names for policy in policies for run in range(runs)
+    ]
+
+    with tempfile.TemporaryDirectory() as work_dir, ProcessPoolExecutor(
+        max_workers=jobs or os.cpu_count(), initializer=init_worker, initargs=(work_dir, memory_mb)
+    ) as executor:
+        results = list(
+            executor.map(
+                fuzz_case,
+                *zip(*[(data_dir, name, policy, case_seed, frames, timeout) for name, policy, case_seed in cases]),
+            )
+        )
+
+        # The crash of a script that shows up first in the input is minimized
+        crashes = {}
+        for case in results:
+            signature = crash_signature(case["result"])
+            if signature is None:
+                continue
+            key = (case["name"],) + signature
+            crashes.setdefault(key, {"case": case, "hits": 0})
+            crashes[key]["hits"] += 1
+            if case["result"]["frames"] < crashes[key]["case"]["result"]["frames"]:
+                crashes[key]["case"] = case
+
+        crash_list = [crashes[key] for key in sorted(crashes, key=str)]
+        minimized = executor.map(
+            minimize_case,
+            [data_dir] * len(crash_list),
+            [crash["case"] for crash in crash_list],
+            [timeout] * len(crash_list),
+            [minimize_runs] * len(crash_list),
+        )
+        for crash, best in zip(crash_list, minimized):
+            crash["minimized"] = best
+
+    summary = {policy: Counter() for policy in policies}
+    for case in results:
+        summary[case["policy"]]["runs"] += 1
+        summary[case["policy"]][case["result"]["status"]] += 1
+
+    counts = Counter()
+    report_crashes = []
+    for crash in crash_list:
+        case, best = crash["case"], crash["minimized"]
+        name = case["name"]
+        counts[name] += 1
+        result = {key: value for key, value in best["result"].items() if key != "seconds"}
+        trace_file = output_dir / f"{name[: -len('.py')]}_fuzz_{counts[name]}.trace"
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        trace = best["trace"]
+        trace.metadata = {
+            "script": name,
+            "script_sha256": hashlib.sha256((data_dir / name).read_bytes()).hexdigest(),
+            "policy": case["policy"],
+            "result": result,
+        }
+        trace.save(trace_file)
+
+        entry = {
+            "name": name,
+            "error_type": result["error_type"],
+            "error": result["error"],
+            "error_line": result["error_line"],
+            "error_code": result["error_code"],
+            "policy": case["policy"],
+            "seed": case["seed"],
+            "hits": crash["hits"],
+            "frame": case["result"]["frames"],
+            "presses": len(case["intervals"]),
+            "minimized_frame": result["frames"],
+            "minimized_presses": len(best["intervals"]),
+            "minimize_runs": best["runs"],
+            "trace": trace_file.as_posix(),
+        }
+        if scaffolds:
+            entry["scaffold"] = write_scaffolds(data_dir, dict(case, result=best["result"]))
+        report_crashes.append(entry)
+
+    return {
+        "frames": frames,
+        "runs": runs,
+        "seed": seed,
+        "timeout": timeout,
+        "memory_mb": memory_mb,
+        "scripts": len(names),
+        "summary": {policy: dict(counts) for policy, counts in summary.items()},
+        "crashes": report_crashes,
+    }
+
+
+def print_fuzz_report(report: dict):
+    print("\n" + "=" * 76)
+    print(f"INPUT FUZZING ({report['scripts']} scripts, {report['runs']} runs x {report['frames']} frames per policy)")
+    print("=" * 76)
+    print(f"{'Policy':<20} {'Runs':<10} {'Survived':<10} {'Exited':<10} {'Crashed':<10} {'Other':<10}")
+    print("-" * 76)
+    for policy, counts in report["summary"].items():
+        other = counts["runs"] - sum(counts.get(status, 0) for status in ("survived", "exited", "crashed"))
+        print(
+            f"{policy:<20} {counts['runs']:<10} {counts.get('survived', 0):<10} "
+            f"{counts.get('exited', 0):<10} {counts.get('crashed', 0):<10} {other:<10}"
+        )
+    print("=" * 76)
+
+    print(f"{len(report['crashes'])} distinct crashes")
+    for crash in report["crashes"]:
+        print(f"\n{crash['name']}:{crash['error_line']} {crash['error_type']}: {crash['error']}")
+        print(
+            f"  {crash['hits']} runs, first by {crash['policy']} (seed {crash['seed']}) on frame {crash['frame']}; "
+            f"minimized from {crash['presses']} to {crash['minimized_presses']} key presses, "
+            f"frame {crash['minimized_frame']} ({crash['minimize_runs']} runs)"
+        )
+        print(f"  Trace: {crash['trace']}")
+        if crash.get("scaffold"):
+            print(f"  Scaffold: {', '.join(crash['scaffold'])}")
+        elif "scaffold" in crash:
+            print("  Scaffold: already written")
+
+
+def main():
+    from generate_dataset import collect_script_files
+
+    parser = argparse.ArgumentParser(
+        description="Fuzz the scripts in data/ with input policies, and minimize and scaffold the crashes"
+    )
+    parser.add_argument("scripts", nargs="*", help="Script names relative to data/ (default: scripts of --kind)")
+    parser.add_argument("--family", nargs="+", help="Only fuzz scripts from these game families")
+    parser.add_argument("--kind", choices=KINDS, default="remix", help="Only fuzz scripts of this kind (default: remix)")
+    parser.add_argument(
+        "--policy",
+        nargs="+",
+        choices=list(POLICIES),
+        default=list(POLICIES),
+        help="Input policies to run (default: all)",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=DEFAULT_RUNS, help=f"Runs of each policy per script (default: {DEFAULT_RUNS})"
+    )
+    parser.add_argument(
+        "--frames", type=int, default=DEFAULT_FRAMES, help=f"Frames of each run (default: {DEFAULT_FRAMES})"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="First random seed (default: 0)")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds each run may take (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=DEFAULT_MEMORY_MB,
+        help=f"Address space limit of each worker in MB (default: {DEFAULT_MEMORY_MB})",
+    )
+    parser.add_argument(
+        "--minimize-runs",
+        type=int,
+        default=DEFAULT_MINIMIZE_RUNS,
+        help=f"Most runs spent minimizing each crash, 0 to skip minimizing (default: {DEFAULT_MINIMIZE_RUNS})",
+    )
+    parser.add_argument(
+        "--no-scaffolds", action="store_true", help="Don't write bug/fix scaffolds to the bugs directories"
+    )
+
+    args = parser.parse_args()
+
+    data_dir = Path(__file__).parent.parent / "data"
+    names = args.scripts
+    if not names:
+        names = [
+            path.relative_to(data_dir).as_posix()
+            for path in collect_script_files(data_dir)
+            if script_kind(path, parse_header(read_script_text(path))) == args.kind
+        ]
+    if args.family:
+        names = [name for name in names if name.split("/")[0] in args.family]
+
+    output_dir = Path("output") / "fuzz"
+    report = run_fuzzer(
+        data_dir,
+        names,
+        args.policy,
+        args.runs,
+        args.frames,
+        args.seed,
+        args.jobs,
+        args.timeout,
+        args.memory_mb,
+        args.minimize_runs,
+        output_dir,
+        not args.no_scaffolds,
+    )
+    print_fuzz_report(report)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report_file = output_dir / "fuzz_report.json"
+    report_file.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nReport saved to: {report_file.absolute()}")
+
+
+if __name__ == "__main__":
+    main()
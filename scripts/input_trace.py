@@ -0,0 +1,310 @@
+"""
+Compact binary traces of the input a pygame script saw, for bit-exact replay.
+
+game_harness.py --record captures, for every frame, the events that
+pygame.event.get() returned and the keys that pygame.key.get_pressed()
+reported, along with the seed of the random module. --replay feeds them back
+on a virtual clock, so the script (or any variant of it) sees exactly the
+same input on the same frames:
+
+    python game_harness.py data/galaga/galaga_2d_starfield.py --frames 5000 --record crash.trace
+    python game_harness.py data/galaga/galaga_2d_starfield.py --replay crash.trace
+    python game_harness.py data/galaga/galaga_2d_starfield_oneshot.py --replay crash.trace
+
+Every script in data/ calls pygame.event.get() once per frame, so the events
+of a frame are returned by its first call and later calls in the same frame
+get none.
+
+A trace file is laid out as:
+
+    header   "PDTRC001", metadata length (little-endian uint32)
+    metadata JSON {"seed": ..., "script": ..., "script_sha256": ..., "result": ...}
+    frames   zlib-compressed stream of unsigned LEB128 varints:
+                 frame count
+                 per frame: event count, events, changed key count, changed
+                 scancodes (keys pressed or released since the last frame)
+
+Key events are stored as type, key, mod, scancode and unicode; other events
+as their type and their attributes as JSON.
+
+usage: `python input_trace.py TRACE`
+"""
+
+import argparse
+import json
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+TRACE_MAGIC = b"PDTRC001"
+TRACE_HEADER = struct.Struct("<8sI")
+
+# SDL_KEYDOWN and SDL_KEYUP, stored without their attribute names
+KEY_EVENT_TYPES = (0x300, 0x301)
+
+
+class TraceError(ValueError):
+    pass
+
+
+@dataclass
+class TraceFrame:
+    """
+    The input of one frame.
+
+    Attributes:
+        events: List of (event type, attribute dict), in the order
+            pygame.event.get() returned them
+        pressed: Sorted tuple of the scancodes held down
+    """
+
+    events: list = field(default_factory=list)
+    pressed: tuple = ()
+
+
+@dataclass
+class InputTrace:
+    """
+    The input of a run of a script, frame by frame.
+
+    Attributes:
+        seed: Seed of the random module
+        frames: List of TraceFrame. The last frame is partial if the script
+            exited or crashed before finishing it.
+        metadata: The recorded script, its hash, and the result of the run
+    """
+
+    seed: int = 0
+    frames: list = field(default_factory=list)
+    metadata: dict = field(default_factory=dict)
+
+    def save(self, path: Path):
+        body = bytearray()
+        write_varint(body, len(self.frames))
+        previous = set()
+        for frame in self.frames:
+            write_varint(body, len(frame.events))
+            for event_type, attributes in frame.events:
+                write_event(body, event_type, attributes)
+            changed = sorted(previous.symmetric_difference(frame.pressed))
+            write_varint(body, len(changed))
+            for scancode in changed:
+                write_varint(body, scancode)
+            previous = set(frame.pressed)
+
+        metadata = json.dumps(dict(self.metadata, seed=self.seed)).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(TRACE_HEADER.pack(TRACE_MAGIC, len(metadata)))
+            f.write(metadata)
+            f.write(zlib.compress(bytes(body), 9))
+
+    @classmethod
+    def load(cls, path: Path):
+        data = Path(path).read_bytes()
+        magic, metadata_length = TRACE_HEADER.unpack_from(data)
+        if magic != TRACE_MAGIC:
+            raise TraceError(f"{path} is not an input trace")
+        start = TRACE_HEADER.size
+        metadata = json.loads(data[start : start + metadata_length])
+        body = memoryview(zlib.decompress(data[start + metadata_length :]))
+
+        position = 0
+
+        def read():
+            nonlocal position
+            value, position = read_varint(body, position)
+            return value
+
+        frames = []
+        pressed = set()
+        for _ in range(read()):
+            events = []
+            for _ in range(read()):
+                event, position = read_event(body, position)
+                events.append(event)
+            for _ in range(read()):
+                pressed.symmetric_difference_update([read()])
+            frames.append(TraceFrame(events, tuple(sorted(pressed))))
+
+        return cls(metadata.pop("seed"), frames, metadata)
+
+
+def write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position: int):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def write_bytes(buffer: bytearray, value: bytes):
+    write_varint(buffer, len(value))
+    buffer += value
+
+
+def read_bytes(data, position: int):
+    length, position = read_varint(data, position)
+    return bytes(data[position : position + length]), position + length
+
+
+def write_event(buffer: bytearray, event_type: int, attributes: dict):
+    write_varint(buffer, event_type)
+    if event_type in KEY_EVENT_TYPES:
+        for name in ("key", "mod", "scancode"):
+            write_varint(buffer, attributes.get(name, 0))
+        write_bytes(buffer, attributes.get("unicode", "").encode("utf-8"))
+    else:
+        write_bytes(buffer, json.dumps(attributes).encode("utf-8"))
+
+
+def read_event(data, position: int):
+    event_type, position = read_varint(data, position)
+    if event_type in KEY_EVENT_TYPES:
+        attributes = {}
+        for name in ("key", "mod", "scancode"):
+            attributes[name], position = read_varint(data, position)
+        unicode, position = read_bytes(data, position)
+        attributes["unicode"] = unicode.decode("utf-8")
+    else:
+        encoded, position = read_bytes(data, position)
+        attributes = json.loads(encoded)
+    return (event_type, attributes), position
+
+
+def event_attributes(event):
+    """
+    The attributes of a pygame event that can be stored in a trace.
+
+    Attributes like the SDL window of an event are left out.
+    """
+    return {
+        name: value
+        for name, value in event.dict.items()
+        if isinstance(value, (int, float, str, bool, type(None), list, tuple))
+    }
+
+
+def pressed_scancodes(pressed):
+    """
+    Scancodes held down in a pygame.key.get_pressed() result.
+    """
+    return tuple(scancode for scancode, down in enumerate(pressed) if down)
+
+
+def key_state(pygame, scancodes):
+    """
+    A pygame.key.get_pressed() result with the given scancodes held down.
+    """
+    state = [False] * 512
+    for scancode in scancodes:
+        state[scancode] = True
+    return pygame.key.ScancodeWrapper(state)
+
+
+class TraceRecorder:
+    """
+    Records what an input source of game_harness.py returns to the script.
+    """
+
+    def __init__(self, source, trace: InputTrace):
+        self.source = source
+        self.trace = trace
+        self.frame = TraceFrame()
+        self._pressed = None
+
+    def get_events(self, *args, **kwargs):
+        events = self.source.get_events(*args, **kwargs)
+        self.frame.events.extend((event.type, event_attributes(event)) for event in events)
+        return events
+
+    def get_pressed(self):
+        pressed = self.source.get_pressed()
+        if self._pressed is None:
+            self._pressed = pressed_scancodes(pressed)
+        return pressed
+
+    def end_frame(self):
+        self.frame.pressed = self._pressed if self._pressed is not None else ()
+        self.trace.frames.append(self.frame)
+        self.frame = TraceFrame()
+        self._pressed = None
+        self.source.end_frame()
+
+    def finish(self):
+        """
+        Keep the partial last frame of a script that exited or crashed.
+        """
+        if self.frame.events or self._pressed is not None:
+            self.frame.pressed = self._pressed or ()
+            self.trace.frames.append(self.frame)
+
+
+class TraceReplay:
+    """
+    Input source of game_harness.py that plays back an InputTrace.
+
+    The real event queue is still drained every frame, so timer events and
+    the window's own events don't pile up, but what it holds is ignored.
+    """
+
+    def __init__(self, pygame, trace: InputTrace):
+        self.pygame = pygame
+        self.trace = trace
+        self.frame_index = 0
+        self._delivered = False
+        self._get_events = pygame.event.get
+
+    def _frame(self):
+        if self.frame_index < len(self.trace.frames):
+            return self.trace.frames[self.frame_index]
+        return TraceFrame()
+
+    def get_events(self, *args, **kwargs):
+        self._get_events()
+        if self._delivered:
+            return []
+        self._delivered = True
+        return [
+            self.pygame.event.Event(event_type, **attributes)
+            for event_type, attributes in self._frame().events
+        ]
+
+    def get_pressed(self):
+        return key_state(self.pygame, self._frame().pressed)
+
+    def end_frame(self):
+        self.frame_index += 1
+        self._delivered = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize an input trace recorded by game_harness.py --record")
+    parser.add_argument("trace", type=Path, help="The trace file")
+
+    args = parser.parse_args()
+
+    trace = InputTrace.load(args.trace)
+    events = sum(len(frame.events) for frame in trace.frames)
+    key_frames = sum(1 for frame in trace.frames if frame.pressed)
+    print(f"Script:  {trace.metadata.get('script')}")
+    print(f"Seed:    {trace.seed}")
+    print(f"Frames:  {len(trace.frames):,} ({key_frames:,} with keys held)")
+    print(f"Events:  {events:,}")
+    print(f"Size:    {args.trace.stat().st_size:,} bytes")
+    print(f"Result:  {json.dumps(trace.metadata.get('result'))}")
+
+
+if __name__ == "__main__":
+    main()
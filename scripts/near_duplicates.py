@@ -0,0 +1,327 @@
+"""
+MinHash/LSH near-duplicate index over every script in the data directory.
+
+The oneshot scripts were made with `cp` from their remix counterparts, and the
+bug/fix pairs are copies of a base game, so many scripts are near-identical.
+This script shingles each script into 5-token windows, computes a MinHash
+signature per script (in parallel), finds candidate pairs with LSH banding,
+and merges pairs whose estimated Jaccard similarity is over the threshold into
+clusters. Clusters are complete-linkage: every two scripts in a cluster are
+over the threshold, not just linked through a chain of similar pairs.
+
+Only scripts that complete the same task are compared: the same kind with the
+same prompt (see script_task). Two remixes of one base game share most of
+their code but teach different changes, and a oneshot copy of a remix is a
+create task, so neither is a near-duplicate of the remix.
+
+Signatures are persisted to output/near_duplicates.json keyed by each script's
+SHA-256, so only new or edited scripts are re-hashed on the next run.
+
+usage: `python near_duplicates.py [--threshold 0.8] [--jobs N]`
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from script_metadata import parse_header, script_kind
+
+# Bump this when the signature parameters change, to invalidate persisted signatures
+INDEX_VERSION = 1
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+SHINGLE_TOKENS = 5
+
+MERSENNE_PRIME = (1 << 61) - 1
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+PROMPT_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Fixed seed so signatures are comparable across runs and machines
+_rng = random.Random(1337)
+PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def script_shingles(text: str):
+    """
+    Hash every window of SHINGLE_TOKENS consecutive tokens into a 64 bit int.
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    return {
+        int.from_bytes(
+            hashlib.blake2b(
+                " ".join(tokens[i : i + SHINGLE_TOKENS]).encode("utf-8"), digest_size=8
+            ).digest(),
+            "little",
+        )
+        for i in range(max(1, len(tokens) - SHINGLE_TOKENS + 1))
+    }
+
+
+def minhash_signature(script_path: Path):
+    """
+    Compute the MinHash signature of a script. Process pool entry point.
+
+    Returns:
+        Tuple of (script path, list of NUM_PERMUTATIONS ints)
+    """
+    shingles = script_shingles(script_path.read_text(encoding="utf-8"))
+    return script_path, [
+        min((a * shingle + b) % MERSENNE_PRIME for shingle in shingles)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def estimated_jaccard(signature_a, signature_b):
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def script_task(script_path: Path, text: str):
+    """
+    The task a script is the completion of, as a hashable key.
+
+    Base scripts are keyed on their CREATE prompt and remixes on their SOURCE
+    and REMIX prompt, compared case-insensitively on their words only. Bug
+    and fix scripts are each their own task.
+    """
+    header = parse_header(text)
+    kind = script_kind(script_path, header)
+    if kind in ("bug", "fix"):
+        return (kind, script_path.stem)
+    if kind == "remix":
+        prompt = header["REMIX"]
+    else:
+        prompt = header.get("CREATE", script_path.stem)
+    return (kind, header.get("SOURCE"), " ".join(PROMPT_WORD_PATTERN.findall(prompt.lower())))
+
+
+def collect_all_scripts(data_dir: Path):
+    """
+    Every script under the data directory, including bug/fix files, in sorted
+    order. Directories and scripts whose names start with an underscore are
+    skipped, as in generate_dataset.collect_script_files.
+    """
+    return sorted(
+        path
+        for path in data_dir.rglob("*.py")
+        if not any(part.startswith("_") for part in path.relative_to(data_dir).parts)
+    )
+
+
+def load_index(index_file: Path):
+    if not index_file.exists():
+        return {}
+    try:
+        index = json.loads(index_file.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable near-duplicate index {index_file}: {e}")
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index.get("signatures", {})
+
+
+def build_near_duplicate_index(
+    data_dir: Path, index_file: Path, threshold: float = 0.8, jobs: int = 1
+):
+    """
+    Build (or incrementally update) the near-duplicate index and its clusters.
+
+    Args:
+        data_dir: Path to the data directory
+        index_file: Path of the persisted index JSON file
+        threshold: Minimum estimated Jaccard similarity for two scripts to be
+            near-duplicates
+        jobs: Number of worker processes used to compute signatures
+
+    Returns:
+        List of clusters, each a sorted list of script names relative to the
+        data directory. Only clusters with more than one script are returned.
+    """
+    scripts = collect_all_scripts(data_dir)
+    cached = load_index(index_file)
+
+    signatures = {}
+    hashes = {}
+    tasks = {}
+    dirty = []
+    for script_path in scripts:
+        name = script_path.relative_to(data_dir).as_posix()
+        content = script_path.read_bytes()
+        hashes[name] = hashlib.sha256(content).hexdigest()
+        tasks[name] = script_task(script_path, content.decode("utf-8"))
+        entry = cached.get(name)
+        if entry is not None and entry["sha256"] == hashes[name]:
+            signatures[name] = entry["signature"]
+        else:
+            dirty.append(script_path)
+
+    if jobs > 1 and len(dirty) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(minhash_signature, dirty, chunksize=4))
+    else:
+        results = [minhash_signature(script_path) for script_path in dirty]
+
+    for script_path, signature in results:
+        signatures[script_path.relative_to(data_dir).as_posix()] = signature
+
+    # LSH banding: scripts of the same task that agree on every row of any
+    # band are candidates
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = defaultdict(list)
+    for name in sorted(signatures):
+        signature = signatures[name]
+        for band in range(LSH_BANDS):
+            buckets[(tasks[name], band, tuple(signature[band * rows : (band + 1) * rows]))].append(name)
+
+    # Verified candidate pairs, most similar first
+    pairs = set()
+    for bucket in buckets.values():
+        for i, name_a in enumerate(bucket):
+            for name_b in bucket[i + 1 :]:
+                pairs.add((name_a, name_b))
+    similar = sorted(
+        (
+            (similarity, name_a, name_b)
+            for name_a, name_b in pairs
+            if (similarity := estimated_jaccard(signatures[name_a], signatures[name_b])) >= threshold
+        ),
+        key=lambda pair: (-pair[0], pair[1], pair[2]),
+    )
+
+    # Complete linkage: two clusters only merge if every script of one is a
+    # near-duplicate of every script of the other, so chains of pairs don't
+    # pull in scripts that are nowhere near the threshold
+    cluster_of = {name: name for name in signatures}
+    members = {name: [name] for name in signatures}
+    for _, name_a, name_b in similar:
+        root_a, root_b = cluster_of[name_a], cluster_of[name_b]
+        if root_a == root_b:
+            continue
+        if all(
+            estimated_jaccard(signatures[a], signatures[b]) >= threshold
+            for a in members[root_a]
+            for b in members[root_b]
+        ):
+            for name in members[root_b]:
+                cluster_of[name] = root_a
+            members[root_a].extend(members.pop(root_b))
+
+    members = {root: sorted(cluster) for root, cluster in members.items()}
+    clusters = sorted(cluster for cluster in members.values() if len(cluster) > 1)
+
+    index = {
+        "version": INDEX_VERSION,
+        "threshold": threshold,
+        "signatures": {
+            name: {"sha256": hashes[name], "signature": signatures[name]}
+            for name in sorted(signatures)
+        },
+        "clusters": clusters,
+    }
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    index_file.write_text(json.dumps(index), encoding="utf-8")
+
+    return clusters
+
+
+def cap_cluster_multiplicity(records, clusters, max_per_cluster: int, capped: dict):
+    """
+    Keep at most max_per_cluster records from each near-duplicate cluster, in
+    dataset order.
+
+    Bug fix records are never capped: their prompt is a near-copy of a base
+    game by construction, and they teach a different task than creating or
+    remixing that game.
+
+    Args:
+        records: Iterable of DatasetRecord
+        clusters: Clusters from build_near_duplicate_index
+        max_per_cluster: Maximum records kept per cluster
+        capped: Dict that receives, for each cluster that lost records, a dict
+            with the names of its "kept" and "dropped" records
+
+    Yields:
+        Each DatasetRecord that is kept
+    """
+    cluster_of = {name: i for i, cluster in enumerate(clusters) for name in cluster}
+    kept = defaultdict(list)
+
+    for record in records:
+        cluster = cluster_of.get(record.name)
+        if record.game_type == "bug_fix" or cluster is None:
+            yield record
+            continue
+
+        if len(kept[cluster]) >= max_per_cluster:
+            entry = capped.setdefault(cluster, {"kept": kept[cluster], "dropped": []})
+            entry["dropped"].append(record.name)
+            continue
+
+        kept[cluster].append(record.name)
+        yield record
+
+
+def print_capped_clusters(capped: dict, max_per_cluster: int):
+    """
+    Print what cap_cluster_multiplicity kept and dropped from each cluster.
+    """
+    dropped = sum(len(entry["dropped"]) for entry in capped.values())
+    print("\n" + "=" * 60)
+    print(f"NEAR-DUPLICATE CAP (max {max_per_cluster} per cluster, {dropped} records dropped)")
+    print("=" * 60)
+    if not capped:
+        print("No cluster was over the cap")
+    for cluster in sorted(capped):
+        print("kept:    " + ", ".join(capped[cluster]["kept"]))
+        print("dropped: " + ", ".join(capped[cluster]["dropped"]))
+    print("=" * 60)
+
+
+def print_clusters(clusters):
+    duplicates = sum(len(cluster) for cluster in clusters)
+    print("\n" + "=" * 60)
+    print(f"NEAR-DUPLICATE CLUSTERS ({len(clusters)} clusters, {duplicates} scripts)")
+    print("=" * 60)
+    for cluster in clusters:
+        print(f"[{len(cluster)}] " + ", ".join(cluster))
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate scripts in data/ with MinHash/LSH"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.8,
+        help="Minimum estimated Jaccard similarity of near-duplicates (default: 0.8)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to compute signatures (default: 1)",
+    )
+
+    args = parser.parse_args()
+
+    data_dir = Path(__file__).parent.parent / "data"
+    index_file = Path("output") / "near_duplicates.json"
+
+    clusters = build_near_duplicate_index(data_dir, index_file, args.threshold, args.jobs)
+    print_clusters(clusters)
+    print(f"\nIndex saved to: {index_file.absolute()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Versioned registry of the prompt templates used by generate_dataset.py.
+
+Each version maps template names to `str.format` templates. The placeholder
+names match the variables Infinity Arcade uses when it calls the model
+(`content` and `mode_data`), so the prompts can be kept in sync.
+
+Versions:
+- v1: The original create, remix and bug fix prompts, byte-for-byte,
+  including the four spaces of indentation on every rules line. These are the
+  prompts the iat-0X models were trained on and that Infinity Arcade
+  currently sends. v1 also has the newer remix follow-up and patch templates,
+  which no model has been trained on yet and Infinity Arcade doesn't send.
+- v2: v1 normalized: every line dedented, trailing whitespace removed and
+  runs of blank lines collapsed. Same wording, with up to ten tokens less per
+  template under a BPE tokenizer, which spends tokens on the indentation.
+  The offline estimate counts any run of whitespace as one token, so token
+  costs are only compared with a real tokenizer.
+
+To try a new prompt wording, register a new version instead of editing an
+existing one, so every dataset stays reproducible from its recorded version.
+
+usage: `python prompt_templates.py --tokenizer tokenizer.json`
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+
+DEFAULT_PROMPT_VERSION = "v1"
+
+LEGACY_TEMPLATES = {
+    "create_system": """You are an expert Python game developer. Generate a complete, working Python game using pygame based on the user's description.
+
+    Rules:
+    1. Use ONLY the pygame library - no external images, sounds, or files
+    2. Create everything (graphics, colors, shapes) using pygame's built-in drawing functions
+    3. Make the game fully playable and fun
+    4. Include proper game mechanics (win/lose conditions, scoring if appropriate)
+    5. Use proper pygame event handling and game loop
+    6. Add comments explaining key parts of the code
+    7. Make sure the game window closes properly when the user clicks the X button
+    8. Use reasonable colors and make the game visually appealing with pygame primitives
+
+    Generate ONLY the Python code wrapped in a markdown code block using triple backticks (```python). Do not include any explanations outside the code block.""",
+    "create_user": """Create a game: {content}""",
+    "remix_system": """You are an expert Python game developer. You will be given an existing pygame game and a modification request. Your task is to modify the existing game according to the user's request while keeping it fully functional.
+
+    Rules:
+    1. Use ONLY the pygame library - no external images, sounds, or files
+    2. Keep the core game mechanics intact unless specifically asked to change them
+    3. Make the requested modifications while ensuring the game remains playable
+    4. Maintain proper pygame event handling and game loop
+    5. Add comments explaining the changes you made
+    6. Make sure the game window closes properly when the user clicks the X button
+    7. Use reasonable colors and make the game visually appealing with pygame primitives
+
+    Generate ONLY the complete modified Python code wrapped in a markdown code block using triple backticks (```python).""",
+    "remix_user": """Here is the existing game code:
+
+    ```python
+    {content}
+    ```
+
+    Please modify this game according to this request: {mode_data}
+
+    Provide the complete modified game code.""",
+    "bug_fix_system": """You are a Python expert debugging a pygame script that has an error. Generate ONLY the fixed Python code wrapped in a markdown code block using triple backticks (```python). Do not include any explanations outside the code block.""",
+    "bug_fix_user": """Error:
+{error_trace}
+
+Script with error:
+```python
+{bug_content}
+```
+
+Please fix the bug and provide the corrected code.""",
+}
+
+
+# Templates added since, for --chain-conversations and the diff and
+# search/replace --remix-format targets. They're written in the style of the
+# legacy templates (including their indentation) so they sit alongside them in v1.
+ADDED_TEMPLATES = {
+    "remix_followup_user": """Please modify this game according to this request: {mode_data}
+
+    Provide the complete modified game code.""",
+    "remix_diff_system": """You are an expert Python game developer. You will be given an existing pygame game and a modification request. Your task is to modify the existing game according to the user's request while keeping it fully functional.
+
+    Rules:
+    1. Use ONLY the pygame library - no external images, sounds, or files
+    2. Keep the core game mechanics intact unless specifically asked to change them
+    3. Make the requested modifications while ensuring the game remains playable
+    4. Maintain proper pygame event handling and game loop
+    5. Add comments explaining the changes you made
+    6. Make sure the game window closes properly when the user clicks the X button
+    7. Use reasonable colors and make the game visually appealing with pygame primitives
+
+    Generate ONLY a unified diff against the existing code wrapped in a markdown code block using triple backticks (```diff).""",
+    "remix_search_replace_system": """You are an expert Python game developer. You will be given an existing pygame game and a modification request. Your task is to modify the existing game according to the user's request while keeping it fully functional.
+
+    Rules:
+    1. Use ONLY the pygame library - no external images, sounds, or files
+    2. Keep the core game mechanics intact unless specifically asked to change them
+    3. Make the requested modifications while ensuring the game remains playable
+    4. Maintain proper pygame event handling and game loop
+    5. Add comments explaining the changes you made
+    6. Make sure the game window closes properly when the user clicks the X button
+    7. Use reasonable colors and make the game visually appealing with pygame primitives
+
+    Generate ONLY search/replace blocks wrapped in a markdown code block using triple backticks (```text). Each block is <<<<<<< SEARCH, lines copied exactly from the existing code, =======, the replacement lines, and >>>>>>> REPLACE. Each SEARCH section must match exactly one place in the code.""",
+    "remix_patch_user": """Here is the existing game code:
+
+    ```python
+    {content}
+    ```
+
+    Please modify this game according to this request: {mode_data}
+
+    Provide only the changes to the game code.""",
+}
+
+
+def normalize_template(template: str):
+    """
+    Dedent every line, strip trailing whitespace and collapse runs of blank lines.
+
+    This runs on the template before placeholders are filled in, so code that
+    is substituted into a template keeps its own indentation.
+    """
+    text = "\n".join(line.strip() for line in template.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+TEMPLATE_VERSIONS = {
+    "v1": {**LEGACY_TEMPLATES, **ADDED_TEMPLATES},
+    "v2": {
+        name: normalize_template(template)
+        for name, template in {**LEGACY_TEMPLATES, **ADDED_TEMPLATES}.items()
+    },
+}
+
+
+def get_templates(version: str = DEFAULT_PROMPT_VERSION):
+    """
+    Look up the templates of a registered version.
+
+    Raises:
+        ValueError: if the version isn't registered
+    """
+    if version not in TEMPLATE_VERSIONS:
+        raise ValueError(
+            f"Unknown prompt version {version!r}, expected one of: "
+            + ", ".join(TEMPLATE_VERSIONS)
+        )
+    return TEMPLATE_VERSIONS[version]
+
+
+def template_fingerprint(version: str):
+    """
+    SHA-256 of a version's templates, recorded next to datasets built with it.
+    """
+    encoded = json.dumps(get_templates(version), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def template_token_costs(version: str, count_tokens):
+    """
+    Tokens each template adds to a record, not counting the filled in placeholders.
+
+    Args:
+        version: Registered prompt version
+        count_tokens: Function from dataset_tokens.load_token_counter
+
+    Returns:
+        Dict mapping template name to token count
+    """
+    templates = get_templates(version)
+    names = sorted(templates)
+    texts = [re.sub(r"\{\w+\}", "", templates[name]) for name in names]
+    return dict(zip(names, count_tokens(texts)))
+
+
+def ab_prompt_version(name: str, versions):
+    """
+    Deterministically assign a script to one of several prompt versions for
+    an A/B comparison, by hashing its name.
+    """
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    return versions[int.from_bytes(digest[:8], "little") % len(versions)]
+
+
+def print_template_costs(versions, count_tokens):
+    """
+    Print a table of per template token costs for each version.
+    """
+    costs = {version: template_token_costs(version, count_tokens) for version in versions}
+    names = sorted(get_templates(versions[0]))
+
+    width = 32 + 10 * len(versions)
+    print("\n" + "=" * width)
+    print("PROMPT TEMPLATE TOKENS")
+    print("=" * width)
+    print(f"{'Template':<32}" + "".join(f"{version:<10}" for version in versions))
+    print("-" * width)
+    for name in names:
+        print(f"{name:<32}" + "".join(f"{costs[v][name]:<10,}" for v in versions))
+    print("=" * width)
+
+
+def main():
+    from dataset_tokens import load_token_counter
+
+    parser = argparse.ArgumentParser(
+        description="Show the token cost of every registered prompt template version"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=Path,
+        required=True,
+        help="Local tokenizer.json of the model (requires `pip install tokenizers`). The offline estimate can't tell the versions apart.",
+    )
+
+    args = parser.parse_args()
+
+    count_tokens, _ = load_token_counter(args.tokenizer)
+    print_template_costs(list(TEMPLATE_VERSIONS), count_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Compact remix targets: express a remix as a patch against its base game.
+
+Two patch formats are supported:
+- "diff": a unified diff, like `diff -u` produces
+- "search-replace": a sequence of blocks that each replace one unique
+  snippet of the current code:
+
+    <<<<<<< SEARCH
+    original lines
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+Patches work on lines; applying a patch to the base code joins the patched
+lines with "\\n", which is how generate_dataset.py embeds code in records.
+"""
+
+import difflib
+import re
+
+PATCH_FORMATS = ("diff", "search-replace")
+
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """
+    A patch could not be applied to the code it was made for.
+    """
+
+
+def make_unified_diff(base_code: str, new_code: str, base_name: str, new_name: str):
+    return "\n".join(
+        difflib.unified_diff(
+            base_code.splitlines(),
+            new_code.splitlines(),
+            f"a/{base_name}",
+            f"b/{new_name}",
+            lineterm="",
+        )
+    )
+
+
+def apply_unified_diff(base_code: str, patch: str):
+    """
+    Apply a unified diff made by make_unified_diff.
+    """
+    base_lines = base_code.splitlines()
+    patch_lines = patch.splitlines()
+    result = []
+    position = 0
+
+    i = 0
+    while i < len(patch_lines) and not patch_lines[i].startswith("@@"):
+        i += 1
+
+    while i < len(patch_lines):
+        match = HUNK_HEADER_PATTERN.match(patch_lines[i])
+        if match is None:
+            raise PatchError(f"Bad hunk header: {patch_lines[i]}")
+        old_start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        # An empty old range points at the line before the insertion
+        hunk_start = old_start - 1 if old_count else old_start
+        if hunk_start < position:
+            raise PatchError("Overlapping hunks")
+        result.extend(base_lines[position:hunk_start])
+        position = hunk_start
+        i += 1
+
+        while i < len(patch_lines) and not patch_lines[i].startswith("@@"):
+            line = patch_lines[i]
+            tag, text = line[:1], line[1:]
+            if tag in (" ", "-"):
+                if position >= len(base_lines) or base_lines[position] != text:
+                    raise PatchError(f"Patch does not match line {position + 1}")
+                position += 1
+                if tag == " ":
+                    result.append(text)
+            elif tag == "+":
+                result.append(text)
+            elif line != "\\ No newline at end of file":
+                raise PatchError(f"Bad patch line: {line}")
+            i += 1
+
+    result.extend(base_lines[position:])
+    return "\n".join(result)
+
+
+def count_occurrences(lines, snippet):
+    if not snippet:
+        return len(lines) + 1
+    return sum(
+        1
+        for i in range(len(lines) - len(snippet) + 1)
+        if lines[i : i + len(snippet)] == snippet
+    )
+
+
+def make_search_replace(base_code: str, new_code: str, context: int = 2):
+    """
+    Express the change from base_code to new_code as search/replace blocks.
+
+    Nearby changes are grouped together, and each block's search snippet is
+    widened with surrounding lines until it is unique in the base code.
+    """
+    base_lines = base_code.splitlines()
+    new_lines = new_code.splitlines()
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+
+    blocks = []
+    for group in matcher.get_grouped_opcodes(context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+
+        # Widen with equal lines on both sides until the search is unique
+        while count_occurrences(base_lines, base_lines[i1:i2]) != 1:
+            if i1 > 0:
+                i1 -= 1
+                j1 -= 1
+            if i2 < len(base_lines):
+                i2 += 1
+                j2 += 1
+            if i1 == 0 and i2 == len(base_lines):
+                break
+
+        search = "\n".join(base_lines[i1:i2])
+        replace = "\n".join(new_lines[j1:j2])
+        blocks.append(
+            f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+            if replace
+            else f"<<<<<<< SEARCH\n{search}\n=======\n>>>>>>> REPLACE"
+        )
+
+    return "\n".join(blocks)
+
+
+def apply_search_replace(base_code: str, patch: str):
+    """
+    Apply search/replace blocks in order. Every search snippet must match
+    exactly one run of whole lines of the code at the time it is applied.
+    """
+    lines = base_code.splitlines()
+    patch_lines = patch.splitlines()
+
+    i = 0
+    while i < len(patch_lines):
+        if patch_lines[i] != "<<<<<<< SEARCH":
+            raise PatchError(f"Expected a SEARCH marker, got: {patch_lines[i]}")
+        divider = patch_lines.index("=======", i + 1)
+        end = patch_lines.index(">>>>>>> REPLACE", divider + 1)
+        search = patch_lines[i + 1 : divider]
+        replace = patch_lines[divider + 1 : end]
+
+        matches = [
+            start
+            for start in range(len(lines) - len(search) + 1)
+            if lines[start : start + len(search)] == search
+        ]
+        if len(matches) != 1:
+            raise PatchError(f"Search block matches {len(matches)} times")
+        lines[matches[0] : matches[0] + len(search)] = replace
+        i = end + 1
+
+    return "\n".join(lines)
+
+
+def make_patch(patch_format: str, base_code: str, new_code: str, base_name: str, new_name: str):
+    """
+    Make a patch and check that applying it reproduces new_code exactly.
+
+    Raises:
+        PatchError: if the patch doesn't round-trip
+    """
+    if patch_format == "diff":
+        patch = make_unified_diff(base_code, new_code, base_name, new_name)
+        patched = apply_unified_diff(base_code, patch)
+    elif patch_format == "search-replace":
+        patch = make_search_replace(base_code, new_code)
+        patched = apply_search_replace(base_code, patch)
+    else:
+        raise ValueError(f"Unknown patch format: {patch_format}")
+
+    if patched != "\n".join(new_code.splitlines()):
+        raise PatchError(f"{patch_format} patch does not reproduce {new_name}")
+
+    return patch
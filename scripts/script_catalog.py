@@ -0,0 +1,316 @@
+"""
+Persistent SQLite catalog of every script in the data directory.
+
+One row per script holds its family, kind, header fields, content hash, line
+and token counts, and AST size, so statistics and filtering are indexed
+queries instead of a rescan of the data directory. The catalog is updated
+incrementally: scripts whose mtime and size are unchanged are skipped, and
+scripts that were touched but whose content hash is unchanged only get
+their mtime updated.
+
+Token counts depend on the tokenizer, so scripts counted with a different
+tokenizer are recounted.
+
+generate_dataset.py only builds and updates the catalog when it selects
+scripts by --family.
+
+usage: `python script_catalog.py [--tokenizer tokenizer.json] [--family NAME] [--kind KIND]`
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from script_metadata import count_code_lines, parse_script, script_kind
+
+# Bump this when the schema changes, to rebuild existing catalogs
+CATALOG_VERSION = 1
+
+KINDS = ("base", "remix", "bug", "fix")
+
+
+class UnknownFamilyError(ValueError):
+    """
+    A game family was asked for that has no cataloged scripts.
+    """
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    name TEXT PRIMARY KEY,
+    family TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT,
+    remix_prompt TEXT,
+    create_prompt TEXT,
+    error_trace TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    code_lines INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    tokenizer TEXT NOT NULL,
+    ast_nodes INTEGER
+);
+CREATE INDEX IF NOT EXISTS scripts_family_kind ON scripts (family, kind);
+CREATE INDEX IF NOT EXISTS scripts_kind ON scripts (kind);
+"""
+
+
+def describe_script(script_path: Path, content: bytes):
+    """
+    Compute the catalog columns of a script that don't need a tokenizer.
+
+    Returns:
+        Dict of column values, plus the script "body" for token counting
+    """
+    text = content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    script = parse_script(text)
+    try:
+        ast_nodes = sum(1 for _ in ast.walk(ast.parse(text)))
+    except SyntaxError:
+        # Bug scripts may have a SyntaxError on purpose
+        ast_nodes = None
+
+    return {
+        "kind": script_kind(script_path, script.header),
+        "source": script.header.get("SOURCE"),
+        "remix_prompt": script.header.get("REMIX"),
+        "create_prompt": script.header.get("CREATE"),
+        "error_trace": "\n".join(script.header["ERROR"]) or None,
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "lines": len(text.splitlines()),
+        "code_lines": count_code_lines(script.body),
+        "ast_nodes": ast_nodes,
+        "body": script.body,
+    }
+
+
+class ScriptCatalog:
+    """
+    The SQLite catalog of the scripts in a data directory.
+    """
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS scripts")
+            self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, data_dir: Path, script_files, count_tokens, tokenizer_name: str):
+        """
+        Bring the catalog up to date with the given scripts.
+
+        Args:
+            data_dir: Path to the data directory
+            script_files: Every script to catalog; rows of other scripts are removed
+            count_tokens: Function from dataset_tokens.load_token_counter, used
+                to count the tokens of each script's code
+            tokenizer_name: Name of the tokenizer behind count_tokens
+
+        Returns:
+            Dict with the number of "added", "updated", "touched", "removed"
+            and "unchanged" scripts
+        """
+        rows = {
+            row["name"]: row
+            for row in self.connection.execute(
+                "SELECT name, mtime_ns, size, sha256, tokenizer FROM scripts"
+            )
+        }
+        changes = {"added": 0, "updated": 0, "touched": 0, "removed": 0, "unchanged": 0}
+
+        dirty = []
+        names = set()
+        for script_path in script_files:
+            name = script_path.relative_to(data_dir).as_posix()
+            names.add(name)
+            stat = script_path.stat()
+            row = rows.get(name)
+            if row is not None and row["tokenizer"] == tokenizer_name:
+                if (row["mtime_ns"], row["size"]) == (stat.st_mtime_ns, stat.st_size):
+                    changes["unchanged"] += 1
+                    continue
+
+            content = script_path.read_bytes()
+            if (
+                row is not None
+                and row["tokenizer"] == tokenizer_name
+                and row["sha256"] == hashlib.sha256(content).hexdigest()
+            ):
+                self.connection.execute(
+                    "UPDATE scripts SET mtime_ns = ?, size = ? WHERE name = ?",
+                    (stat.st_mtime_ns, stat.st_size, name),
+                )
+                changes["touched"] += 1
+                continue
+
+            columns = describe_script(script_path, content)
+            columns.update(
+                name=name,
+                family=name.split("/")[0],
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                tokenizer=tokenizer_name,
+            )
+            dirty.append(columns)
+            changes["updated" if row is not None else "added"] += 1
+
+        # Count tokens in one batch, the way the tokenizer is fastest
+        for columns, tokens in zip(dirty, count_tokens([c.pop("body") for c in dirty])):
+            columns["tokens"] = tokens
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO scripts ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                list(columns.values()),
+            )
+
+        for name in rows.keys() - names:
+            self.connection.execute("DELETE FROM scripts WHERE name = ?", (name,))
+            changes["removed"] += 1
+
+        self.connection.commit()
+        return changes
+
+    def select(self, family: str = None, kind: str = None):
+        """
+        Names of the cataloged scripts matching every given filter, sorted.
+        """
+        query = "SELECT name FROM scripts WHERE 1 = 1"
+        parameters = []
+        if family is not None:
+            query += " AND family = ?"
+            parameters.append(family)
+        if kind is not None:
+            query += " AND kind = ?"
+            parameters.append(kind)
+        return [row["name"] for row in self.connection.execute(query + " ORDER BY name", parameters)]
+
+    def families(self):
+        """
+        Names of the cataloged game families, sorted.
+        """
+        return [row["family"] for row in self.connection.execute("SELECT DISTINCT family FROM scripts ORDER BY family")]
+
+    def select_families(self, families):
+        """
+        Names of the cataloged scripts of any of the given game families, sorted.
+
+        Raises:
+            UnknownFamilyError: If a family has no cataloged scripts
+        """
+        known = self.families()
+        unknown = [family for family in families if family not in known]
+        if unknown:
+            raise UnknownFamilyError(
+                f"Unknown game families: {', '.join(unknown)}. Known families: {', '.join(known)}"
+            )
+        return sorted(name for family in families for name in self.select(family))
+
+    def get(self, name: str):
+        """
+        The catalog row of a script as a dict, or None if it isn't cataloged.
+        """
+        row = self.connection.execute("SELECT * FROM scripts WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def statistics(self, family: str = None, kind: str = None):
+        """
+        Script count, code lines and tokens per family and kind.
+
+        Returns:
+            List of dicts with "family", "kind", "scripts", "code_lines",
+            "tokens" and "unparsable" (scripts whose AST couldn't be built)
+        """
+        query = """
+            SELECT family, kind, COUNT(*) AS scripts, SUM(code_lines) AS code_lines,
+                   SUM(tokens) AS tokens, SUM(ast_nodes IS NULL) AS unparsable
+            FROM scripts WHERE (? IS NULL OR family = ?) AND (? IS NULL OR kind = ?)
+            GROUP BY family, kind ORDER BY family, kind
+        """
+        return [
+            dict(row)
+            for row in self.connection.execute(query, (family, family, kind, kind))
+        ]
+
+
+def print_catalog_statistics(rows):
+    print("\n" + "=" * 76)
+    print("SCRIPT CATALOG")
+    print("=" * 76)
+    print(f"{'Family':<20} {'Kind':<8} {'Scripts':<10} {'Code Lines':<12} {'Tokens':<12} {'Unparsable':<10}")
+    print("-" * 76)
+    for row in rows:
+        print(
+            f"{row['family']:<20} {row['kind']:<8} {row['scripts']:<10} "
+            f"{row['code_lines']:<12,} {row['tokens']:<12,} {row['unparsable']:<10}"
+        )
+    print("-" * 76)
+    print(
+        f"{'TOTAL':<20} {'':<8} {sum(row['scripts'] for row in rows):<10} "
+        f"{sum(row['code_lines'] for row in rows):<12,} "
+        f"{sum(row['tokens'] for row in rows):<12,} "
+        f"{sum(row['unparsable'] for row in rows):<10}"
+    )
+    print("=" * 76)
+
+
+def main():
+    from dataset_tokens import load_token_counter
+    from generate_dataset import collect_script_files
+
+    parser = argparse.ArgumentParser(
+        description="Update the SQLite catalog of the scripts in data/ and show its statistics"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=Path,
+        help="Local tokenizer.json (requires `pip install tokenizers`). Defaults to an offline estimate.",
+    )
+    parser.add_argument("--family", help="Only show this game family, e.g. galaga")
+    parser.add_argument("--kind", choices=KINDS, help="Only show scripts of this kind")
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="Print the matching scripts and their catalog rows instead of statistics",
+    )
+
+    args = parser.parse_args()
+
+    data_dir = Path(__file__).parent.parent / "data"
+    catalog_file = Path("output") / "catalog.sqlite"
+
+    count_tokens, tokenizer_name = load_token_counter(args.tokenizer)
+    with ScriptCatalog(catalog_file) as catalog:
+        changes = catalog.update(
+            data_dir, collect_script_files(data_dir), count_tokens, tokenizer_name
+        )
+        print("Catalog updated: " + ", ".join(f"{n} {change}" for change, n in changes.items()))
+
+        if args.list:
+            for name in catalog.select(args.family, args.kind):
+                print(json.dumps(catalog.get(name)))
+        else:
+            print_catalog_statistics(catalog.statistics(args.family, args.kind))
+
+    print(f"\nCatalog saved to: {catalog_file.absolute()}")
+
+
+if __name__ == "__main__":
+    main()
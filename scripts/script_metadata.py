@@ -0,0 +1,94 @@
+"""
+Single-pass parser for the metadata header at the top of every script.
+
+A script starts with `# KEY: value` comment lines, then a blank line, then
+its code:
+
+    # SOURCE: galaga.py        remix: the script this one was remixed from
+    # REMIX: <prompt>          remix: the Infinity Arcade remix prompt
+    # CREATE: <prompt>         base game or bug: the Infinity Arcade create prompt
+    # ERROR: <trace line>      bug: one line of the error trace per comment
+
+Only these keys are header keys, so a `# TODO:` at the top of a game without
+a header stays part of its code.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+HEADER_KEYS = ("SOURCE", "REMIX", "CREATE", "ERROR")
+
+
+@dataclass
+class ScriptMetadata:
+    """
+    A script split into its header and its code.
+
+    Attributes:
+        header: Dict mapping each header key to its value. "ERROR" lines are
+            collected into a list, which is empty if there are none.
+        body: The code after the header and the blank lines that follow it,
+            or the whole text if the script has no header
+        header_lines: Number of lines before the body
+    """
+
+    header: dict
+    body: str
+    header_lines: int
+
+
+def parse_script(text: str):
+    """
+    Split a script into its header and body in one pass over its lines.
+    """
+    header = {"ERROR": []}
+    lines = text.splitlines()
+
+    i = 0
+    for line in lines:
+        key, separator, value = line[2:].partition(":")
+        if not line.startswith("# ") or not separator or key not in HEADER_KEYS:
+            break
+        if key == "ERROR":
+            header["ERROR"].append(value[1:] if value.startswith(" ") else value)
+        else:
+            header[key] = value.strip()
+        i += 1
+
+    if i == 0:
+        return ScriptMetadata(header, text, 0)
+
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    return ScriptMetadata(header, "\n".join(lines[i:]), i)
+
+
+def parse_header(text: str):
+    """
+    Parse only the header of a script, see parse_script.
+    """
+    return parse_script(text).header
+
+
+def script_kind(script_path: Path, header: dict):
+    """
+    Classify a script as "base", "remix", "bug", or "fix".
+
+    Like generate_dataset.route_script_to_formatter, a remix needs both a
+    SOURCE and a REMIX line; a script with only one of them is a base game.
+    """
+    stem = Path(script_path).stem
+    if stem.endswith("_bug"):
+        return "bug"
+    if stem.endswith("_fix"):
+        return "fix"
+    if "SOURCE" in header and "REMIX" in header:
+        return "remix"
+    return "base"
+
+
+def count_code_lines(code: str):
+    """
+    Number of non-blank lines, the "Lines of Code" of the dataset statistics.
+    """
+    return len([line for line in code.splitlines() if line.strip()])
@@ -0,0 +1,283 @@
+"""
+Headless smoke test of every script in the data directory.
+
+Each script is run for a number of frames by game_harness.py, in its own
+process with a timeout and a memory limit, with several scripts running in
+parallel. Base, remix and fix scripts pass if they survive (or exit by
+themselves), and _bug.py scripts pass if they crash with the exception type
+recorded in the last line of their `# ERROR:` header.
+
+The results are written to output/smoke_report.json:
+
+    {
+        "frames": 300, "seed": 0, "timeout": 30, "memory_mb": 1024,
+        "summary": {"base": {"passed": 111, "failed": 0}, ...},
+        "results": [
+            {"name": "galaga/bugs/galaga_1_bug.py", "kind": "bug",
+             "expected_error": "AttributeError", "passed": true,
+             "status": "crashed", "frames": 9, "seconds": 0.06,
+             "error_type": "AttributeError", "error_line": 273, ...},
+            ...
+        ]
+    }
+
+Each result also has a "problem" describing why it failed, if it did. The
+error_line of a crash is the line in this tree, unlike the line numbers in
+the recorded ERROR tracebacks.
+
+setup:
+    pip install pygame
+
+usage: `python smoke_test.py [SCRIPT ...] [--family NAME [NAME ...]] [--kind KIND] [--frames N] [--seed S] [--jobs N] [--timeout SECONDS] [--memory-mb MB]`
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dataset_graph import read_script_text
+from game_harness import DEFAULT_FRAMES
+from script_metadata import parse_header, script_kind
+
+HARNESS = Path(__file__).parent / "game_harness.py"
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_MEMORY_MB = 1024
+
+KINDS = ("base", "remix", "bug", "fix")
+
+EXCEPTION_TYPE_PATTERN = re.compile(r"^([A-Za-z_][\w.]*)(?::|$)")
+
+
+def expected_error(header: dict):
+    """
+    Exception type at the end of a script's ERROR traceback, or None.
+    """
+    lines = [line.strip() for line in header["ERROR"] if line.strip()]
+    if not lines:
+        return None
+    match = EXCEPTION_TYPE_PATTERN.match(lines[-1])
+    return match.group(1) if match else None
+
+
+def run_harness(script_path: Path, frames: int, seed: int, timeout: float, memory_mb: int):
+    """
+    Run game_harness.py on one script in a child process.
+
+    Returns:
+        The harness result dict, with status "timeout" if the script ran out
+        of time and "killed" if the process died without a result
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_file = Path(work_dir) / "result.json"
+        command = [
+            sys.executable,
+            str(HARNESS),
+            str(script_path.absolute()),
+            "--frames",
+            str(frames),
+            "--seed",
+            str(seed),
+            "--memory-mb",
+            str(memory_mb),
+            "--result",
+            str(result_file),
+        ]
+        try:
+            # The scripts run in a scratch directory, so stray files they
+            # write don't end up in the repo
+            process = subprocess.run(
+                command, cwd=work_dir, capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            return {"status": "timeout", "seconds": timeout}
+
+        if not result_file.exists():
+            return {
+                "status": "killed",
+                "returncode": process.returncode,
+                "stderr": process.stderr[-2000:],
+            }
+        return json.loads(result_file.read_text(encoding="utf-8"))
+
+
+def check_result(kind: str, expected: str, result: dict):
+    """
+    Why a harness result fails the smoke test, or None if it passes.
+    """
+    status = result["status"]
+    if kind == "bug":
+        if expected is None:
+            return "no exception type in the ERROR header"
+        if status == "crashed" and result["error_type"] == expected:
+            return None
+        if status == "crashed":
+            return f"crashed with {result['error_type']} instead of {expected}"
+        return f"{status} instead of crashing with {expected}"
+
+    if status in ("survived", "exited"):
+        return None
+    if status == "crashed":
+        return f"crashed with {result['error_type']}: {result['error']} (line {result['error_line']})"
+    return status
+
+
+def smoke_test_script(data_dir: Path, name: str, frames: int, seed: int, timeout: float, memory_mb: int):
+    """
+    Smoke test one script.
+
+    Returns:
+        Report entry dict, see the module docstring
+    """
+    script_path = data_dir / name
+    header = parse_header(read_script_text(script_path))
+    kind = script_kind(script_path, header)
+    expected = expected_error(header) if kind == "bug" else None
+
+    result = run_harness(script_path, frames, seed, timeout, memory_mb)
+    problem = check_result(kind, expected, result)
+    entry = {"name": name, "kind": kind, "expected_error": expected, "passed": problem is None}
+    if problem:
+        entry["problem"] = problem
+    entry.update(result)
+    return entry
+
+
+def run_smoke_tests(
+    data_dir: Path,
+    names,
+    frames: int = DEFAULT_FRAMES,
+    seed: int = 0,
+    jobs: int = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+):
+    """
+    Smoke test scripts in parallel.
+
+    Every script already runs in its own child process, so a thread pool is
+    enough to keep `jobs` of them running at once.
+
+    Args:
+        data_dir: Path to the data directory
+        names: Script names relative to the data directory
+        frames: Frames to run each script for
+        seed: Seed of the random module and the monkey input of every script
+        jobs: Number of scripts run at once (defaults to the CPU count)
+        timeout: Seconds each script may take
+        memory_mb: Address space limit of each script
+
+    Returns:
+        The report dict, see the module docstring
+    """
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        results = list(
+            executor.map(
+                lambda name: smoke_test_script(data_dir, name, frames, seed, timeout, memory_mb),
+                names,
+            )
+        )
+
+    summary = {kind: {"passed": 0, "failed": 0} for kind in KINDS}
+    for result in results:
+        summary[result["kind"]]["passed" if result["passed"] else "failed"] += 1
+
+    return {
+        "frames": frames,
+        "seed": seed,
+        "timeout": timeout,
+        "memory_mb": memory_mb,
+        "summary": summary,
+        "results": results,
+    }
+
+
+def print_smoke_report(report: dict):
+    print("\n" + "=" * 60)
+    print(f"SMOKE TEST ({report['frames']} frames, seed {report['seed']})")
+    print("=" * 60)
+    print(f"{'Kind':<20} {'Scripts':<12} {'Passed':<12} {'Failed':<12}")
+    print("-" * 60)
+    for kind, counts in report["summary"].items():
+        print(
+            f"{kind:<20} {counts['passed'] + counts['failed']:<12} "
+            f"{counts['passed']:<12} {counts['failed']:<12}"
+        )
+    print("=" * 60)
+
+    statuses = Counter(result["status"] for result in report["results"])
+    print("Statuses: " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    for result in report["results"]:
+        if not result["passed"]:
+            print(f"FAILED {result['name']}: {result['problem']}")
+
+
+def main():
+    from generate_dataset import collect_script_files
+
+    parser = argparse.ArgumentParser(
+        description="Run every script in data/ headless and check that it survives, or that bugs crash as recorded"
+    )
+    parser.add_argument("scripts", nargs="*", help="Script names relative to data/ (default: all scripts)")
+    parser.add_argument("--family", nargs="+", help="Only test scripts from these game families")
+    parser.add_argument("--kind", choices=KINDS, help="Only test scripts of this kind")
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=DEFAULT_FRAMES,
+        help=f"Frames to run each script for (default: {DEFAULT_FRAMES})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--jobs", type=int, help="Scripts run at once (default: CPU count)")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds each script may take (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=DEFAULT_MEMORY_MB,
+        help=f"Address space limit of each script in MB (default: {DEFAULT_MEMORY_MB})",
+    )
+
+    args = parser.parse_args()
+
+    data_dir = Path(__file__).parent.parent / "data"
+    names = args.scripts or [
+        path.relative_to(data_dir).as_posix() for path in collect_script_files(data_dir)
+    ]
+    if args.family:
+        names = [name for name in names if name.split("/")[0] in args.family]
+    if args.kind:
+        names = [
+            name
+            for name in names
+            if script_kind(data_dir / name, parse_header(read_script_text(data_dir / name))) == args.kind
+        ]
+
+    report = run_smoke_tests(
+        data_dir, names, args.frames, args.seed, args.jobs, args.timeout, args.memory_mb
+    )
+    print_smoke_report(report)
+
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    report_file = output_dir / "smoke_report.json"
+    report_file.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nReport saved to: {report_file.absolute()}")
+
+    if not all(result["passed"] for result in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Deterministic virtual time for running pygame scripts faster than real time.
+
+virtual_time() replaces pygame.time.Clock, get_ticks, set_timer, wait and
+delay with versions driven by a VirtualClock, without editing the scripts:
+
+- Clock.tick(framerate) advances virtual time by exactly one frame at that
+  framerate (1000 / framerate ms) and returns at once, instead of sleeping
+  until the frame is due. tick() without a framerate advances by one frame
+  at DEFAULT_FRAMERATE.
+- get_ticks() returns the virtual milliseconds since the clock started.
+- Timers from set_timer() post their events when virtual time passes their
+  due time.
+- wait() and delay() advance virtual time without sleeping.
+
+The time a frame takes to compute doesn't count, so every run of a script
+sees the same sequence of times and events no matter how fast the machine is.
+With real_time, virtual time is still advanced the same way, but the clock
+also sleeps until real time catches up, so a person can play the game while
+its input is recorded for a later replay.
+
+    with virtual_time(pygame) as clock:
+        runpy.run_path("data/snake/snake.py", run_name="__main__")
+    print(clock.ticks)
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+
+DEFAULT_FRAMERATE = 60
+
+
+class VirtualClock:
+    """
+    Virtual time, and the set_timer() timers that fire as it passes.
+
+    Attributes:
+        ms: Virtual milliseconds since the clock started (a float, so frames
+            at framerates that don't divide 1000 don't drift)
+        frames: Number of Clock.tick() calls so far
+    """
+
+    def __init__(self, pygame, real_time: bool = False):
+        self.pygame = pygame
+        self.real_time = real_time
+        self.ms = 0.0
+        self.frames = 0
+        self._start = time.perf_counter()
+        # Event type -> [event, interval ms, next due ms, loops left or None]
+        self._timers = {}
+
+    @property
+    def ticks(self):
+        return int(self.ms)
+
+    def advance(self, ms: float):
+        """
+        Move virtual time forward, posting the events of timers that come due.
+        """
+        self.ms += ms
+        while self._timers:
+            event_type, timer = min(self._timers.items(), key=lambda item: item[1][2])
+            event, interval, due, loops = timer
+            if due > self.ms:
+                break
+            self.pygame.event.post(event)
+            if loops is not None:
+                loops -= 1
+                if loops == 0:
+                    del self._timers[event_type]
+                    continue
+            self._timers[event_type] = [event, interval, due + interval, loops]
+
+        if self.real_time:
+            behind = self.ms / 1000 - (time.perf_counter() - self._start)
+            if behind > 0:
+                time.sleep(behind)
+
+    def set_timer(self, event, millis: int, loops: int = 0):
+        """
+        Virtual pygame.time.set_timer(): post event every millis ms, loops
+        times (0 for forever). millis of 0 stops the timer.
+        """
+        if not isinstance(event, self.pygame.event.EventType):
+            event = self.pygame.event.Event(event)
+        self._timers.pop(event.type, None)
+        if millis > 0:
+            self._timers[event.type] = [event, millis, self.ms + millis, loops or None]
+
+    def get_ticks(self):
+        return self.ticks
+
+    def wait(self, milliseconds: int):
+        self.advance(milliseconds)
+        return milliseconds
+
+    def clock_class(self):
+        """
+        pygame.time.Clock stand-in class whose instances tick this clock.
+        """
+        virtual_clock = self
+
+        class Clock:
+            def __init__(self):
+                self._frame_ms = 0.0
+                self._last_tick = virtual_clock.ms
+
+            def tick(self, framerate=0):
+                virtual_clock.frames += 1
+                frame_ms = 1000 / (framerate or DEFAULT_FRAMERATE)
+                # Time already spent in wait() or delay() counts towards the frame
+                virtual_clock.advance(max(0.0, self._last_tick + frame_ms - virtual_clock.ms))
+                self._frame_ms = virtual_clock.ms - self._last_tick
+                self._last_tick = virtual_clock.ms
+                return int(self._frame_ms)
+
+            tick_busy_loop = tick
+
+            def get_time(self):
+                return int(self._frame_ms)
+
+            def get_rawtime(self):
+                return 0
+
+            def get_fps(self):
+                return 1000 / self._frame_ms if self._frame_ms else 0.0
+
+        return Clock
+
+
+@contextmanager
+def patch_attribute(owner, name: str, value):
+    original = getattr(owner, name)
+    setattr(owner, name, value)
+    try:
+        yield original
+    finally:
+        setattr(owner, name, original)
+
+
+@contextmanager
+def virtual_time(pygame, real_time: bool = False):
+    """
+    Run pygame on a new VirtualClock until the context exits.
+
+    Yields:
+        The VirtualClock
+    """
+    clock = VirtualClock(pygame, real_time)
+    with ExitStack() as patches:
+        patches.enter_context(patch_attribute(pygame.time, "Clock", clock.clock_class()))
+        patches.enter_context(patch_attribute(pygame.time, "get_ticks", clock.get_ticks))
+        patches.enter_context(patch_attribute(pygame.time, "set_timer", clock.set_timer))
+        patches.enter_context(patch_attribute(pygame.time, "wait", clock.wait))
+        patches.enter_context(patch_attribute(pygame.time, "delay", clock.wait))
+        yield clock
@@ -0,0 +1,8 @@
+"""
+The scripts import each other as top-level modules, so put scripts/ on the path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
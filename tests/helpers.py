@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from dataset_graph import DatasetGraph
+
+
+def write_scripts(data_dir: Path, scripts: dict):
+    """
+    Write scripts given as {name relative to data_dir: text} and return their
+    paths in dataset order.
+    """
+    paths = []
+    for name, text in scripts.items():
+        path = data_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def build_graph(data_dir: Path, scripts: dict):
+    return DatasetGraph(data_dir, write_scripts(data_dir, scripts))
@@ -0,0 +1,81 @@
+import ast
+
+import pytest
+
+from code_minify import MinifyError, minify_code
+
+CODE = '''"""
+Pong - a classic paddle game.
+"""
+
+import pygame  # the only dependency
+
+WIDTH = 640   # window width
+
+
+class Paddle:
+    """A player's paddle."""
+
+    def move(self, dy):
+        """
+        Move the paddle, keeping it on screen.
+        """
+        # Clamp to the window
+        self.y = max(0, min(WIDTH, self.y + dy))
+
+
+def only_docstring():
+    """Nothing to do yet."""
+
+
+HELP = """Press # to pause
+
+    Arrow keys move"""
+URL = "http://example.com/#top"
+'''
+
+
+def without_docstrings(tree):
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if (
+            isinstance(body, list)
+            and body
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+def test_minified_code_has_the_same_ast_without_docstrings():
+    minified, _ = minify_code(CODE)
+
+    assert ast.dump(ast.parse(minified)) == ast.dump(without_docstrings(ast.parse(CODE)))
+
+
+def test_comments_docstrings_and_blank_lines_are_removed_but_strings_kept():
+    minified, _ = minify_code(CODE)
+
+    assert "#" not in minified.replace("Press # to pause", "").replace("/#top", "")
+    assert "classic paddle game" not in minified
+    # The only blank line left is inside the HELP string
+    assert minified.splitlines().count("") == 1
+    # Multi-line strings keep their blank lines and indentation
+    assert 'HELP = """Press # to pause\n\n    Arrow keys move"""' in minified
+    assert "def only_docstring():\n    pass" in minified
+
+
+def test_line_map_points_at_the_minified_lines():
+    minified, line_map = minify_code(CODE)
+    original = CODE.splitlines()
+    minified_lines = minified.splitlines()
+
+    line_number = original.index("        self.y = max(0, min(WIDTH, self.y + dy))") + 1
+    assert minified_lines[line_map[line_number] - 1] == original[line_number - 1]
+
+
+def test_code_that_does_not_parse_is_refused():
+    with pytest.raises(MinifyError):
+        minify_code("def broken(:\n    pass\n")
@@ -0,0 +1,76 @@
+import pytest
+
+from dataset_manifest import build_manifest, diff_manifests, print_manifest_diff
+
+
+def entry(sha256, script_sha256, source_sha256=None, tokens=100):
+    return {
+        "sha256": sha256,
+        "script_sha256": script_sha256,
+        "source_sha256": source_sha256,
+        "kind": "remix",
+        "prompt_version": "v1",
+        "tokens": tokens,
+    }
+
+
+@pytest.fixture
+def manifests():
+    old = build_manifest(
+        {
+            "pong/pong.py": entry("r1", "s1"),
+            "pong/pong_fast.py": entry("r2", "s2", "c1"),
+            "pong/pong_slow.py": entry("r3", "s3", "c1"),
+            "pong/pong_wide.py": entry("r4", "s4", "c1"),
+            "pong/pong_gone.py": entry("r5", "s5"),
+        },
+        {"v1": "t1"},
+        "estimate",
+    )
+    new = build_manifest(
+        {
+            "pong/pong.py": entry("r1*", "s1*", tokens=110),
+            "pong/pong_fast.py": entry("r2*", "s2", "c1*"),
+            "pong/pong_slow.py": entry("r3*", "s3", "c1", tokens=90),
+            "pong/pong_wide.py": entry("r4", "s4", "c1"),
+            "pong/pong_new.py": entry("r6", "s6"),
+        },
+        {"v1": "t1"},
+        "estimate",
+    )
+    return old, new
+
+
+def test_diff_lists_records_by_hash(manifests):
+    old, new = manifests
+
+    assert diff_manifests(old, new) == {
+        "added": ["pong/pong_new.py"],
+        "removed": ["pong/pong_gone.py"],
+        "changed": ["pong/pong.py", "pong/pong_fast.py", "pong/pong_slow.py"],
+    }
+
+
+def test_diff_reasons(manifests, capsys):
+    old, new = manifests
+
+    print_manifest_diff(old, new, diff_manifests(old, new))
+
+    lines = capsys.readouterr().out.splitlines()
+    reasons = {line.split()[1]: line.split()[-1] for line in lines if line.startswith("~ ")}
+    assert reasons == {
+        "pong/pong.py": "script",
+        "pong/pong_fast.py": "source",
+        "pong/pong_slow.py": "format",
+    }
+    assert any(line.startswith("~ pong/pong_slow.py") and "-10" in line for line in lines)
+
+
+def test_manifests_without_source_hashes_still_diff(manifests, capsys):
+    old, new = manifests
+    for record in old["records"].values():
+        del record["source_sha256"]
+
+    print_manifest_diff(old, new, diff_manifests(old, new))
+
+    assert "~ pong/pong_fast.py" in capsys.readouterr().out
@@ -0,0 +1,29 @@
+import random
+
+from dataset_packing import pack_first_fit_decreasing
+
+
+def test_first_fit_decreasing_packs_largest_first():
+    windows, too_long = pack_first_fit_decreasing([5, 4, 3, 3, 2, 1], 8)
+
+    assert windows == [[0, 2], [1, 3, 5], [4]]
+    assert too_long == []
+
+
+def test_items_longer_than_a_window_are_left_out():
+    windows, too_long = pack_first_fit_decreasing([10, 3, 9, 8], 8)
+
+    assert windows == [[3], [1]]
+    assert too_long == [0, 2]
+
+
+def test_every_item_is_packed_once_within_capacity():
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 4096) for _ in range(300)]
+
+    windows, too_long = pack_first_fit_decreasing(lengths, 4096)
+
+    packed = sorted(i for window in windows for i in window)
+    assert packed == list(range(len(lengths)))
+    assert too_long == []
+    assert all(sum(lengths[i] for i in window) <= 4096 for window in windows)
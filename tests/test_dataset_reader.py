@@ -0,0 +1,44 @@
+import json
+
+from dataset_reader import DatasetReader, patch_dataset_jsonl, write_dataset_index
+
+
+def write_dataset(jsonl_file, names):
+    lines = [json.dumps({"name": name}) + "\n" for name in names]
+    jsonl_file.write_text("".join(lines), encoding="utf-8")
+    write_dataset_index(jsonl_file, [(name, name.split("/")[0], "base") for name in names])
+
+
+def test_patch_round_trips_changes_inserts_and_removals(tmp_path):
+    jsonl_file = tmp_path / "dataset.jsonl"
+    write_dataset(jsonl_file, ["a/1", "a/2", "a/3", "b/1", "b/2"])
+
+    changed = {
+        "a/2": b'{"name": "a/2", "edited": true}\n',
+        "a/3": None,
+        "b/0": b'{"name": "b/0"}\n',
+    }
+    order = ["a/1", "a/2", "b/0", "b/1", "b/2"]
+    patch_dataset_jsonl(jsonl_file, changed, order)
+
+    assert jsonl_file.read_text(encoding="utf-8").splitlines() == [
+        '{"name": "a/1"}',
+        '{"name": "a/2", "edited": true}',
+        '{"name": "b/0"}',
+        '{"name": "b/1"}',
+        '{"name": "b/2"}',
+    ]
+
+    write_dataset_index(jsonl_file, [(name, name.split("/")[0], "base") for name in order])
+    with DatasetReader(jsonl_file) as reader:
+        assert reader.names == order
+        assert reader[reader.position_of("a/2")] == {"name": "a/2", "edited": True}
+
+
+def test_reader_without_index_puts_records_in_unknown_stratum(tmp_path):
+    jsonl_file = tmp_path / "dataset.train.jsonl"
+    jsonl_file.write_text('{"a": 1}\n{"a": 2}\n', encoding="utf-8")
+
+    with DatasetReader(jsonl_file) as reader:
+        assert len(reader) == 2
+        assert reader.stratum(1) == "unknown"
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from dataset_split import assign_splits, split_groups, twin_name
+from helpers import build_graph
+
+GAME = "import pygame\n"
+
+
+def remix(source, prompt):
+    return f"# SOURCE: {source}\n# REMIX: {prompt}\n\n{GAME}"
+
+
+def test_twin_name_strips_oneshot_bug_and_fix_suffixes():
+    assert twin_name("galaga/bugs/galaga_1_bug.py") == "galaga/galaga_1"
+    assert twin_name("galaga/bugs/galaga_1_fix.py") == "galaga/galaga_1"
+    assert twin_name("galaga/galaga_icon_lives_oneshot.py") == "galaga/galaga_icon_lives"
+
+
+def test_split_groups_join_source_chains_twins_and_bug_pairs(tmp_path):
+    graph = build_graph(
+        tmp_path,
+        {
+            "pong/pong.py": f"# CREATE: pong\n\n{GAME}",
+            "pong/pong_fast.py": remix("pong.py", "faster ball"),
+            "pong/pong_fast_walls.py": remix("pong_fast.py", "moving walls"),
+            "pong/pong_fast_oneshot.py": f"# CREATE: pong with a faster ball\n\n{GAME}",
+            "pong/pong_1.py": f"# CREATE: pong\n\n{GAME}",
+            "pong/bugs/pong_1_bug.py": f"# CREATE: pong\n# ERROR: NameError\n\n{GAME}",
+            "pong/bugs/pong_1_fix.py": f"# CREATE: pong\n\n{GAME}",
+        },
+    )
+
+    assert split_groups(graph) == {
+        "pong/pong": [
+            "pong/pong.py",
+            "pong/pong_fast.py",
+            "pong/pong_fast_walls.py",
+            "pong/pong_fast_oneshot.py",
+        ],
+        "pong/pong_1": ["pong/pong_1.py", "pong/bugs/pong_1_bug.py", "pong/bugs/pong_1_fix.py"],
+    }
+
+
+def test_split_groups_link_selected_scripts_through_unselected_ones(tmp_path):
+    graph = build_graph(
+        tmp_path,
+        {
+            "pong/pong.py": f"# CREATE: pong\n\n{GAME}",
+            "pong/pong_fast.py": remix("pong.py", "faster ball"),
+            "pong/pong_fast_walls.py": remix("pong_fast.py", "moving walls"),
+        },
+    )
+
+    groups = split_groups(graph, names={"pong/pong.py", "pong/pong_fast_walls.py"})
+
+    assert groups == {"pong/pong": ["pong/pong.py", "pong/pong_fast_walls.py"]}
+
+
+def test_assign_splits_rounds_eval_over_the_whole_split(tmp_path):
+    scripts = {}
+    for family in ("pong", "snake", "galaga"):
+        for i in range(7):
+            scripts[f"{family}/{family}_{i}.py"] = f"# CREATE: {family}\n\n{GAME}"
+    graph = build_graph(tmp_path, scripts)
+
+    assignments = assign_splits(graph, 0.1, seed=3)
+
+    # 2 of 21 records, where rounding per family would give 3
+    assert list(assignments.values()).count("eval") == round(0.1 * 21)
+    assert assignments == assign_splits(graph, 0.1, seed=3)
+
+
+def test_assign_splits_never_splits_a_group(tmp_path):
+    scripts = {}
+    for i in range(10):
+        scripts[f"pong/pong_{i}.py"] = f"# CREATE: pong\n\n{GAME}"
+        scripts[f"pong/pong_{i}_fast.py"] = remix(f"pong_{i}.py", "faster ball")
+        scripts[f"pong/bugs/pong_{i}_bug.py"] = f"# CREATE: pong\n# ERROR: NameError\n\n{GAME}"
+        scripts[f"pong/bugs/pong_{i}_fix.py"] = f"# CREATE: pong\n\n{GAME}"
+    graph = build_graph(tmp_path, scripts)
+
+    for seed in range(5):
+        assignments = assign_splits(graph, 0.2, seed=seed)
+        sides = defaultdict(set)
+        for group, names in split_groups(graph).items():
+            for name in names:
+                sides[group].add(assignments[name])
+        assert all(len(side) == 1 for side in sides.values())
+        # 6 of 30 records: two groups of a base game, its remix and its
+        # bug/fix pair (3 records, 4 scripts)
+        assert list(assignments.values()).count("eval") == 2 * 4
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+from helpers import write_scripts
+from near_duplicates import (
+    build_near_duplicate_index,
+    cap_cluster_multiplicity,
+    collect_all_scripts,
+    script_task,
+)
+
+GAME = "".join(
+    f"def update_{i}(state):\n    state.x += {i}\n    state.y -= {i} * state.speed\n    return state\n\n"
+    for i in range(60)
+)
+OTHER_GAME = "".join(
+    f"class Sprite{i}:\n    def draw(self, screen):\n        screen.blit(self.image, ({i}, {i * 2}))\n\n"
+    for i in range(60)
+)
+
+
+def test_script_task_separates_kinds_and_normalizes_prompts(tmp_path):
+    base = script_task(tmp_path / "pong.py", "# CREATE: Pong!\n")
+    same_prompt = script_task(tmp_path / "pong_2.py", "# CREATE:  pong\n")
+    remix = script_task(tmp_path / "pong_fast.py", "# SOURCE: pong.py\n# REMIX: pong\n")
+    oneshot = script_task(tmp_path / "pong_fast_oneshot.py", "# CREATE: pong with a fast ball\n")
+
+    assert base == same_prompt
+    assert remix != base
+    assert oneshot not in (base, remix)
+
+
+def test_collect_all_scripts_skips_underscore_directories_and_scripts(tmp_path):
+    write_scripts(
+        tmp_path,
+        {
+            "pong/pong.py": GAME,
+            "pong/_pong_draft.py": GAME,
+            "pong/bugs/pong_1_bug.py": GAME,
+            "_frogger/frogger.py": GAME,
+        },
+    )
+
+    assert [path.relative_to(tmp_path).as_posix() for path in collect_all_scripts(tmp_path)] == [
+        "pong/bugs/pong_1_bug.py",
+        "pong/pong.py",
+    ]
+
+
+def test_only_scripts_of_the_same_task_are_clustered(tmp_path):
+    data_dir = tmp_path / "data"
+    write_scripts(
+        data_dir,
+        {
+            "pong/pong.py": f"# CREATE: pong\n\n{GAME}",
+            "pong/pong_1.py": f"# CREATE: pong\n\n{GAME}\ndef extra():\n    pass\n",
+            "pong/pong_2.py": f"# CREATE: pong\n\n{OTHER_GAME}",
+            # Same code, but remixes teach a different task than the base games
+            "pong/pong_fast.py": f"# SOURCE: pong.py\n# REMIX: faster ball\n\n{GAME}",
+            "pong/pong_slow.py": f"# SOURCE: pong.py\n# REMIX: slower ball\n\n{GAME}",
+        },
+    )
+    index_file = tmp_path / "near_duplicates.json"
+
+    clusters = build_near_duplicate_index(data_dir, index_file)
+
+    assert clusters == [["pong/pong.py", "pong/pong_1.py"]]
+    # Cached signatures give the same clusters
+    assert build_near_duplicate_index(data_dir, index_file) == clusters
+
+
+def test_cap_cluster_multiplicity_reports_kept_and_dropped_per_cluster():
+    clusters = [["a/a.py", "a/a_1.py", "a/a_2.py"], ["b/b.py", "b/b_1.py"]]
+    records = [
+        SimpleNamespace(name=name, game_type=game_type)
+        for name, game_type in (
+            ("a/a.py", "base"),
+            ("a/a_1.py", "base"),
+            ("a/a_2.py", "base"),
+            ("a/bugs/a_1_bug.py", "bug_fix"),
+            ("b/b.py", "base"),
+            ("b/b_1.py", "base"),
+            ("c/c.py", "base"),
+        )
+    ]
+    capped = {}
+
+    kept = [record.name for record in cap_cluster_multiplicity(records, clusters, 2, capped)]
+
+    assert kept == ["a/a.py", "a/a_1.py", "a/bugs/a_1_bug.py", "b/b.py", "b/b_1.py", "c/c.py"]
+    assert capped == {0: {"kept": ["a/a.py", "a/a_1.py"], "dropped": ["a/a_2.py"]}}
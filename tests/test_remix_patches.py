@@ -0,0 +1,48 @@
+import pytest
+
+from remix_patches import (
+    PATCH_FORMATS,
+    PatchError,
+    apply_search_replace,
+    apply_unified_diff,
+    make_patch,
+    make_search_replace,
+)
+
+BASE = "\n".join(
+    ["import pygame", "", "SPEED = 5", ""]
+    + [f"def step_{i}(ball):\n    ball.x += SPEED\n    return ball\n" for i in range(20)]
+    + ["pygame.quit()"]
+)
+REMIX = (
+    BASE.replace("SPEED = 5", "SPEED = 9\nACCELERATION = 1.05")
+    .replace("def step_7(ball):\n    ball.x += SPEED", "def step_7(ball):\n    ball.x += SPEED * ACCELERATION")
+    .replace("pygame.quit()", "print('bye')\npygame.quit()")
+)
+
+
+@pytest.mark.parametrize("patch_format", PATCH_FORMATS)
+def test_patches_round_trip(patch_format):
+    patch = make_patch(patch_format, BASE, REMIX, "pong.py", "pong_fast.py")
+
+    apply = apply_unified_diff if patch_format == "diff" else apply_search_replace
+    assert apply(BASE, patch) == REMIX
+    assert len(patch) < len(REMIX)
+
+
+def test_search_blocks_are_widened_until_unique():
+    # Every step_N body is the same, so the changed line alone is ambiguous
+    patch = make_search_replace(BASE, REMIX)
+
+    assert apply_search_replace(BASE, patch) == REMIX
+    assert "def step_7(ball):" in patch
+
+
+@pytest.mark.parametrize("patch_format", PATCH_FORMATS)
+def test_patches_refuse_code_they_were_not_made_for(patch_format):
+    patch = make_patch(patch_format, BASE, REMIX, "pong.py", "pong_fast.py")
+    other_base = BASE.replace("SPEED = 5", "SPEED = 6")
+
+    apply = apply_unified_diff if patch_format == "diff" else apply_search_replace
+    with pytest.raises(PatchError):
+        apply(other_base, patch)
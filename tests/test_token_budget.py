@@ -0,0 +1,82 @@
+import pytest
+
+from dataset_tokens import annotate_token_counts, load_token_counter, templated_tokens
+from generate_dataset import DatasetRecord, enforce_token_budget, route_script_to_formatter
+from helpers import build_graph
+
+BASE_GAME = "# CREATE: pong\n\nimport pygame\n\n" + "".join(
+    f"# Move the ball along axis {i}, bouncing off the walls of the screen\n"
+    f"def move_{i}(ball):\n    ball.x += {i}\n    return ball\n\n"
+    for i in range(30)
+)
+REMIX = "# SOURCE: pong.py\n# REMIX: faster ball\n\nimport pygame\n\nSPEED = 9\n"
+
+count_tokens, _ = load_token_counter(None)
+
+
+@pytest.fixture
+def remix_record(tmp_path):
+    graph = build_graph(tmp_path, {"pong/pong.py": BASE_GAME, "pong/pong_fast.py": REMIX})
+    data, game_type, line_count = route_script_to_formatter(tmp_path / "pong/pong_fast.py")
+    record = DatasetRecord("pong/pong_fast.py", data, game_type, line_count)
+    return graph, next(annotate_token_counts([record], count_tokens))
+
+
+def run_budget(graph, record, max_tokens, policy):
+    over_budget = []
+    kept = list(enforce_token_budget([record], graph, max_tokens, policy, count_tokens, over_budget))
+    return kept, over_budget
+
+
+def test_budget_counts_the_chat_template(remix_record):
+    graph, record = remix_record
+    # Fits without the chat template, but not with it
+    max_tokens = record.total_tokens
+
+    kept, over_budget = run_budget(graph, record, max_tokens, "report")
+    assert kept == [record]
+    assert over_budget == [
+        {
+            "name": "pong/pong_fast.py",
+            "tokens": templated_tokens(record),
+            "action": "kept",
+            "chain": ["pong_fast.py", "pong.py"],
+        }
+    ]
+
+    kept, over_budget = run_budget(graph, record, max_tokens, "drop")
+    assert kept == []
+    assert over_budget[0]["action"] == "dropped"
+
+
+def test_records_within_budget_pass_unreported(remix_record):
+    graph, record = remix_record
+
+    kept, over_budget = run_budget(graph, record, templated_tokens(record), "drop")
+
+    assert kept == [record]
+    assert over_budget == []
+
+
+def test_compress_minifies_the_prompt_until_it_fits(remix_record):
+    graph, record = remix_record
+    completion = record.data["messages"][-1]
+    max_tokens = templated_tokens(record) - 1
+
+    kept, over_budget = run_budget(graph, record, max_tokens, "compress")
+
+    assert kept == [record]
+    assert over_budget[0]["action"] == "compressed"
+    assert record.minified_context
+    assert templated_tokens(record) <= max_tokens
+    assert "Move the ball along axis" not in record.data["messages"][1]["content"]
+    assert record.data["messages"][-1] == completion
+
+
+def test_compress_drops_records_that_still_do_not_fit(remix_record):
+    graph, record = remix_record
+
+    kept, over_budget = run_budget(graph, record, record.completion_tokens, "compress")
+
+    assert kept == []
+    assert over_budget[0]["action"] == "dropped"